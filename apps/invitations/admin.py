@@ -1,14 +1,40 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.admin.actions import delete_selected
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.db.models import Count, Max, OuterRef, Q, Subquery, Sum
+from django.http import HttpResponse
+from django.template.response import TemplateResponse
+from django.urls import path
 from django.utils.html import format_html
 from django.utils import timezone
-from .models import Guest, Invitation, Question, Choice, Answer
+from .export import streaming_response
+from .guest_import import IMPORT_BATCH_SIZE, ImportFormatError, import_guests, invitation_public_url, links_csv, read_rows
+from .models import Guest, Invitation, Question, Choice, Answer, ChoiceTotal, RsvpSummary, allocate_tokens
+from .questionnaire import get_index
 
 
 @admin.action(description="Создать приглашения (сгенерировать токены) выбранным гостям")
 def create_invitations(modeladmin, request, queryset):
-    for guest in queryset:
-        Invitation.objects.create(guest=guest)
+    guest_ids = list(queryset.values_list("pk", flat=True))
+    Invitation.objects.bulk_create(
+        (
+            Invitation(guest_id=guest_id, token=token)
+            for guest_id, token in zip(guest_ids, allocate_tokens(len(guest_ids)))
+        ),
+        batch_size=IMPORT_BATCH_SIZE,
+    )
+    modeladmin.message_user(request, f"Создано приглашений: {len(guest_ids)}")
+
+
+@admin.action(description="Выгрузить ответы выбранных приглашений (CSV)")
+def export_answers_csv(modeladmin, request, queryset):
+    return streaming_response(queryset, "csv")
+
+
+@admin.action(description="Выгрузить ответы выбранных приглашений (XLSX)")
+def export_answers_xlsx(modeladmin, request, queryset):
+    return streaming_response(queryset, "xlsx")
 
 
 @admin.register(Guest)
@@ -17,13 +43,49 @@ class GuestAdmin(admin.ModelAdmin):
     list_filter = ("gender",)
     search_fields = ("full_name", "email", "telegram", "instagram")
     actions = [create_invitations]
-    
+    change_list_template = "admin/invitations/guest/change_list.html"
+
+    def get_urls(self):
+        urls = [
+            path("import/", self.admin_site.admin_view(self.import_view), name="invitations_guest_import"),
+        ]
+        return urls + super().get_urls()
+
+    def import_view(self, request):
+        """Загрузка CSV/XLSX: гости и приглашения создаются пачками, в ответ — CSV со ссылками."""
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        if request.method == "POST" and request.FILES.get("file"):
+            upload = request.FILES["file"]
+            try:
+                report = import_guests(read_rows(upload.file, upload.name))
+            except ImportFormatError as exc:
+                messages.error(request, f"Не удалось прочитать файл: {exc}")
+            else:
+                response = HttpResponse(links_csv(report), content_type="text/csv; charset=utf-8")
+                response["Content-Disposition"] = f'attachment; filename="invitations-{timezone.localdate():%Y-%m-%d}.csv"'
+                response["X-Import-Created"] = str(len(report.created))
+                response["X-Import-Skipped"] = str(len(report.skipped))
+                return response
+
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": "Импорт гостей",
+        }
+        return TemplateResponse(request, "admin/invitations/guest/import.html", context)
+
+    def get_queryset(self, request):
+        # число приглашений считается в том же запросе, что и страница списка
+        return super().get_queryset(request).annotate(invitations_total=Count("invitations"))
+
     def invitations_count(self, obj):
-        count = obj.invitations.count()
+        count = obj.invitations_total
         if count > 0:
             return format_html('<strong>{}</strong>', count)
         return "0"
     invitations_count.short_description = "Приглашений"
+    invitations_count.admin_order_field = "invitations_total"
 
 
 class ChoiceInline(admin.TabularInline):
@@ -40,11 +102,54 @@ class QuestionAdmin(admin.ModelAdmin):
 
 @admin.register(Invitation)
 class InvitationAdmin(admin.ModelAdmin):
-    list_display = ("guest", "status", "opened_at", "responded_at", "public_link")
+    list_display = ("guest", "status", "opened_at", "open_count", "responded_at", "public_link")
     list_filter = ("status", "responded_at")
     search_fields = ("guest__full_name", "token")
-    readonly_fields = ("token", "opened_at", "responded_at", "public_link", "answers_table", "note_display")
-    fields = ("guest", "status", "token", "public_link", "opened_at", "responded_at", "answers_table", "note_display")
+    readonly_fields = ("token", "opened_at", "last_opened_at", "open_count", "last_device", "responded_at", "public_link", "answers_table", "note_display")
+    fields = ("guest", "status", "token", "public_link", "opened_at", "last_opened_at", "open_count", "last_device", "responded_at", "answers_table", "note_display")
+    change_list_template = "admin/invitations/invitation/change_list.html"
+    actions = [export_answers_csv, export_answers_xlsx]
+    list_select_related = ("guest",)
+    # выпадающий список на тысячи гостей заменяет поиск (GuestAdmin.search_fields)
+    autocomplete_fields = ("guest",)
+
+    def get_urls(self):
+        urls = [
+            path("dashboard/", self.admin_site.admin_view(self.dashboard_view), name="invitations_invitation_dashboard"),
+        ]
+        return urls + super().get_urls()
+
+    def save_model(self, request, obj, form, change):
+        # после правки в админке повтор прежнего RSVP гостя должен записаться заново
+        obj.payload_hash = ""
+        super().save_model(request, obj, form, change)
+
+    def dashboard_view(self, request):
+        """Итоги RSVP по сводкам: фиксированное число запросов, Answer не читается."""
+        stats = RsvpSummary.objects.aggregate(
+            responded=Count("pk"),
+            attending_count=Count("pk", filter=Q(attending=True)),
+            declined_count=Count("pk", filter=Q(attending=False)),
+            companions_count=Sum("companions", filter=Q(attending=True), default=0),
+            notes_count=Count("pk", filter=Q(has_note=True)),
+        )
+        stats["invitations"] = Invitation.objects.count()
+        stats["headcount"] = stats["attending_count"] + stats["companions_count"]
+
+        totals = dict(ChoiceTotal.objects.values_list("choice_id", "count"))
+        questions = [
+            (question, [(choice, totals.get(choice.id, 0)) for choice in question.choices])
+            for question in get_index().questions
+        ]
+
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": "Сводка RSVP",
+            "stats": stats,
+            "questions": questions,
+        }
+        return TemplateResponse(request, "admin/invitations/invitation/dashboard.html", context)
     
     def note_display(self, obj: Invitation):
         if obj.note:
@@ -53,15 +158,7 @@ class InvitationAdmin(admin.ModelAdmin):
     note_display.short_description = "Комментарий гостя"
 
     def public_link(self, obj: Invitation):
-        from django.conf import settings
-        # Получаем домен из настроек
-        if hasattr(settings, 'ALLOWED_HOSTS') and settings.ALLOWED_HOSTS:
-            domain = settings.ALLOWED_HOSTS[0]
-        else:
-            domain = 'wedding-oleksandr-kateryna.com'
-        
-        protocol = 'https' if not settings.DEBUG else 'http'
-        full_url = f"{protocol}://{domain}/Invitation/{obj.token}/"
+        full_url = invitation_public_url(obj.token)
         return format_html('<a href="{}" target="_blank" style="word-break: break-all;">{}</a>', full_url, full_url)
     public_link.short_description = "Ссылка для отправки"
     public_link.admin_order_field = 'token'  # Позволяет сортировать по токену
@@ -102,11 +199,54 @@ class InvitationAdmin(admin.ModelAdmin):
     answers_table.short_description = "Вопросы и ответы"
 
 
+GUEST_INDEX_PER_PAGE = 50
+
+
+def responded_guests(search: str = ""):
+    """
+    Гости, ответившие хотя бы на одно приглашение, по алфавиту.
+    Дубликаты убирает GROUP BY в БД; время последнего ответа и его
+    комментарий — аннотации того же запроса.
+    """
+    latest = Invitation.objects.filter(guest=OuterRef("pk"), responded_at__isnull=False).order_by("-responded_at")
+    guests = Guest.objects.filter(invitations__responded_at__isnull=False)
+    if search:
+        guests = guests.filter(full_name__icontains=search)
+    return (
+        guests.annotate(
+            last_responded_at=Max("invitations__responded_at"),
+            last_note=Subquery(latest.values("note")[:1]),
+        )
+        .order_by("full_name", "pk")
+        .only("id", "full_name")
+    )
+
+
+class AnswerGuestFilter(admin.SimpleListFilter):
+    """
+    Фильтр по гостю без списка всех гостей в боковой панели: показывает
+    только выбранного (одним запросом), выбор — из списка ответивших.
+    """
+    title = "Гость"
+    parameter_name = "invitation__guest__id__exact"
+
+    def lookups(self, request, model_admin):
+        value = self.value()
+        if not value or not value.isdigit():
+            return []
+        return list(Guest.objects.filter(pk=value).values_list("pk", "full_name"))
+
+    def queryset(self, request, queryset):
+        # фильтрация — в AnswerAdmin.get_queryset
+        return queryset
+
+
 @admin.register(Answer)
 class AnswerAdmin(admin.ModelAdmin):
     list_display = ("guest_name", "question", "choice", "note_display")
     search_fields = ("invitation__guest__full_name", "invitation__token", "question__text", "choice__text")
-    list_filter = ("invitation__guest", "question", "choice")
+    list_filter = (AnswerGuestFilter, "question", "choice")
+    autocomplete_fields = ("invitation",)
     list_display_links = ("guest_name",)
     change_list_template = "admin/invitations/answer/change_list.html"
     actions_on_top = True
@@ -114,6 +254,12 @@ class AnswerAdmin(admin.ModelAdmin):
     list_per_page = 25
     actions = [delete_selected]  # Явно включаем стандартное действие удаления
     
+    def lookup_allowed(self, lookup, value, request=None):
+        # параметр фильтра по гостю сохранил прежнее имя (ссылки из шаблона)
+        if lookup == AnswerGuestFilter.parameter_name:
+            return True
+        return super().lookup_allowed(lookup, value, request)
+
     def guest_name(self, obj):
         return obj.invitation.guest.full_name
     guest_name.short_description = "Гость"
@@ -130,6 +276,12 @@ class AnswerAdmin(admin.ModelAdmin):
         qs = super().get_queryset(request)
         qs = qs.filter(invitation__responded_at__isnull=False).select_related('invitation', 'invitation__guest', 'question', 'choice')
         
+        # Остальное (страница ответа, удаление) работает с полным queryset,
+        # иначе открытие ответа из списка уводило на главную админки
+        url_name = getattr(request.resolver_match, 'url_name', None)
+        if url_name != 'invitations_answer_changelist':
+            return qs
+
         # Если выбран конкретный гость, фильтруем по нему
         guest_filter = request.GET.get('invitation__guest__id__exact', None)
         if guest_filter:
@@ -141,29 +293,38 @@ class AnswerAdmin(admin.ModelAdmin):
         return qs
     
     def changelist_view(self, request, extra_context=None):
-        if extra_context is None:
-            extra_context = {}
-        
-        # Получаем список уникальных гостей, которые ответили
-        answered_invitations = Invitation.objects.filter(responded_at__isnull=False).select_related('guest').distinct().order_by('guest__full_name')
-        guests_with_answers = list(set([inv.guest for inv in answered_invitations]))  # Убираем дубликаты
-        
-        # Добавляем список гостей в контекст для отображения
-        extra_context['guests_with_answers'] = guests_with_answers
-        
-        # Проверяем, выбран ли конкретный гость
-        guest_filter = request.GET.get('invitation__guest__id__exact', None)
-        
-        # Если выбран конкретный гость, показываем его ответы
-        if guest_filter:
-            try:
-                invitation = Invitation.objects.filter(guest_id=guest_filter, responded_at__isnull=False).first()
-                if invitation:
-                    extra_context['selected_guest_note'] = invitation.note if invitation.note else ""
-                    extra_context['selected_guest'] = invitation.guest.full_name
-                    extra_context['selected_guest_id'] = guest_filter
-            except:
-                pass
-        
+        # Пока гость не выбран, вместо таблицы ответов — указатель ответивших гостей
+        guest_filter = request.GET.get(AnswerGuestFilter.parameter_name)
+        if not guest_filter:
+            return self.guest_index_view(request)
+
         response = super().changelist_view(request, extra_context)
+        cl = getattr(response, "context_data", {}).get("cl")
+        if cl is not None:
+            # имя, время ответа и комментарий — из уже загруженных строк (select_related)
+            invitations = sorted({a.invitation for a in cl.result_list}, key=lambda inv: inv.responded_at, reverse=True)
+            names = [label for spec in cl.filter_specs if isinstance(spec, AnswerGuestFilter) for _, label in spec.lookup_choices]
+            response.context_data.update({
+                "selected_guest_id": guest_filter,
+                "selected_guest": invitations[0].guest.full_name if invitations else (names[0] if names else ""),
+                "selected_guest_note": invitations[0].note if invitations else "",
+                "selected_guest_responded_at": invitations[0].responded_at if invitations else None,
+            })
         return response
+
+    def guest_index_view(self, request):
+        """Ответившие гости: одна выборка с GROUP BY по гостю, поиск и постраничный вывод."""
+        if not self.has_view_or_change_permission(request):
+            raise PermissionDenied
+        search = request.GET.get("q", "").strip()
+        guests = responded_guests(search)
+        page = Paginator(guests, GUEST_INDEX_PER_PAGE).get_page(request.GET.get("p"))
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": "Ответы гостей",
+            "page": page,
+            "search": search,
+            "guest_param": AnswerGuestFilter.parameter_name,
+        }
+        return TemplateResponse(request, "admin/invitations/answer/guest_index.html", context)
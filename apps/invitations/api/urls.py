@@ -10,5 +10,6 @@ app_name = 'invitations'
 # The API URLs are now determined automatically by the router.
 urlpatterns = [
     # api/invitations/..
-  
+    path('questionnaire/', views.questionnaire_schema, name='questionnaire_schema'),
+    path('<str:token>/guest/', views.guest_data, name='guest_data'),
 ] + router.urls
@@ -1,3 +1,57 @@
-from django.shortcuts import render
+from django.middleware.csrf import get_token
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import condition
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
 
-# Create your views here.
+from apps.invitations.models import Guest, Invitation
+from apps.invitations.questionnaire import get_index
+from apps.invitations.tracking import tracker
+from apps.main.devices import classify_request
+
+
+def _questionnaire_etag(request):
+    return str(get_index().version)
+
+
+@condition(etag_func=_questionnaire_etag)
+@api_view(['GET'])
+def questionnaire_schema(request):
+    """Схема анкеты с id вопросов и вариантов для payload v2 (кэшируемая)"""
+    response = Response(get_index().schema())
+    response['Cache-Control'] = 'public, max-age=300'
+    return response
+
+
+@api_view(['GET'])
+def guest_data(request, token):
+    """Данные гостя для страницы-оболочки: имя, токен и текущее состояние RSVP"""
+    invitation = get_object_or_404(Invitation.objects.select_related('guest'), token=token)
+    guest = invitation.guest
+
+    # страница-оболочка не знает гостя, поэтому открытие отмечаем здесь (JS боты превью не выполняют)
+    device = classify_request(request)
+    if not device.bot:
+        tracker.record(invitation.token, device.device)
+
+    answers = {}
+    for question_id, choice_id in invitation.answers.values_list('question_id', 'choice_id'):
+        answers.setdefault(str(question_id), []).append(choice_id)
+
+    salutation = 'Дорогий' if guest.gender == Guest.Gender.MALE else 'Дорога'
+    response = Response({
+        'token': invitation.token,
+        'name': guest.full_name,
+        'name_genitive': guest.name_genitive,
+        'gender': guest.gender,
+        'greeting': f'{salutation} {guest.full_name}!',
+        'csrf_token': get_token(request),
+        'rsvp': {
+            'status': invitation.status,
+            'responded_at': invitation.responded_at,
+            'note': invitation.note,
+            'answers': answers,
+        },
+    })
+    response['Cache-Control'] = 'private, no-store'
+    return response
@@ -0,0 +1,220 @@
+"""
+Нагрузочный прогон пользовательских сценариев в процессе (команда bench_flows).
+
+Засевает N гостей с приглашениями на анкете create_questions, часть из них
+сразу отвечает, и проигрывает смесь запросов тестовым клиентом Django:
+открытие приглашения, главная, отправка RSVP и списки админки. Смесь
+задаётся весами (TRAFFIC_MIX), порядок — random.Random(seed), так что
+прогон повторяем. На каждый запрос замеряются время и число SQL-запросов
+(connection.execute_wrapper). По сценарию считаются пропускная способность,
+p50/p95/p99 и максимум запросов.
+
+Базовая линия — JSON {сценарий: {"queries": max, "p95_ms": ...}}
+(bench_baseline.json, записана bench_flows --update-baseline с параметрами
+по умолчанию). Число запросов детерминировано и сравнивается строго; p95
+сравнивается с допуском (tolerance, по умолчанию +50%). Время зависит от
+машины: на CI базовую линию стоит перезаписать один раз на его железе.
+"""
+from __future__ import annotations
+
+import json
+import random
+import statistics
+import time
+from dataclasses import dataclass, field
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from .models import Guest, Invitation, Question, allocate_tokens
+from .questionnaire import get_index, invalidate_questionnaire
+from .services import QueryCounter, ingest_rsvp
+from .tracking import tracker
+
+
+BENCH_PREFIX = "bench-flows-"
+BENCH_ADMIN = "bench-flows-admin"
+
+BASELINE_PATH = Path(__file__).with_name("bench_baseline.json")
+
+# доли запросов в смеси: гости в основном открывают приглашения
+TRAFFIC_MIX = {
+    "invitation_page": 55,
+    "index": 15,
+    "submit_rsvp": 20,
+    "admin_guests": 4,
+    "admin_invitations": 3,
+    "admin_answers": 3,
+}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def full_payload(index, note: str = "benchmark"):
+    """Полная анкета в формате v2: первый вариант в каждом вопросе, все — в MULTI."""
+    answers = {}
+    for question in index.questions:
+        if not question.choices:
+            continue
+        if question.kind == Question.Kind.MULTI:
+            answers[str(question.id)] = [c.id for c in question.choices]
+        else:
+            answers[str(question.id)] = [question.choices[0].id]
+    return {"version": 2, "answers": answers, "note": note}
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    latencies_ms: list = field(default_factory=list)
+    queries: list = field(default_factory=list)
+    errors: int = 0
+
+    def summary(self) -> dict:
+        latencies = self.latencies_ms
+        busy = sum(latencies) / 1000
+        return {
+            "requests": len(latencies),
+            "errors": self.errors,
+            "rps": round(len(latencies) / busy, 1) if busy else 0.0,
+            "p50_ms": round(statistics.median(latencies), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "queries": max(self.queries),
+            "mean_queries": round(statistics.fmean(self.queries), 2),
+        }
+
+
+@dataclass
+class BenchReport:
+    elapsed: float
+    scenarios: dict[str, ScenarioResult]
+
+    @property
+    def total(self) -> int:
+        return sum(len(result.latencies_ms) for result in self.scenarios.values())
+
+    def summary(self) -> dict:
+        return {name: result.summary() for name, result in sorted(self.scenarios.items()) if result.latencies_ms}
+
+
+def ensure_questionnaire() -> None:
+    if not get_index().questions:
+        call_command("create_questions", stdout=StringIO())
+        call_command("add_companion_choices", stdout=StringIO())
+        invalidate_questionnaire()
+
+
+def seed(guests: int, responded: float = 0.3) -> list[str]:
+    """Гости с приглашениями (BENCH_PREFIX); доля responded сразу отвечает. Возвращает токены."""
+    ensure_questionnaire()
+    created = Guest.objects.bulk_create(
+        [Guest(full_name=f"{BENCH_PREFIX}{i}") for i in range(guests)]
+    )
+    invitations = Invitation.objects.bulk_create(
+        [Invitation(guest=guest, token=token) for guest, token in zip(created, allocate_tokens(len(created)))]
+    )
+    index = get_index()
+    for invitation in invitations[:int(len(invitations) * responded)]:
+        ingest_rsvp(invitation, full_payload(index))
+    return [invitation.token for invitation in invitations]
+
+
+def cleanup() -> None:
+    # открытия из буфера трекера пишутся до удаления приглашений
+    tracker.flush()
+    Guest.objects.filter(full_name__startswith=BENCH_PREFIX).delete()
+    get_user_model().objects.filter(username=BENCH_ADMIN).delete()
+
+
+def _requests(tokens: list[str], count: int, rng: random.Random):
+    """(сценарий, метод, url, тело) для count запросов по смеси TRAFFIC_MIX."""
+    names = list(TRAFFIC_MIX)
+    picks = rng.choices(names, weights=[TRAFFIC_MIX[name] for name in names], k=count)
+    index = get_index()
+    admin_urls = {
+        "admin_guests": reverse("admin:invitations_guest_changelist"),
+        "admin_invitations": reverse("admin:invitations_invitation_changelist"),
+        "admin_answers": reverse("admin:invitations_answer_changelist"),
+    }
+    for number, name in enumerate(picks):
+        token = rng.choice(tokens)
+        if name == "invitation_page":
+            yield name, "get", reverse("invitation_page", args=[token]), None
+        elif name == "index":
+            yield name, "get", reverse("index"), None
+        elif name == "submit_rsvp":
+            body = json.dumps(full_payload(index, note=f"benchmark {number}"))
+            yield name, "post", reverse("submit_rsvp", args=[token]), body
+        else:
+            yield name, "get", admin_urls[name], None
+
+
+def run(tokens: list[str], requests: int, seed_value: int = 0) -> BenchReport:
+    """Проигрывает requests запросов смеси по приглашениям tokens."""
+    rng = random.Random(seed_value)
+    guest_client = Client()
+    admin_client = Client()
+    admin, _ = get_user_model().objects.get_or_create(
+        username=BENCH_ADMIN, defaults={"is_staff": True, "is_superuser": True},
+    )
+    admin_client.force_login(admin)
+
+    scenarios = {name: ScenarioResult(name) for name in TRAFFIC_MIX}
+    plan = list(_requests(tokens, requests, rng))
+    # бенчмарк меряет приложение, а не лимиты: все запросы идут с одного IP
+    with override_settings(ALLOWED_HOSTS=["testserver"], RSVP_THROTTLE_RATES={"token": "", "ip": ""}):
+        started = time.perf_counter()
+        for name, method, url, body in plan:
+            client = admin_client if name.startswith("admin_") else guest_client
+            counter = QueryCounter()
+            request_started = time.perf_counter()
+            with connection.execute_wrapper(counter):
+                if method == "post":
+                    response = client.post(url, data=body, content_type="application/json")
+                else:
+                    response = client.get(url)
+            result = scenarios[name]
+            result.latencies_ms.append((time.perf_counter() - request_started) * 1000)
+            result.queries.append(counter.count)
+            if response.status_code >= 400:
+                result.errors += 1
+        elapsed = time.perf_counter() - started
+    return BenchReport(elapsed=elapsed, scenarios=scenarios)
+
+
+def load_baseline(path: Path = BASELINE_PATH) -> dict:
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(summary: dict, path: Path = BASELINE_PATH) -> None:
+    baseline = {name: {"queries": row["queries"], "p95_ms": row["p95_ms"]} for name, row in summary.items()}
+    Path(path).write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+def regressions(summary: dict, baseline: dict, tolerance: float = 0.5) -> list[str]:
+    """Описания превышений базовой линии; пустой список — всё в норме."""
+    problems = []
+    for name, row in summary.items():
+        if row["errors"]:
+            problems.append(f"{name}: {row['errors']} ответов с ошибкой")
+        expected = baseline.get(name)
+        if not expected:
+            continue
+        if row["queries"] > expected["queries"]:
+            problems.append(f"{name}: {row['queries']} SQL-запросов, базовая линия {expected['queries']}")
+        limit = expected.get("p95_ms")
+        if limit and row["p95_ms"] > limit * (1 + tolerance):
+            problems.append(f"{name}: p95 {row['p95_ms']} мс, базовая линия {limit} мс (+{tolerance:.0%})")
+    return problems
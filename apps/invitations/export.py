@@ -0,0 +1,213 @@
+"""
+Выгрузка ответов RSVP таблицей «гость × вопрос» для кейтеринга и трансфера.
+
+Строка — приглашение, столбец — вопрос (все Question по order), варианты
+MULTI-вопросов через запятую. Ответы берутся из RsvpSummary.selections,
+а не из Answer: строки приглашений читаются одним запросом через
+iterator(chunk_size), плюс по запросу на вопросы и варианты. Число запросов
+не зависит от числа гостей, память — от размера одной пачки.
+
+CSV пишется построчно (с BOM, чтобы Excel понял UTF-8). XLSX собирается без
+сторонних библиотек: лист — SpreadsheetML со строками inlineStr, zip пишется
+в поток по мере генерации строк (zipfile умеет писать в неперематываемый
+поток). Используется действиями админки и manage.py export_rsvp.
+"""
+from __future__ import annotations
+
+import csv
+import re
+import zipfile
+from itertools import chain
+from xml.sax.saxutils import escape
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import Choice, Invitation, Question
+
+
+EXPORT_CHUNK_SIZE = 2000
+
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+FIXED_COLUMNS = ("Гість", "Статус", "Відповідь отримано", "Супутників (+1)")
+NOTE_COLUMN = "Коментар"
+
+
+def _format_datetime(value) -> str:
+    return timezone.localtime(value).strftime("%Y-%m-%d %H:%M") if value else ""
+
+
+def export_table(invitations, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """
+    (заголовок, ленивый итератор строк) по queryset приглашений.
+    Вопросы и варианты читаются сразу, строки — при итерации.
+    """
+    questions = list(Question.objects.order_by("order", "id").values_list("id", "text"))
+    choices = {
+        choice_id: (order, text)
+        for choice_id, order, text in Choice.objects.values_list("id", "order", "text")
+    }
+    header = [*FIXED_COLUMNS, *(text for _, text in questions), NOTE_COLUMN]
+    statuses = dict(Invitation.Status.choices)
+
+    def cells(selections, question_id):
+        ids = (selections or {}).get(str(question_id), ())
+        picked = sorted((choices[choice_id] for choice_id in ids if choice_id in choices), key=lambda c: c[0])
+        return ", ".join(text for _, text in picked)
+
+    def rows():
+        values = invitations.order_by("guest__full_name", "pk").values_list(
+            "guest__full_name", "status", "responded_at", "rsvp_summary__companions",
+            "rsvp_summary__selections", "note",
+        )
+        for name, status, responded_at, companions, selections, note in values.iterator(chunk_size=chunk_size):
+            yield [
+                name,
+                statuses.get(status, status),
+                _format_datetime(responded_at),
+                companions or 0,
+                *(cells(selections, question_id) for question_id, _ in questions),
+                note,
+            ]
+
+    return header, rows()
+
+
+# --- CSV ------------------------------------------------------------------------
+
+class _Echo:
+    """Псевдо-файл для csv.writer: writerow возвращает готовую строку."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(header, rows):
+    writer = csv.writer(_Echo())
+    yield "\ufeff" + writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+# --- XLSX -------------------------------------------------------------------------
+
+XLSX_PARTS = (
+    ("[Content_Types].xml",
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+     '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+     '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+     '<Default Extension="xml" ContentType="application/xml"/>'
+     '<Override PartName="/xl/workbook.xml" '
+     'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+     '<Override PartName="/xl/worksheets/sheet1.xml" '
+     'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+     '</Types>'),
+    ("_rels/.rels",
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+     '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+     '<Relationship Id="rId1" '
+     'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+     'Target="xl/workbook.xml"/>'
+     '</Relationships>'),
+    ("xl/workbook.xml",
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+     '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+     'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+     '<sheets><sheet name="RSVP" sheetId="1" r:id="rId1"/></sheets>'
+     '</workbook>'),
+    ("xl/_rels/workbook.xml.rels",
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+     '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+     '<Relationship Id="rId1" '
+     'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+     'Target="worksheets/sheet1.xml"/>'
+     '</Relationships>'),
+)
+SHEET_NAME = "xl/worksheets/sheet1.xml"
+SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<sheetViews><sheetView workbookViewId="0"><pane ySplit="1" topLeftCell="A2" state="frozen"/></sheetView></sheetViews>'
+    '<sheetData>'
+).encode()
+SHEET_TAIL = b"</sheetData></worksheet>"
+
+# управляющие символы запрещены в XML 1.0
+_XML_ILLEGAL = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def column_letter(index: int) -> str:
+    """0 -> A, 25 -> Z, 26 -> AA."""
+    letters = ""
+    index += 1
+    while index:
+        index, rest = divmod(index - 1, 26)
+        letters = chr(65 + rest) + letters
+    return letters
+
+
+def _xlsx_cell(ref: str, value) -> str:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f'<c r="{ref}"><v>{value}</v></c>'
+    text = escape(_XML_ILLEGAL.sub("", str(value if value is not None else "")))
+    return f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(number: int, row) -> bytes:
+    cells = "".join(_xlsx_cell(f"{column_letter(i)}{number}", value) for i, value in enumerate(row))
+    return f'<row r="{number}">{cells}</row>'.encode()
+
+
+class _Sink:
+    """Неперематываемый поток для zipfile: копит байты до следующего yield."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def iter_xlsx(header, rows, flush_every: int = 200):
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, body in XLSX_PARTS:
+            archive.writestr(name, body)
+        with archive.open(SHEET_NAME, "w", force_zip64=True) as sheet:
+            sheet.write(SHEET_HEAD)
+            for number, row in enumerate(chain([header], rows), start=1):
+                sheet.write(_xlsx_row(number, row))
+                if number % flush_every == 0:
+                    yield sink.drain()
+            sheet.write(SHEET_TAIL)
+    yield sink.drain()
+
+
+def iter_export(invitations, fmt: str, chunk_size: int = EXPORT_CHUNK_SIZE):
+    header, rows = export_table(invitations, chunk_size=chunk_size)
+    if fmt == "xlsx":
+        return iter_xlsx(header, rows)
+    return (line.encode("utf-8") for line in iter_csv(header, rows))
+
+
+def export_filename(fmt: str) -> str:
+    return f"rsvp-{timezone.localdate():%Y-%m-%d}.{fmt}"
+
+
+def streaming_response(invitations, fmt: str) -> StreamingHttpResponse:
+    response = StreamingHttpResponse(iter_export(invitations, fmt), content_type=FORMATS[fmt])
+    response["Content-Disposition"] = f'attachment; filename="{export_filename(fmt)}"'
+    return response
@@ -0,0 +1,232 @@
+"""
+Массовый импорт гостей из CSV/XLSX с созданием приглашений.
+
+Файл читается построчно (CSV — csv.DictReader, XLSX — разбор листа через
+iterparse, без сторонних библиотек), строки приводятся к полям Guest по
+заголовкам (укр./рус./англ.). Гости и приглашения пишутся bulk_create
+пачками в одной транзакции; токены выделяются заранее пачками через
+models.allocate_tokens — один запрос на проверку занятости на пачку,
+вместо INSERT с надеждой на уникальный индекс. Guest.save при bulk_create
+не вызывается, поэтому родительный падеж имени считается здесь же.
+
+Используется командой manage.py import_guests и страницей импорта в админке.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import posixpath
+import re
+import zipfile
+from dataclasses import dataclass, field
+from xml.etree.ElementTree import fromstring, iterparse
+
+from django.conf import settings
+from django.db import transaction
+
+from apps.main.utils import ua_genitive_phrase
+
+from .models import Guest, Invitation, allocate_tokens
+
+
+IMPORT_CHUNK_SIZE = 1000
+# строк в одном INSERT: ограничивает размер запроса при любом chunk_size
+IMPORT_BATCH_SIZE = 500
+
+# заголовок столбца (нормализованный) -> поле Guest
+HEADER_ALIASES = {
+    "full_name": "full_name", "name": "full_name", "гість": "full_name", "ім'я": "full_name",
+    "ім’я": "full_name", "піб": "full_name", "гость": "full_name", "имя": "full_name", "фио": "full_name",
+    "gender": "gender", "стать": "gender", "рід": "gender", "пол": "gender",
+    "email": "email", "e-mail": "email", "пошта": "email", "почта": "email",
+    "telegram": "telegram", "телеграм": "telegram",
+    "instagram": "instagram", "інстаграм": "instagram", "инстаграм": "instagram",
+}
+GENDER_ALIASES = {
+    "male": Guest.Gender.MALE, "m": Guest.Gender.MALE, "ч": Guest.Gender.MALE, "м": Guest.Gender.MALE,
+    "чоловічий": Guest.Gender.MALE, "мужской": Guest.Gender.MALE,
+    "female": Guest.Gender.FEMALE, "f": Guest.Gender.FEMALE, "ж": Guest.Gender.FEMALE,
+    "жіночий": Guest.Gender.FEMALE, "женский": Guest.Gender.FEMALE,
+}
+OPTIONAL_FIELDS = ("email", "telegram", "instagram")
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+@dataclass
+class ImportReport:
+    created: list = field(default_factory=list)  # [(full_name, token)]
+    skipped: list = field(default_factory=list)  # [(номер строки, причина)]
+
+
+def invitation_public_url(token: str) -> str:
+    """Ссылка для отправки гостю (домен — первый из ALLOWED_HOSTS)."""
+    domain = settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else "wedding-oleksandr-kateryna.com"
+    protocol = "https" if not settings.DEBUG else "http"
+    return f"{protocol}://{domain}/Invitation/{token}/"
+
+
+# --- чтение файлов -----------------------------------------------------------------
+
+def read_rows(fileobj, filename: str):
+    """Строки файла как dict {заголовок: значение}; формат — по расширению."""
+    if filename.lower().endswith(".xlsx"):
+        return read_xlsx(fileobj)
+    return read_csv(fileobj)
+
+
+def read_csv(fileobj):
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    try:
+        sample = text.read(4096)
+    except UnicodeDecodeError as exc:
+        raise ImportFormatError("CSV должен быть в кодировке UTF-8") from exc
+    text.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    yield from csv.DictReader(text, dialect=dialect)
+
+
+_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_CELL_COLUMN = re.compile(r"[A-Z]+")
+
+
+def _column_index(ref: str) -> int:
+    index = 0
+    for letter in _CELL_COLUMN.match(ref).group(0):
+        index = index * 26 + ord(letter) - 64
+    return index - 1
+
+
+def _first_sheet_path(archive) -> str:
+    workbook = archive.read("xl/workbook.xml")
+    rels = archive.read("xl/_rels/workbook.xml.rels")
+    sheet = fromstring(workbook).find(f"{_NS}sheets/{_NS}sheet")
+    rel_id = sheet.get(f"{_REL_NS}id")
+    for rel in fromstring(rels):
+        if rel.get("Id") == rel_id:
+            target = rel.get("Target")
+            return target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+    raise ImportFormatError("в книге нет листов")
+
+
+def _shared_strings(archive) -> list[str]:
+    if "xl/sharedStrings.xml" not in archive.namelist():
+        return []
+    strings = []
+    with archive.open("xl/sharedStrings.xml") as fh:
+        for _, element in iterparse(fh):
+            if element.tag == f"{_NS}si":
+                strings.append("".join(t.text or "" for t in element.iter(f"{_NS}t")))
+                element.clear()
+    return strings
+
+
+def read_xlsx(fileobj):
+    """Первый лист; первая строка — заголовки. Читается потоково (iterparse)."""
+    try:
+        archive = zipfile.ZipFile(fileobj)
+    except zipfile.BadZipFile as exc:
+        raise ImportFormatError("файл не похож на XLSX") from exc
+    with archive:
+        shared = _shared_strings(archive)
+        header = None
+        with archive.open(_first_sheet_path(archive)) as fh:
+            for _, element in iterparse(fh):
+                if element.tag != f"{_NS}row":
+                    continue
+                values = {}
+                for position, cell in enumerate(element.iter(f"{_NS}c")):
+                    ref = cell.get("r")
+                    column = _column_index(ref) if ref else position
+                    kind = cell.get("t")
+                    if kind == "inlineStr":
+                        value = "".join(t.text or "" for t in cell.iter(f"{_NS}t"))
+                    else:
+                        raw = cell.findtext(f"{_NS}v") or ""
+                        value = shared[int(raw)] if kind == "s" and raw else raw
+                    values[column] = value
+                element.clear()
+                if header is None:
+                    header = values
+                    continue
+                yield {name: values.get(column, "") for column, name in header.items()}
+
+
+# --- импорт -----------------------------------------------------------------------------
+
+def _normalize_header(name) -> str:
+    return " ".join(str(name or "").split()).casefold()
+
+
+def guest_from_row(row: dict) -> Guest:
+    data = {}
+    for name, value in row.items():
+        target = HEADER_ALIASES.get(_normalize_header(name))
+        if target and target not in data:
+            data[target] = " ".join(str(value or "").split())
+    if not data.get("full_name"):
+        raise ValueError("нет имени гостя")
+
+    gender = ""
+    if data.get("gender"):
+        gender = GENDER_ALIASES.get(data["gender"].casefold())
+        if gender is None:
+            raise ValueError(f"непонятный пол: {data['gender']}")
+
+    full_name = data["full_name"]
+    return Guest(
+        full_name=full_name,
+        gender=gender,
+        # bulk_create не вызывает Guest.save
+        full_name_genitive=ua_genitive_phrase(full_name, gender),
+        **{name: data.get(name) or None for name in OPTIONAL_FIELDS},
+    )
+
+
+def _flush(guests: list[Guest], report: ImportReport) -> None:
+    Guest.objects.bulk_create(guests, batch_size=IMPORT_BATCH_SIZE)
+    invitations = [
+        Invitation(guest=guest, token=token)
+        for guest, token in zip(guests, allocate_tokens(len(guests)))
+    ]
+    Invitation.objects.bulk_create(invitations, batch_size=IMPORT_BATCH_SIZE)
+    report.created.extend((guest.full_name, invitation.token) for guest, invitation in zip(guests, invitations))
+    guests.clear()
+
+
+def import_guests(rows, chunk_size: int = IMPORT_CHUNK_SIZE) -> ImportReport:
+    """
+    Создаёт гостя и приглашение на каждую строку. Строки с ошибками
+    пропускаются (с номером строки в отчёте), всё остальное — одна транзакция.
+    """
+    report = ImportReport()
+    pending: list[Guest] = []
+    with transaction.atomic():
+        # строка 1 — заголовок
+        for line, row in enumerate(rows, start=2):
+            try:
+                pending.append(guest_from_row(row))
+            except ValueError as exc:
+                report.skipped.append((line, str(exc)))
+                continue
+            if len(pending) >= chunk_size:
+                _flush(pending, report)
+        if pending:
+            _flush(pending, report)
+    return report
+
+
+def links_csv(report: ImportReport) -> str:
+    """CSV «имя, токен, ссылка» по результату импорта (с BOM для Excel)."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["Гість", "Токен", "Посилання"])
+    for full_name, token in report.created:
+        writer.writerow([full_name, token, invitation_public_url(token)])
+    return "\ufeff" + buffer.getvalue()
@@ -0,0 +1,56 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.invitations import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Проигрывает смесь запросов (приглашение, главная, RSVP, списки админки) в процессе на N гостях, '
+        'печатает пропускную способность, p50/p95/p99 и число SQL-запросов и сравнивает с базовой линией'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--guests', type=int, default=200, help='число гостей (приглашений)')
+        parser.add_argument('--requests', type=int, default=1000, help='всего запросов в смеси')
+        parser.add_argument('--responded', type=float, default=0.3, help='доля гостей, ответивших до прогона')
+        parser.add_argument('--seed', type=int, default=0, help='зерно порядка запросов')
+        parser.add_argument('--baseline', default=str(benchmark.BASELINE_PATH), help='JSON базовой линии')
+        parser.add_argument('--tolerance', type=float, default=0.5, help='допуск по p95 (0.5 — +50%%)')
+        parser.add_argument('--update-baseline', action='store_true', help='записать результат как базовую линию')
+        parser.add_argument('--json', action='store_true', help='вывести сводку JSON-ом')
+
+    def handle(self, *args, **options):
+        try:
+            tokens = benchmark.seed(options['guests'], options['responded'])
+            report = benchmark.run(tokens, options['requests'], options['seed'])
+        finally:
+            benchmark.cleanup()
+
+        summary = report.summary()
+        if options['json']:
+            self.stdout.write(json.dumps(summary, indent=2, ensure_ascii=False))
+        else:
+            self.stdout.write(
+                f'Гостей: {options["guests"]}, запросов: {report.total} за {report.elapsed:.2f} с, '
+                f'{report.total / report.elapsed:.1f} запр/с'
+            )
+            self.stdout.write(f'{"сценарий":<18} {"запр.":>6} {"запр/с":>8} {"p50":>8} {"p95":>8} {"p99":>8} {"SQL":>4}')
+            for name, row in summary.items():
+                self.stdout.write(
+                    f'{name:<18} {row["requests"]:>6} {row["rps"]:>8.1f} {row["p50_ms"]:>8.2f} '
+                    f'{row["p95_ms"]:>8.2f} {row["p99_ms"]:>8.2f} {row["queries"]:>4}'
+                )
+
+        baseline_path = Path(options['baseline'])
+        if options['update_baseline']:
+            benchmark.save_baseline(summary, baseline_path)
+            self.stdout.write(self.style.SUCCESS(f'Базовая линия записана в {baseline_path}'))
+            return
+
+        problems = benchmark.regressions(summary, benchmark.load_baseline(baseline_path), options['tolerance'])
+        if problems:
+            raise CommandError('Хуже базовой линии:\n' + '\n'.join(problems))
+        self.stdout.write(self.style.SUCCESS('В пределах базовой линии'))
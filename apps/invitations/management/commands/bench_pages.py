@@ -0,0 +1,110 @@
+import asyncio
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from apps.invitations.benchmark import full_payload, percentile
+from apps.invitations.models import Guest, Invitation
+from apps.invitations.questionnaire import get_index
+
+
+BENCH_PREFIX = "bench-pages-"
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает WSGI и ASGI обработку приглашений в процессе: N гостей параллельно '
+        'открывают страницу и отправляют RSVP'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--guests', type=int, default=50, help='число гостей (приглашений)')
+        parser.add_argument('--concurrency', type=int, default=16, help='одновременных гостей')
+        parser.add_argument('--mode', choices=['wsgi', 'asgi', 'both'], default='both')
+
+    def handle(self, *args, **options):
+        if not get_index().questions:
+            self.stdout.write(self.style.ERROR('Анкета пуста, сначала выполните create_questions'))
+            return
+
+        body = json.dumps(full_payload(get_index()))
+
+        modes = ['wsgi', 'asgi'] if options['mode'] == 'both' else [options['mode']]
+        try:
+            # тестовые клиенты ходят с Host: testserver и с одного IP — лимиты RSVP отключены
+            with override_settings(ALLOWED_HOSTS=['testserver'], RSVP_THROTTLE_RATES={}):
+                for mode in modes:
+                    # свои приглашения на каждый режим, чтобы оба начинали с холодного кэша страниц
+                    tokens = self._create_invitations(mode, options['guests'])
+                    runner = self._run_wsgi if mode == 'wsgi' else self._run_asgi
+                    started = time.perf_counter()
+                    latencies = runner(tokens, body, options['concurrency'])
+                    self._report(mode, latencies, time.perf_counter() - started)
+        finally:
+            Guest.objects.filter(full_name__startswith=BENCH_PREFIX).delete()
+
+    def _create_invitations(self, mode, count):
+        guests = Guest.objects.bulk_create(
+            [Guest(full_name=f'{BENCH_PREFIX}{mode}-{i}') for i in range(count)]
+        )
+        return [Invitation.objects.create(guest=guest).token for guest in guests]
+
+    def _run_wsgi(self, tokens, body, concurrency):
+        def visit(token):
+            client = Client()
+            try:
+                return self._timed_sync(client, token, body)
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(visit, tokens))
+        return [latency for pair in results for latency in pair]
+
+    def _run_asgi(self, tokens, body, concurrency):
+        async def main():
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def visit(token):
+                async with semaphore:
+                    return await self._timed_async(AsyncClient(), token, body)
+
+            return await asyncio.gather(*(visit(token) for token in tokens))
+
+        results = asyncio.run(main())
+        return [latency for pair in results for latency in pair]
+
+    def _timed_sync(self, client, token, body):
+        latencies = []
+        started = time.perf_counter()
+        client.get(reverse('invitation_page', args=[token]))
+        latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        client.post(reverse('submit_rsvp', args=[token]), data=body, content_type='application/json')
+        latencies.append((time.perf_counter() - started) * 1000)
+        return latencies
+
+    async def _timed_async(self, client, token, body):
+        latencies = []
+        started = time.perf_counter()
+        await client.get(reverse('invitation_page', args=[token]))
+        latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await client.post(reverse('submit_rsvp', args=[token]), data=body, content_type='application/json')
+        latencies.append((time.perf_counter() - started) * 1000)
+        return latencies
+
+    def _report(self, mode, latencies, elapsed):
+        self.stdout.write(
+            f'{mode.upper()}: {len(latencies)} запросов за {elapsed:.2f} с, '
+            f'{len(latencies) / elapsed:.1f} запр/с, '
+            f'p50 {statistics.median(latencies):.1f} мс, p99 {percentile(latencies, 99):.1f} мс'
+        )
@@ -0,0 +1,86 @@
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections
+
+from apps.invitations.benchmark import full_payload
+from apps.invitations.models import Guest, Invitation
+from apps.invitations.questionnaire import get_index
+from apps.invitations.services import ingest_rsvp
+
+
+BENCH_PREFIX = "bench-rsvp-"
+
+
+class Command(BaseCommand):
+    help = 'Замеряет пропускную способность приёма RSVP при N параллельных писателях на текущей БД'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8, help='число параллельных потоков')
+        parser.add_argument('--submissions', type=int, default=25, help='RSVP на один поток')
+        parser.add_argument('--keep', action='store_true', help='не удалять созданных гостей')
+
+    def handle(self, *args, **options):
+        writers = options['writers']
+        submissions = options['submissions']
+
+        index = get_index()
+        if not index.questions:
+            self.stdout.write(self.style.ERROR('Анкета пуста, сначала выполните create_questions'))
+            return
+        payload = full_payload(index)
+
+        guests = Guest.objects.bulk_create(
+            [Guest(full_name=f'{BENCH_PREFIX}{i}') for i in range(writers)]
+        )
+        invitations = [Invitation.objects.create(guest=guest) for guest in guests]
+
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(writers)
+
+        def worker(invitation):
+            local, failed = [], 0
+            try:
+                barrier.wait()
+                for _ in range(submissions):
+                    started = time.perf_counter()
+                    try:
+                        ingest_rsvp(invitation, payload)
+                    except OperationalError:
+                        failed += 1
+                        continue
+                    local.append((time.perf_counter() - started) * 1000)
+            finally:
+                connections.close_all()
+            with lock:
+                latencies.extend(local)
+                errors.append(failed)
+
+        threads = [threading.Thread(target=worker, args=(inv,)) for inv in invitations]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        if not options['keep']:
+            Guest.objects.filter(full_name__startswith=BENCH_PREFIX).delete()
+
+        db = settings.DATABASES['default']
+        self.stdout.write(f'БД: {connection.vendor} ({db["ENGINE"]})')
+        self.stdout.write(f'Писателей: {writers}, RSVP на писателя: {submissions}')
+        self.stdout.write(f'Успешно: {len(latencies)}, ошибок блокировки: {sum(errors)}')
+        if latencies:
+            latencies.sort()
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            self.stdout.write(f'Пропускная способность: {len(latencies) / elapsed:.1f} RSVP/с')
+            self.stdout.write(
+                f'Задержка, мс: p50 {statistics.median(latencies):.1f}, '
+                f'p95 {p95:.1f}, max {latencies[-1]:.1f}'
+            )
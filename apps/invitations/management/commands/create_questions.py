@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from apps.invitations.models import Question, Choice
+from apps.invitations.questionnaire import invalidate_questionnaire
 
 
 class Command(BaseCommand):
@@ -73,5 +74,6 @@ class Command(BaseCommand):
             Choice.objects.get_or_create(question=q6, text="Ні", defaults={'order': 2})
             self.stdout.write(self.style.SUCCESS(f'Создан вопрос: {q6.text}'))
 
+        invalidate_questionnaire()
         self.stdout.write(self.style.SUCCESS('Все вопросы созданы!'))
 
@@ -0,0 +1,38 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from apps.invitations.export import EXPORT_CHUNK_SIZE, FORMATS, export_filename, iter_export
+from apps.invitations.models import Invitation
+
+
+class Command(BaseCommand):
+    help = 'Выгружает ответы RSVP таблицей «гость × вопрос» (CSV или XLSX) потоком, в постоянной памяти'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--output', '-o', help='файл; "-" — stdout (по умолчанию rsvp-<дата>.<формат>)')
+        parser.add_argument('--all', action='store_true', help='включая приглашения без ответа')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        fmt = options['format']
+        invitations = Invitation.objects.all()
+        if not options['all']:
+            invitations = invitations.filter(responded_at__isnull=False)
+
+        output = options['output'] or export_filename(fmt)
+        chunks = iter_export(invitations, fmt, chunk_size=options['chunk_size'])
+        if output == '-':
+            stream = getattr(self.stdout, 'buffer', None) or sys.stdout.buffer
+            for chunk in chunks:
+                stream.write(chunk)
+            stream.flush()
+            return
+
+        size = 0
+        with open(output, 'wb') as fh:
+            for chunk in chunks:
+                fh.write(chunk)
+                size += len(chunk)
+        self.stdout.write(self.style.SUCCESS(f'Выгружено в {output} ({size / 1024:.1f} КБ)'))
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.invitations.guest_import import IMPORT_CHUNK_SIZE, ImportFormatError, import_guests, links_csv, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Импортирует гостей из CSV/XLSX, создаёт им приглашения и сохраняет CSV со ссылками'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='файл .csv или .xlsx (первая строка — заголовки)')
+        parser.add_argument('--links', default='invitation-links.csv', help='куда записать ссылки ("-" — stdout)')
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            with open(options['path'], 'rb') as fh:
+                report = import_guests(read_rows(fh, options['path']), chunk_size=options['chunk_size'])
+        except (OSError, ImportFormatError) as exc:
+            raise CommandError(f'Не удалось прочитать {options["path"]}: {exc}')
+        elapsed = time.perf_counter() - started
+
+        for line, reason in report.skipped:
+            self.stderr.write(f'Строка {line} пропущена: {reason}')
+
+        links = links_csv(report)
+        if options['links'] == '-':
+            self.stdout.write(links, ending='')
+        else:
+            with open(options['links'], 'w', encoding='utf-8', newline='') as fh:
+                fh.write(links)
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано гостей и приглашений: {len(report.created)}, пропущено строк: {len(report.skipped)} '
+            f'за {elapsed:.2f} с; ссылки: {options["links"]}'
+        ))
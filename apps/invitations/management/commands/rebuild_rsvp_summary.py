@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.invitations.models import Answer, Choice, ChoiceTotal, Invitation, RsvpSummary
+from apps.invitations.summary import compute_all
+
+
+class Command(BaseCommand):
+    help = 'Сверяет RsvpSummary/ChoiceTotal с исходными Answer и пересобирает расхождения'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='только сверить (ошибка, если есть расхождения)')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        expected, totals = compute_all(Invitation, Answer, Choice, chunk_size=options['chunk_size'])
+
+        stored = {s.invitation_id: s for s in RsvpSummary.objects.all().iterator(chunk_size=options['chunk_size'])}
+        fields = ('status', 'attending', 'selections', 'companions', 'has_note')
+
+        missing = [pk for pk in expected if pk not in stored]
+        stale = [pk for pk in stored if pk not in expected]
+        changed = [
+            pk for pk, data in expected.items()
+            if pk in stored and any(getattr(stored[pk], f) != v for f, v in data.as_fields().items())
+        ]
+
+        choice_ids = list(Choice.objects.values_list('id', flat=True))
+        counts = dict(ChoiceTotal.objects.values_list('choice_id', 'count'))
+        wrong_totals = [pk for pk in choice_ids if counts.get(pk) != totals.get(pk, 0)]
+
+        self.stdout.write(
+            f'Сводок: ожидается {len(expected)}, в БД {len(stored)}; '
+            f'нет {len(missing)}, лишних {len(stale)}, расходится {len(changed)}; '
+            f'неверных счётчиков вариантов: {len(wrong_totals)}'
+        )
+        problems = len(missing) + len(stale) + len(changed) + len(wrong_totals)
+        if not problems:
+            self.stdout.write(self.style.SUCCESS('Сводка совпадает с ответами'))
+            return
+        if options['check']:
+            raise CommandError(f'Сводка RSVP расходится с ответами ({problems})')
+
+        with transaction.atomic():
+            # сигнал post_delete сдвинул бы счётчики, но они всё равно пишутся заново ниже
+            RsvpSummary.objects.filter(pk__in=stale)._raw_delete(RsvpSummary.objects.db)
+            RsvpSummary.objects.bulk_create(
+                [RsvpSummary(invitation_id=pk, **expected[pk].as_fields()) for pk in missing],
+                batch_size=500,
+            )
+            to_update = []
+            for pk in changed:
+                summary = stored[pk]
+                for name, value in expected[pk].as_fields().items():
+                    setattr(summary, name, value)
+                to_update.append(summary)
+            RsvpSummary.objects.bulk_update(to_update, fields, batch_size=500)
+
+            ChoiceTotal.objects.bulk_create(
+                [ChoiceTotal(choice_id=pk, count=totals.get(pk, 0)) for pk in wrong_totals],
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=['choice'],
+                update_fields=['count'],
+            )
+
+        self.stdout.write(self.style.SUCCESS(f'Исправлено: {problems}'))
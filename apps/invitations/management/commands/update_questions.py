@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from apps.invitations.models import Question
+from apps.invitations.questionnaire import invalidate_questionnaire
 
 
 class Command(BaseCommand):
@@ -28,6 +29,9 @@ class Command(BaseCommand):
             else:
                 self.stdout.write(f'Вопрос 5 уже имеет правильный текст: "{q5.text}"')
 
+        # сбрасываем скомпилированный индекс анкеты (см. questionnaire.py)
+        invalidate_questionnaire()
+
         # Проверяем все вопросы
         self.stdout.write("\nВсе активные вопросы в БД:")
         for q in Question.objects.filter(is_active=True).order_by('id'):
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invitations', '0004_alter_answer_unique_together'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invitation',
+            name='last_device',
+            field=models.CharField(blank=True, default='', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='invitation',
+            name='last_opened_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='invitation',
+            name='open_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
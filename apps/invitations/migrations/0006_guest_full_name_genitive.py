@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:49
+
+from django.db import migrations, models
+
+from apps.main.inflection import genitive
+
+
+def fill_genitive(apps, schema_editor):
+    Guest = apps.get_model('invitations', 'Guest')
+    guests = list(Guest.objects.only('id', 'full_name', 'gender'))
+    for guest in guests:
+        guest.full_name_genitive = genitive(guest.full_name, guest.gender)
+    Guest.objects.bulk_update(guests, ['full_name_genitive'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invitations', '0005_invitation_open_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='guest',
+            name='full_name_genitive',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(fill_genitive, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from apps.invitations.summary import compute_all
+
+
+def fill_summary(apps, schema_editor):
+    Invitation = apps.get_model('invitations', 'Invitation')
+    Answer = apps.get_model('invitations', 'Answer')
+    Choice = apps.get_model('invitations', 'Choice')
+    RsvpSummary = apps.get_model('invitations', 'RsvpSummary')
+    ChoiceTotal = apps.get_model('invitations', 'ChoiceTotal')
+
+    summaries, totals = compute_all(Invitation, Answer, Choice)
+    RsvpSummary.objects.bulk_create(
+        [RsvpSummary(invitation_id=pk, **data.as_fields()) for pk, data in summaries.items()],
+        batch_size=500,
+    )
+    ChoiceTotal.objects.bulk_create(
+        [ChoiceTotal(choice_id=pk, count=totals.get(pk, 0)) for pk in Choice.objects.values_list('id', flat=True)],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invitations', '0006_guest_full_name_genitive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChoiceTotal',
+            fields=[
+                ('choice', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='total', serialize=False, to='invitations.choice')),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RsvpSummary',
+            fields=[
+                ('invitation', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rsvp_summary', serialize=False, to='invitations.invitation')),
+                ('status', models.CharField(choices=[('pending', 'В ожидании'), ('accepted', 'Приняли'), ('declined', 'Отклонили')], default='pending', max_length=20)),
+                ('attending', models.BooleanField(null=True)),
+                ('selections', models.JSONField(default=dict)),
+                ('companions', models.PositiveSmallIntegerField(default=0)),
+                ('has_note', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(fill_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:15
+
+from django.db import migrations, models
+
+from apps.invitations.questionnaire import normalize_text
+
+
+def fill_normalized_text(apps, schema_editor):
+    for name in ('Question', 'Choice'):
+        model = apps.get_model('invitations', name)
+        rows = list(model.objects.only('id', 'text'))
+        for row in rows:
+            row.normalized_text = normalize_text(row.text)
+        model.objects.bulk_update(rows, ['normalized_text'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invitations', '0007_rsvp_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='choice',
+            name='normalized_text',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='normalized_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(fill_normalized_text, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='choice',
+            index=models.Index(fields=['question', 'normalized_text'], name='choice_question_normalized'),
+        ),
+        migrations.AddIndex(
+            model_name='invitation',
+            index=models.Index(condition=models.Q(('responded_at__isnull', False)), fields=['status', 'responded_at'], name='invitation_responded_status'),
+        ),
+        migrations.AddIndex(
+            model_name='invitation',
+            index=models.Index(condition=models.Q(('responded_at__isnull', False)), fields=['guest', 'responded_at'], name='invitation_guest_responded'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['order', 'id'], name='question_active_order'),
+        ),
+    ]
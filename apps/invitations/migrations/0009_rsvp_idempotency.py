@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invitations', '0008_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invitation',
+            name='payload_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='invitation',
+            name='submission_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='invitation',
+            name='submission_response',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invitations', '0009_rsvp_idempotency'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='guest',
+            name='gender',
+            field=models.CharField(blank=True, choices=[('male', 'Чоловічий'), ('female', 'Жіночий')], default='', max_length=10, verbose_name='Рід'),
+        ),
+    ]
@@ -5,6 +5,10 @@ import secrets
 from django.db import models
 from django.utils import timezone
 
+from apps.main.utils import ua_genitive_phrase
+
+from .questionnaire import normalize_text
+
 
 class Guest(models.Model):
     class Gender(models.TextChoices):
@@ -12,16 +16,59 @@ class Guest(models.Model):
         FEMALE = "female", "Жіночий"
     
     full_name = models.CharField(max_length=255)
-    gender = models.CharField(max_length=10, choices=Gender.choices, default=Gender.FEMALE, verbose_name="Рід")
+    # пустой — род неизвестен: фамилия склоняется по прежним эвристикам
+    gender = models.CharField(max_length=10, choices=Gender.choices, blank=True, default="", verbose_name="Рід")
+    # "Запрошення для ..." — считается при сохранении, чтобы рендер страницы не склонял имя
+    full_name_genitive = models.CharField(max_length=255, blank=True, default="", editable=False)
     # контакты опционально (для тебя)
     email = models.EmailField(blank=True, null=True)
     telegram = models.CharField(max_length=255, blank=True, null=True)
     instagram = models.CharField(max_length=255, blank=True, null=True)
 
+    @property
+    def name_genitive(self) -> str:
+        # гости из bulk_create/старых миграций могут быть без сохранённой формы
+        return self.full_name_genitive or ua_genitive_phrase(self.full_name, self.gender)
+
+    def save(self, *args, **kwargs):
+        self.full_name_genitive = ua_genitive_phrase(self.full_name, self.gender)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"full_name", "gender"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "full_name_genitive"}
+        super().save(*args, **kwargs)
+
     def __str__(self) -> str:
         return self.full_name
 
 
+def generate_token() -> str:
+    # 10-14 символов обычно достаточно, но можно 16+
+    return secrets.token_urlsafe(9)[:12]  # например: 'ABCD1234EfGh'
+
+
+# кандидатов на одну проверку (держит IN (...) в лимите параметров SQLite)
+TOKEN_BATCH_SIZE = 5000
+
+
+def allocate_tokens(count: int) -> list[str]:
+    """
+    count уникальных токенов, которых ещё нет в БД: кандидаты генерируются
+    пачками в памяти, занятые отсеиваются одним запросом на пачку.
+    """
+    tokens: list[str] = []
+    seen: set[str] = set()
+    while len(tokens) < count:
+        batch = set()
+        while len(batch) < min(count - len(tokens), TOKEN_BATCH_SIZE):
+            token = generate_token()
+            if token not in seen:
+                batch.add(token)
+                seen.add(token)
+        taken = set(Invitation.objects.filter(token__in=batch).values_list("token", flat=True))
+        tokens.extend(token for token in batch if token not in taken)
+    return tokens
+
+
 class Invitation(models.Model):
     class Status(models.TextChoices):
         PENDING = "pending", "В ожидании"
@@ -34,22 +81,42 @@ class Invitation(models.Model):
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
 
     opened_at = models.DateTimeField(blank=True, null=True)
+    # статистика открытий (пишется пачками, см. tracking.py)
+    last_opened_at = models.DateTimeField(blank=True, null=True)
+    open_count = models.PositiveIntegerField(default=0)
+    last_device = models.CharField(max_length=10, blank=True, default="")
     responded_at = models.DateTimeField(blank=True, null=True)
 
     # общий текст, который гость написал в конце
     note = models.TextField(blank=True, default="")
 
+    # идемпотентность RSVP: ключ отправки от клиента, хэш payload и отданный ответ;
+    # повтор того же payload отдаётся из submission_response без записи (services.replay_response)
+    submission_key = models.CharField(max_length=64, blank=True, default="", editable=False)
+    payload_hash = models.CharField(max_length=64, blank=True, default="", editable=False)
+    submission_response = models.JSONField(default=dict, blank=True, editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # выборки ответивших: сводка, выгрузка, AnswerAdmin, фильтр по статусу
+            models.Index(fields=["status", "responded_at"], name="invitation_responded_status",
+                         condition=models.Q(responded_at__isnull=False)),
+            # последний ответ гостя (указатель гостей в AnswerAdmin)
+            models.Index(fields=["guest", "responded_at"], name="invitation_guest_responded",
+                         condition=models.Q(responded_at__isnull=False)),
+        ]
+
     def ensure_token(self) -> None:
         if not self.token:
-            # 10-14 символов обычно достаточно, но можно 16+
-            self.token = secrets.token_urlsafe(9)[:12]  # например: 'ABCD1234EfGh'
+            self.token = allocate_tokens(1)[0]
+
+    def mark_opened(self, device: str = ""):
+        """Ставит открытие в очередь трекера, запрос не ждёт записи в БД."""
+        from .tracking import tracker
 
-    def mark_opened(self):
-        if not self.opened_at:
-            self.opened_at = timezone.now()
-            self.save(update_fields=["opened_at"])
+        tracker.record(self.token, device)
 
     def mark_responded(self):
         self.responded_at = timezone.now()
@@ -72,6 +139,20 @@ class Question(models.Model):
     order = models.PositiveIntegerField(default=0)
     is_active = models.BooleanField(default=True)
     kind = models.CharField(max_length=10, choices=Kind.choices, default=Kind.SINGLE)
+    # normalize_text(text) — для поиска без учёта регистра (icontains в SQLite не понимает кириллицу)
+    normalized_text = models.TextField(blank=True, default="", editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["order", "id"], name="question_active_order", condition=models.Q(is_active=True)),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.normalized_text = normalize_text(self.text)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "text" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "normalized_text"}
+        super().save(*args, **kwargs)
 
     def __str__(self) -> str:
         return self.text[:80]
@@ -85,6 +166,19 @@ class Choice(models.Model):
     question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name="choices")
     text = models.CharField(max_length=255)
     order = models.PositiveIntegerField(default=0)
+    normalized_text = models.CharField(max_length=255, blank=True, default="", editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["question", "normalized_text"], name="choice_question_normalized"),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.normalized_text = normalize_text(self.text)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "text" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "normalized_text"}
+        super().save(*args, **kwargs)
 
     def __str__(self) -> str:
         return f"{self.question_id}: {self.text}"
@@ -99,9 +193,42 @@ class Answer(models.Model):
     choice = models.ForeignKey(Choice, on_delete=models.PROTECT)
 
     class Meta:
+        # индекс unique_answer начинается с (invitation, question) и обслуживает
+        # выборки и DELETE ответов приглашения по вопросам — отдельный не нужен
         constraints = [
             models.UniqueConstraint(fields=['invitation', 'question', 'choice'], name='unique_answer')
         ]
 
     def __str__(self) -> str:
         return f"{self.invitation_id} -> {self.question_id}: {self.choice.text}"
+
+
+class RsvpSummary(models.Model):
+    """
+    Денормализованная сводка RSVP одного приглашения.
+
+    Пишется в той же транзакции, что и ответы (см. summary.py), поэтому
+    дашборд и выгрузки не сканируют Answer. Сверка и пересборка —
+    manage.py rebuild_rsvp_summary.
+    """
+    invitation = models.OneToOneField(Invitation, on_delete=models.CASCADE, primary_key=True, related_name="rsvp_summary")
+    status = models.CharField(max_length=20, choices=Invitation.Status.choices, default=Invitation.Status.PENDING)
+    # None — гость ещё не ответил на вопрос о присутствии
+    attending = models.BooleanField(null=True)
+    # {"<question_id>": [choice_id, ...]} — выбранные варианты по вопросам
+    selections = models.JSONField(default=dict)
+    companions = models.PositiveSmallIntegerField(default=0)
+    has_note = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.invitation_id}: {self.status}"
+
+
+class ChoiceTotal(models.Model):
+    """Сколько приглашений выбрали вариант; счётчик двигается вместе с RsvpSummary."""
+    choice = models.OneToOneField(Choice, on_delete=models.CASCADE, primary_key=True, related_name="total")
+    count = models.IntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f"{self.choice_id}: {self.count}"
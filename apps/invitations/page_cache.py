@@ -0,0 +1,179 @@
+"""
+Кэш отрендеренных страниц приглашений.
+
+Страница зависит только от гостя (имя, родительный падеж, род), токена,
+класса устройства и версии анкеты, поэтому HTML рендерится один раз и
+кладётся в отдельный кэш Django (settings.INVITATION_PAGE_CACHE) по ключу
+(версия анкеты, штамп гостя, устройство, токен). Вытеснение — LRU-отсечение
+LocMemCache по MAX_ENTRIES плюс TIMEOUT.
+
+Кэш страниц у каждого воркера свой, поэтому правка гостя не удаляет
+страницы, а меняет штамп токена в общем кэше штампов
+(settings.QUESTIONNAIRE_VERSION_CACHE, как и штамп анкеты): ключ меняется
+у всех процессов сразу, старые копии просто перестают читаться и
+вытесняются сами.
+
+CSRF-токен и абсолютный URL различаются между запросами, поэтому при
+рендере вместо них ставятся заглушки, которые подменяются при отдаче.
+
+В режиме оболочки (settings.INVITATION_SHELL_MODE) страница вообще не
+содержит данных гостя: это один документ на класс устройства с ETag,
+а имя, токен и состояние RSVP приходят JSON-ом из api/invitations/.
+Отдаётся она только по существующему токену (token_exists): найденные
+токены запоминаются в кэше страниц под тем же штампом токена.
+
+Модалка RSVP (invitations/modal.html) в страницу не входит: это общий
+для всех гостей фрагмент, который JS подгружает при первом намерении
+открыть форму; он кэшируется так же, как оболочка.
+"""
+from __future__ import annotations
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response
+from django.utils.html import escape
+
+from apps.main import metrics
+from apps.main.devices import DEVICE_VARY
+from .models import Invitation
+from .questionnaire import current_version
+
+
+CSRF_PLACEHOLDER = "@@csrf-token@@"
+URL_PLACEHOLDER = "@@absolute-url@@"
+
+MODAL_TEMPLATE = "invitations/modal.html"
+
+TEMPLATES = {
+    "mobile": "main/home_mobile.html",
+    "pc": "main/home_pc.html",
+}
+
+
+def get_cache():
+    return caches[settings.INVITATION_PAGE_CACHE]
+
+
+def get_stamps():
+    return caches[settings.QUESTIONNAIRE_VERSION_CACHE]
+
+
+def stamp_key(token: str) -> str:
+    return f"invitation-page-stamp:{token}"
+
+
+def page_key(token: str, device: str, version: int, stamp: int = 0) -> str:
+    return f"invitation-page:{version}:{stamp}:{device}:{token}"
+
+
+def _current_key(token: str, device: str) -> str:
+    # 0 — страницу гостя ещё ни разу не инвалидировали
+    return page_key(token, device, current_version(), get_stamps().get(stamp_key(token), 0))
+
+
+def get_page(token: str, device: str) -> str | None:
+    return get_cache().get(_current_key(token, device))
+
+
+def store_page(token: str, device: str, html: str) -> None:
+    get_cache().set(_current_key(token, device), html)
+
+
+async def token_exists(token: str) -> bool:
+    """Есть ли приглашение с токеном; найденное помнится до инвалидации токена."""
+    key = f"invitation-token:{get_stamps().get(stamp_key(token), 0)}:{token}"
+    if get_cache().get(key):
+        return True
+    exists = await Invitation.objects.filter(token=token).aexists()
+    if exists:
+        get_cache().set(key, True)
+    return exists
+
+
+def render_page(invitation, device: str) -> str:
+    """Рендерит страницу приглашения с заглушками вместо CSRF-токена и URL."""
+    guest = invitation.guest
+    with metrics.template_render():
+        return render_to_string(
+            TEMPLATES[device],
+            {
+                "invitation": invitation,
+                "guest": guest,
+                "token": invitation.token,
+                "absolute_url": URL_PLACEHOLDER,
+                "csrf_token": CSRF_PLACEHOLDER,
+                # ✅ ВАЖНО: имя в родительном падеже для preview/карточек ссылок
+                "guest_name_for_link": guest.name_genitive if guest else "",
+            },
+        )
+
+
+def personalize(html: str, request) -> str:
+    """Подставляет в закэшированный HTML данные текущего запроса."""
+    return (
+        html
+        .replace(CSRF_PLACEHOLDER, get_token(request))
+        .replace(URL_PLACEHOLDER, escape(request.build_absolute_uri()))
+    )
+
+
+def invalidate_tokens(tokens) -> None:
+    """Меняет штампы токенов: закэшированные страницы устаревают во всех процессах."""
+    stamp = time.time_ns()
+    stamps = {stamp_key(token): stamp for token in tokens}
+    if stamps:
+        # без срока: истёкший штамп вернул бы ключ к странице до инвалидации
+        get_stamps().set_many(stamps, timeout=None)
+
+
+def get_shell(device: str) -> tuple[str, str]:
+    """HTML оболочки для класса устройства и его ETag."""
+    key = f"invitation-shell:{device}"
+    shell = get_cache().get(key)
+    if shell is None:
+        with metrics.template_render():
+            html = render_to_string(TEMPLATES[device], {"shell": True, "csrf_token": ""})
+        etag = '"%s"' % hashlib.sha256(html.encode("utf-8")).hexdigest()[:32]
+        shell = (html, etag)
+        get_cache().set(key, shell, timeout=None)
+    return shell
+
+
+def shell_response(request, device: str) -> HttpResponse:
+    """Общая для всех гостей страница: 304 при совпадении ETag, можно класть в общий кэш."""
+    html, etag = get_shell(device)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(html)
+    response["ETag"] = etag
+    response["Vary"] = DEVICE_VARY
+    response["Cache-Control"] = f"public, max-age={settings.INVITATION_SHELL_MAX_AGE}"
+    return response
+
+
+def get_modal() -> tuple[str, str]:
+    """HTML фрагмента модалки RSVP и его ETag (ключ зависит от версии анкеты)."""
+    key = f"invitation-modal:{current_version()}"
+    modal = get_cache().get(key)
+    if modal is None:
+        html = render_to_string(MODAL_TEMPLATE)
+        etag = '"%s"' % hashlib.sha256(html.encode("utf-8")).hexdigest()[:32]
+        modal = (html, etag)
+        get_cache().set(key, modal, timeout=None)
+    return modal
+
+
+def modal_response(request) -> HttpResponse:
+    html, etag = get_modal()
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(html)
+    response["ETag"] = etag
+    response["Cache-Control"] = f"public, max-age={settings.INVITATION_MODAL_MAX_AGE}"
+    return response
@@ -0,0 +1,273 @@
+"""
+Скомпилированный индекс анкеты (активные Question + Choice).
+
+Индекс строится лениво в каждом процессе и хранит словари по точному и
+нормализованному тексту, поэтому сопоставление ответов RSVP не читает БД.
+Версия индекса — хэш содержимого анкеты: у процессов с одинаковой анкетой
+она одна и та же, и ключи кэша страниц (page_cache) совпадают.
+
+Изменения Question/Choice (админка, management-команды) сбрасывают индекс
+через сигналы: локальная копия выбрасывается сразу, а штамп инвалидации
+меняется в кэше settings.QUESTIONNAIRE_VERSION_CACHE. Если этот кэш общий
+(Redis, Memcached, база), остальные процессы перестраивают индекс на
+следующем запросе. Кэш по умолчанию — LocMem, он у каждого процесса свой,
+поэтому индекс дополнительно живёт не дольше QUESTIONNAIRE_INDEX_TTL секунд:
+другие воркеры увидят правку не позже чем через этот срок.
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from dataclasses import dataclass, field
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+
+VERSION_CACHE_KEY = "invitations:questionnaire:version"
+
+# версия формата RSVP-payload с id вопросов/вариантов (см. services.ingest_rsvp)
+PROTOCOL_VERSION = 2
+
+# ищем мягко (вхождение), чтобы не сломалось из-за "?" и пробелов
+ATTENDANCE_Q_TEXT = "Чи зможете ви бути присутніми на весіллі"
+# вопрос о спутниках узнаём по "+1" в тексте (как и при разборе ответов)
+COMPANION_Q_MARKER = "+1"
+
+# сколько результатов нечёткого поиска запоминать на одну версию индекса
+FUZZY_MEMO_SIZE = 512
+
+
+def normalize_text(text: str) -> str:
+    """Схлопывает пробелы и приводит к нижнему регистру (casefold)."""
+    return " ".join((text or "").split()).casefold()
+
+
+@dataclass(frozen=True)
+class CompiledChoice:
+    id: int
+    text: str
+    order: int
+    normalized: str
+
+
+@dataclass(frozen=True)
+class CompiledQuestion:
+    id: int
+    text: str
+    kind: str
+    order: int
+    normalized: str
+    choices: tuple[CompiledChoice, ...]
+    choices_by_id: dict = field(repr=False, compare=False)
+    choices_by_text: dict = field(repr=False, compare=False)
+    choices_by_normalized: dict = field(repr=False, compare=False)
+
+    def choice_by_text(self, text: str):
+        return self.choices_by_text.get(text)
+
+    def choice_texts(self) -> list[str]:
+        return [c.text for c in self.choices]
+
+
+class QuestionnaireIndex:
+    """Неизменяемый снимок активной анкеты с поиском по словарям."""
+
+    def __init__(self, questions: list[CompiledQuestion], stamp=None, expires: float = float("inf")):
+        self.questions = tuple(questions)
+        self.version = content_version(self.questions)
+        # штамп инвалидации, при котором индекс построен, и срок жизни (time.monotonic)
+        self.stamp = stamp
+        self.expires = expires
+        self.by_id = {q.id: q for q in self.questions}
+        self.exact = {q.text.strip(): q for q in self.questions}
+        self.normalized = {q.normalized: q for q in self.questions}
+
+        needle = normalize_text(ATTENDANCE_Q_TEXT)
+        self.attendance_question = next((q for q in self.questions if needle in q.normalized), None)
+        self.companion_question = next((q for q in self.questions if COMPANION_Q_MARKER in q.text), None)
+
+        self._fuzzy: dict = {}
+        self._fuzzy_lock = threading.Lock()
+        self._schema = None
+
+    def schema(self) -> dict:
+        """JSON-схема анкеты для клиента (id и тексты вопросов/вариантов)."""
+        if self._schema is None:
+            self._schema = {
+                "protocol": PROTOCOL_VERSION,
+                "version": self.version,
+                "attendance_question": self.attendance_question.id if self.attendance_question else None,
+                "questions": [
+                    {
+                        "id": q.id,
+                        "text": q.text,
+                        "kind": q.kind,
+                        "order": q.order,
+                        "choices": [{"id": c.id, "text": c.text, "order": c.order} for c in q.choices],
+                    }
+                    for q in self.questions
+                ],
+            }
+        return self._schema
+
+    def _memo(self, key, compute):
+        try:
+            return self._fuzzy[key]
+        except KeyError:
+            pass
+        value = compute()
+        with self._fuzzy_lock:
+            if len(self._fuzzy) < FUZZY_MEMO_SIZE:
+                self._fuzzy[key] = value
+        return value
+
+    def find_question(self, q_text: str):
+        """Точное совпадение → нормализованное → частичное (запоминается)."""
+        question = self.exact.get(q_text)
+        if question:
+            return question
+
+        normalized = normalize_text(q_text)
+        question = self.normalized.get(normalized)
+        if question:
+            return question
+
+        def partial():
+            for q in self.questions:
+                if normalized in q.normalized or q.normalized in normalized:
+                    return q
+            return None
+
+        return self._memo(("q", normalized), partial)
+
+    def find_attendance_choice(self, attendance: str):
+        """iexact, затем совпадение по первым 10 символам."""
+        question = self.attendance_question
+        if not question:
+            return None
+
+        normalized = normalize_text(attendance)
+        choice = question.choices_by_normalized.get(normalized)
+        if choice:
+            return choice
+
+        def by_prefix():
+            prefix = normalized[:10]
+            return next((c for c in question.choices if c.normalized.startswith(prefix)), None)
+
+        return self._memo(("att", normalized), by_prefix)
+
+    def find_single_choice(self, question: CompiledQuestion, value: str):
+        """Точный текст → текст до "(" → частичное совпадение (запоминается)."""
+        choice = question.choice_by_text(value)
+        if choice:
+            return choice
+
+        def fuzzy():
+            base_text = value.split("(", 1)[0].strip()
+            if base_text and base_text != value:
+                found = question.choice_by_text(base_text)
+                if found:
+                    return found
+            return next((c for c in question.choices if c.text in value or value in c.text), None)
+
+        return self._memo(("single", question.id, value), fuzzy)
+
+
+def content_version(questions) -> int:
+    """Хэш содержимого анкеты; 52 бита — точное целое и в JSON для JS."""
+    digest = hashlib.sha256()
+    for q in questions:
+        digest.update(repr((q.id, q.text, q.kind, q.order)).encode("utf-8"))
+        for c in q.choices:
+            digest.update(repr((c.id, c.text, c.order)).encode("utf-8"))
+    return int(digest.hexdigest()[:13], 16)
+
+
+def _build(stamp) -> QuestionnaireIndex:
+    from .models import Question
+
+    compiled = []
+    qs = Question.objects.filter(is_active=True).prefetch_related("choices").order_by("order", "id")
+    for q in qs:
+        choices = tuple(
+            CompiledChoice(id=c.id, text=c.text, order=c.order, normalized=c.normalized_text or normalize_text(c.text))
+            for c in sorted(q.choices.all(), key=lambda c: (c.order, c.id))
+        )
+        by_text = {}
+        by_normalized = {}
+        for c in choices:
+            by_text.setdefault(c.text, c)
+            by_normalized.setdefault(c.normalized, c)
+        compiled.append(CompiledQuestion(
+            id=q.id,
+            text=q.text,
+            kind=q.kind,
+            order=q.order,
+            normalized=q.normalized_text or normalize_text(q.text),
+            choices=choices,
+            choices_by_id={c.id: c for c in choices},
+            choices_by_text=by_text,
+            choices_by_normalized=by_normalized,
+        ))
+    return QuestionnaireIndex(compiled, stamp=stamp, expires=time.monotonic() + settings.QUESTIONNAIRE_INDEX_TTL)
+
+
+_index: QuestionnaireIndex | None = None
+_lock = threading.Lock()
+
+
+def _stamps():
+    return caches[settings.QUESTIONNAIRE_VERSION_CACHE]
+
+
+def current_version() -> int:
+    """
+    Версия (хэш содержимого) анкеты, с которой работает процесс. Уже
+    построенный индекс не перепроверяется, поэтому в async-коде это не
+    обращается к БД после aget_index().
+    """
+    index = _index
+    return index.version if index is not None else get_index().version
+
+
+def _fresh(index, stamp) -> bool:
+    return index is not None and index.stamp == stamp and time.monotonic() < index.expires
+
+
+def get_index() -> QuestionnaireIndex:
+    """
+    Возвращает индекс анкеты, перестраивая его после инвалидации (в том
+    числе в другом процессе, через общий штамп) или по истечении TTL.
+    """
+    global _index
+    stamp = _stamps().get(VERSION_CACHE_KEY)
+    index = _index
+    if _fresh(index, stamp):
+        return index
+
+    with _lock:
+        index = _index
+        if not _fresh(index, stamp):
+            index = _build(stamp)
+            _index = index
+    return index
+
+
+async def aget_index() -> QuestionnaireIndex:
+    """get_index для async-представлений: в sync-поток уходит только перестройка."""
+    index = _index
+    if _fresh(index, _stamps().get(VERSION_CACHE_KEY)):
+        return index
+    return await sync_to_async(get_index)()
+
+
+def invalidate_questionnaire(**kwargs) -> None:
+    """Сбрасывает индекс в этом процессе и меняет штамп инвалидации для остальных."""
+    global _index
+    with _lock:
+        _index = None
+    _stamps().set(VERSION_CACHE_KEY, time.time_ns(), timeout=None)
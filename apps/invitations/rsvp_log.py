@@ -0,0 +1,61 @@
+"""
+Структурный лог приёма RSVP: одно JSON-событие на отправку.
+
+Событие пишется в логгер apps.invitations.rsvp уровнем INFO и содержит
+исход (saved/replayed/throttled/...), счётчики RsvpReport, причины
+пропусков и время. Строка JSON собирается только если запись реально
+уйдёт в обработчик (lazy __str__), а при выключенном INFO — не
+собирается вообще; словарь события доступен обработчикам как record.event.
+
+Подробная трассировка сопоставления (какие значения не нашлись и какие
+варианты были доступны) собирается, только если логгер включён на DEBUG
+или отправка попала в выборку RSVP_LOG_SAMPLE_RATE; иначе services не
+вычисляет даже списки вариантов.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import random
+
+from django.conf import settings
+
+
+logger = logging.getLogger("apps.invitations.rsvp")
+
+
+class JsonEvent:
+    """Отложенная сериализация: json.dumps вызывается при форматировании записи."""
+
+    __slots__ = ("event",)
+
+    def __init__(self, event: dict):
+        self.event = event
+
+    def __str__(self) -> str:
+        return json.dumps(self.event, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def should_trace() -> bool:
+    if logger.isEnabledFor(logging.DEBUG):
+        return True
+    rate = settings.RSVP_LOG_SAMPLE_RATE
+    return rate > 0 and random.random() < rate
+
+
+def token_label(token: str) -> str:
+    # токен — это доступ к приглашению, в лог идёт только префикс
+    return token[:4] + "…" if token else ""
+
+
+def log_submission(outcome: str, token: str, report=None, **fields) -> None:
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    event = {"event": "rsvp.submit", "outcome": outcome, "token": token_label(token), **fields}
+    if report is not None:
+        event.update(report.as_dict())
+        if report.reasons:
+            event["skip_reasons"] = dict(report.reasons)
+        if report.trace:
+            event["trace"] = report.trace
+    logger.info("%s", JsonEvent(event), extra={"event": event})
@@ -0,0 +1,352 @@
+"""
+Приём RSVP-ответов.
+
+Вопросы и варианты берутся из скомпилированного индекса анкеты
+(см. questionnaire.py), поэтому сопоставление не читает БД, а запись — это
+один UPDATE приглашения, один DELETE и один bulk_create в одной транзакции,
+плюс запись сводки RsvpSummary и сдвиг счётчиков ChoiceTotal (summary.py).
+Количество запросов не зависит от того, сколько ответов прислал гость.
+
+Повтор той же отправки (двойной клик, ретрай мобильной сети) не пишет
+ничего: view сравнивает хэш payload и ключ отправки (Idempotency-Key) с
+сохранёнными в Invitation и отдаёт сохранённый ответ (replay_response);
+ingest_rsvp записывает ключ, хэш и ответ тем же UPDATE приглашения.
+
+Поддерживаются два формата payload:
+
+* v2 — ``{"version": 2, "answers": {"<question_id>": [<choice_id>, ...]}, "note": ""}``,
+  проверка идёт по id за O(ответов) без текстовых эвристик;
+* старый текстовый — ``{"attendance": "...", "answers": {"текст вопроса": ...}, "note": ""}``,
+  его разбирает адаптер с прежними правилами сопоставления по тексту.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Invitation, Question, Answer
+from .questionnaire import (
+    ATTENDANCE_Q_TEXT,
+    PROTOCOL_VERSION,
+    CompiledChoice,
+    CompiledQuestion,
+    QuestionnaireIndex,
+    get_index,
+)
+from .summary import apply_rsvp
+
+
+class PayloadError(ValueError):
+    """Payload RSVP имеет неверную структуру (ответ 400)."""
+
+
+class IdempotencyConflict(Exception):
+    """Ключ отправки уже использован с другим payload (ответ 422)."""
+
+
+@dataclass
+class RsvpReport:
+    """
+    Итог обработки одного RSVP: счётчики, причины пропусков, число
+    SQL-запросов и время. trace — подробности пропусков для отладочного
+    лога; None — трассировка выключена и ничего не собирается.
+    """
+    saved: int = 0
+    skipped: int = 0
+    queries: int = 0
+    duration_ms: float = 0.0
+    match_ms: float = 0.0
+    reasons: Counter = field(default_factory=Counter)
+    trace: list | None = None
+
+    def skip(self, reason: str, **details) -> None:
+        """Пропуск ответа; детали (callable — лениво) пишутся только в trace."""
+        self.skipped += 1
+        self.reasons[reason] += 1
+        if self.trace is not None:
+            self.trace.append({
+                "reason": reason,
+                **{name: value() if callable(value) else value for name, value in details.items()},
+            })
+
+    def as_dict(self) -> dict:
+        return {
+            "saved": self.saved,
+            "skipped": self.skipped,
+            "queries": self.queries,
+            "duration_ms": round(self.duration_ms, 3),
+            "match_ms": round(self.match_ms, 3),
+        }
+
+    def response(self) -> dict:
+        """Тело JSON-ответа submit_rsvp (оно же сохраняется для повторов)."""
+        return {"ok": True, "saved": self.saved, "skipped": self.skipped}
+
+
+class QueryCounter:
+    """execute_wrapper, который просто считает выполненные запросы."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _resolve_attendance(index: QuestionnaireIndex, attendance: str, plan: dict, report: RsvpReport) -> None:
+    attendance_q = index.attendance_question
+    if not attendance_q:
+        report.skip("no_attendance_question", question=ATTENDANCE_Q_TEXT)
+        return
+
+    choice = index.find_attendance_choice(attendance)
+    if not choice:
+        report.skip("unknown_choice", question=attendance_q.id, value=attendance, available=attendance_q.choice_texts)
+        return
+
+    plan[attendance_q.id] = [choice]
+    report.saved += 1
+
+
+def _resolve_multi(question: CompiledQuestion, q_text, selected, plan, report) -> None:
+    if isinstance(selected, str):
+        selected_list = [selected]
+    else:
+        selected_list = list(selected or [])
+    selected_list = [str(s).strip() for s in selected_list if str(s).strip()]
+
+    choices = []
+    for choice_text in selected_list:
+        choice = question.choice_by_text(choice_text)
+        if choice:
+            choices.append(choice)
+            report.saved += 1
+        else:
+            report.skip("unknown_choice", question=question.id, value=choice_text, available=question.choice_texts)
+
+    # ответы на MULTI-вопрос перезаписываются целиком, даже если ничего не подошло
+    plan[question.id] = choices
+
+
+def _resolve_single(index: QuestionnaireIndex, question: CompiledQuestion, q_text, selected, plan, report) -> None:
+    if isinstance(selected, list):
+        selected_value = selected[0] if selected else ""
+    else:
+        selected_value = selected
+
+    selected_value = str(selected_value).strip()
+    if not selected_value:
+        report.skip("empty_value", question=question.id)
+        return
+
+    # Специальная обработка для "+1" формата "Так (....)"
+    if "+1" in q_text and "(" in selected_value and selected_value.startswith("Так"):
+        base_text = "Так"
+        choices = []
+
+        base_choice = question.choice_by_text(base_text)
+        if base_choice:
+            choices.append(base_choice)
+            report.saved += 1
+        else:
+            report.skip("unknown_choice", question=question.id, value=base_text, available=question.choice_texts)
+
+        companion_types_text = selected_value.split("(", 1)[1].split(")", 1)[0].strip()
+        for companion_type in (t.strip() for t in companion_types_text.split(",")):
+            if not companion_type:
+                continue
+            type_choice = question.choice_by_text(companion_type)
+            if type_choice:
+                choices.append(type_choice)
+                report.saved += 1
+            else:
+                report.skip("unknown_choice", question=question.id, value=companion_type, available=question.choice_texts)
+
+        plan[question.id] = choices
+        return
+
+    choice = index.find_single_choice(question, selected_value)
+    if not choice:
+        report.skip("unknown_choice", question=question.id, value=selected_value, available=question.choice_texts)
+        return
+
+    plan[question.id] = [choice]
+    report.saved += 1
+
+
+def _status_for_attendance(attendance: str, current: str) -> str:
+    if not attendance:
+        return current
+    att_lower = attendance.lower()
+    if "не зможу" in att_lower or "не сможу" in att_lower:
+        return Invitation.Status.DECLINED
+    return Invitation.Status.ACCEPTED
+
+
+def _resolve_legacy(index: QuestionnaireIndex, payload: dict, plan: dict, report: RsvpReport) -> str:
+    """Адаптер старого текстового формата. Возвращает текст attendance."""
+    attendance = str(payload.get("attendance") or "").strip()
+    answers = payload.get("answers") or {}
+    if not isinstance(answers, dict):
+        raise PayloadError("answers must be an object")
+
+    if attendance:
+        _resolve_attendance(index, attendance, plan, report)
+
+    for q_text, selected in answers.items():
+        q_text_norm = (q_text or "").strip()
+        if not q_text_norm:
+            report.skip("empty_question")
+            continue
+
+        question = index.find_question(q_text_norm)
+        if not question:
+            report.skip("unknown_question", question=q_text_norm)
+            continue
+
+        if question.kind == Question.Kind.MULTI:
+            _resolve_multi(question, q_text_norm, selected, plan, report)
+        else:
+            _resolve_single(index, question, q_text_norm, selected, plan, report)
+
+    return attendance
+
+
+def _resolve_ids(index: QuestionnaireIndex, payload: dict, plan: dict, report: RsvpReport) -> str:
+    """Формат v2: ответы по id. Возвращает текст выбранного варианта attendance."""
+    answers = payload.get("answers") or {}
+    if not isinstance(answers, dict):
+        raise PayloadError("answers must be an object")
+
+    for raw_question_id, raw_choice_ids in answers.items():
+        try:
+            question = index.by_id.get(int(raw_question_id))
+        except (TypeError, ValueError):
+            question = None
+        if not question:
+            report.skip("unknown_question", question=raw_question_id)
+            continue
+
+        if not isinstance(raw_choice_ids, list):
+            raw_choice_ids = [raw_choice_ids]
+
+        choices = []
+        # «+1» формально SINGLE, но, как и в текстовом формате, хранит «Так» и типы спутников
+        single = question.kind != Question.Kind.MULTI and question is not index.companion_question
+        for raw_choice_id in raw_choice_ids:
+            try:
+                choice = question.choices_by_id.get(int(raw_choice_id))
+            except (TypeError, ValueError):
+                choice = None
+            if not choice:
+                report.skip("unknown_choice", question=question.id, value=raw_choice_id)
+            elif single and choices:
+                # у SINGLE-вопроса один ответ, как и в текстовом формате: берём первый
+                report.skip("extra_choice", question=question.id, value=raw_choice_id)
+            else:
+                choices.append(choice)
+                report.saved += 1
+
+        # как и раньше, SINGLE-вопрос без подходящего варианта не трогаем
+        if choices or question.kind == Question.Kind.MULTI:
+            plan[question.id] = choices
+
+    attendance_q = index.attendance_question
+    if attendance_q and plan.get(attendance_q.id):
+        return plan[attendance_q.id][0].text
+    return ""
+
+
+def payload_hash(payload) -> str:
+    """
+    Хэш payload в каноническом виде. Версия анкеты в него не входит: это
+    метка процесса, и повтор, попавший на другой воркер или после
+    перезапуска, получил бы 422 вместо сохранённого ответа.
+    """
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def replay_response(invitation: Invitation, submission_key: str, digest: str, window: int, now=None) -> dict | None:
+    """
+    Сохранённый ответ, если это повтор последней отправки (тот же хэш не
+    старше window секунд), иначе None. Тот же ключ с другим payload —
+    IdempotencyConflict.
+    """
+    if submission_key and submission_key == invitation.submission_key and digest != invitation.payload_hash:
+        raise IdempotencyConflict("Idempotency-Key already used with a different payload")
+    if not invitation.payload_hash or digest != invitation.payload_hash or invitation.responded_at is None:
+        return None
+    if (now or timezone.now()) - invitation.responded_at > timedelta(seconds=window):
+        return None
+    return invitation.submission_response or None
+
+
+def ingest_rsvp(
+    invitation: Invitation, payload: dict, *, submission_key: str = "", digest: str = "", trace: bool = False,
+) -> RsvpReport:
+    """
+    Сохраняет RSVP гостя.
+
+    Сначала сопоставляет все ответы с вопросами/вариантами в памяти, затем
+    в одной транзакции обновляет приглашение, удаляет старые ответы на
+    затронутые вопросы и вставляет новые одним bulk_create. Ключ отправки,
+    хэш payload и ответ пишутся тем же UPDATE приглашения.
+    """
+    if not isinstance(payload, dict):
+        raise PayloadError("payload must be an object")
+
+    report = RsvpReport(trace=[] if trace else None)
+    counter = QueryCounter()
+    started = time.perf_counter()
+
+    with connection.execute_wrapper(counter):
+        index = get_index()
+
+        # question_id -> [choice, ...]; повторный вопрос перезаписывает предыдущий
+        plan: dict[int, list[CompiledChoice]] = {}
+
+        if payload.get("version") == PROTOCOL_VERSION:
+            attendance = _resolve_ids(index, payload, plan, report)
+        else:
+            attendance = _resolve_legacy(index, payload, plan, report)
+
+        rows = []
+        for question_id, choices in plan.items():
+            seen = set()
+            for choice in choices:
+                if choice.id in seen:
+                    continue
+                seen.add(choice.id)
+                rows.append(Answer(invitation=invitation, question_id=question_id, choice_id=choice.id))
+
+        report.match_ms = (time.perf_counter() - started) * 1000
+
+        invitation.status = _status_for_attendance(attendance, invitation.status)
+        invitation.note = str(payload.get("note") or "").strip()
+        invitation.responded_at = timezone.now()
+        invitation.submission_key = submission_key
+        invitation.payload_hash = digest
+        invitation.submission_response = report.response()
+
+        with transaction.atomic():
+            invitation.save(update_fields=[
+                "status", "note", "responded_at", "submission_key", "payload_hash", "submission_response",
+            ])
+            if plan:
+                Answer.objects.filter(invitation=invitation, question_id__in=list(plan)).delete()
+            if rows:
+                Answer.objects.bulk_create(rows)
+            apply_rsvp(invitation, plan, index)
+
+    report.queries = counter.count
+    report.duration_ms = (time.perf_counter() - started) * 1000
+    return report
@@ -0,0 +1,66 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import page_cache, summary
+from .models import Guest, Invitation, Question, Choice, ChoiceTotal, RsvpSummary
+from .questionnaire import invalidate_questionnaire
+
+# поля, которые пишет сам сайт (RSVP, отметка открытия) и которые не влияют на HTML страницы
+TRACKING_FIELDS = {
+    "status", "note", "responded_at", "opened_at", "last_opened_at", "open_count", "last_device",
+    "submission_key", "payload_hash", "submission_response",
+}
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+@receiver(post_save, sender=Choice)
+@receiver(post_delete, sender=Choice)
+def questionnaire_changed(sender, **kwargs):
+    # сбрасываем индекс только после коммита, иначе другой процесс
+    # может успеть перестроить его по старым данным
+    transaction.on_commit(invalidate_questionnaire)
+
+
+@receiver(post_save, sender=Invitation)
+@receiver(post_delete, sender=Invitation)
+def invitation_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= TRACKING_FIELDS:
+        return
+    token = instance.token
+    transaction.on_commit(lambda: page_cache.invalidate_tokens([token]))
+
+
+@receiver(post_save, sender=Guest)
+def guest_changed(sender, instance, **kwargs):
+    tokens = list(instance.invitations.values_list("token", flat=True))
+    transaction.on_commit(lambda: page_cache.invalidate_tokens(tokens))
+
+
+@receiver(post_save, sender=Choice)
+def choice_total_created(sender, instance, created, raw=False, **kwargs):
+    # строка счётчика есть заранее, чтобы RSVP обходился одним UPDATE
+    if created and not raw:
+        ChoiceTotal.objects.get_or_create(choice=instance)
+
+
+@receiver(post_save, sender=Invitation)
+def summary_status_changed(sender, instance, created, update_fields=None, **kwargs):
+    # правка статуса/комментария в админке; ingest_rsvp (пишет и responded_at) обновляет сводку сам
+    if created:
+        return
+    if update_fields is not None:
+        fields = set(update_fields)
+        if "responded_at" in fields or not {"status", "note"} & fields:
+            return
+    RsvpSummary.objects.filter(invitation=instance).update(
+        status=instance.status,
+        attending=summary.attending_for(instance.status),
+        has_note=bool(instance.note.strip()),
+    )
+
+
+@receiver(post_delete, sender=RsvpSummary)
+def summary_deleted(sender, instance, **kwargs):
+    summary.shift_totals({choice_id: -1 for choice_id in summary.selected_ids(instance.selections)})
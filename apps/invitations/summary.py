@@ -0,0 +1,173 @@
+"""
+Сводка RSVP: RsvpSummary на приглашение и ChoiceTotal на вариант ответа.
+
+ingest_rsvp вызывает apply_rsvp в своей транзакции после UPDATE
+приглашения: строка приглашения уже заблокирована, поэтому параллельные
+отправки одного гостя идут по очереди. Прежняя сводка перечитывается
+под этой блокировкой (SELECT ... FOR UPDATE), новая выборка вариантов
+считается из неё и плана ответов, сводка пишется одним upsert, а
+счётчики изменившихся вариантов сдвигаются одним UPDATE с CASE. Answer
+при этом не читается.
+
+compute_all() строит то же самое с нуля по Answer — им пользуются
+миграция и manage.py rebuild_rsvp_summary (сверка и починка).
+"""
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass
+
+from django.db.models import Case, F, Value, When
+
+from .questionnaire import COMPANION_Q_MARKER, normalize_text
+
+
+# на вопрос "+1" это базовые ответы, остальные варианты — типы спутников
+COMPANION_BASE_CHOICES = {"так", "ні"}
+
+
+@dataclass(frozen=True)
+class SummaryData:
+    status: str
+    attending: bool | None
+    selections: dict
+    companions: int
+    has_note: bool
+
+    def as_fields(self) -> dict:
+        return {
+            "status": self.status,
+            "attending": self.attending,
+            "selections": self.selections,
+            "companions": self.companions,
+            "has_note": self.has_note,
+        }
+
+
+def attending_for(status: str) -> bool | None:
+    from .models import Invitation
+
+    if status == Invitation.Status.ACCEPTED:
+        return True
+    if status == Invitation.Status.DECLINED:
+        return False
+    return None
+
+
+def count_companions(selected_texts) -> int:
+    """"Так" без уточнения — один спутник, иначе — по числу выбранных типов."""
+    normalized = {normalize_text(text) for text in selected_texts}
+    types = normalized - COMPANION_BASE_CHOICES
+    if types:
+        return len(types)
+    return 1 if "так" in normalized else 0
+
+
+def summarize(status: str, note: str, selections: dict, companion_choices: dict) -> SummaryData:
+    """companion_choices — {choice_id: текст} вариантов вопроса "+1"."""
+    selected = [
+        companion_choices[choice_id]
+        for choice_ids in selections.values()
+        for choice_id in choice_ids
+        if choice_id in companion_choices
+    ]
+    return SummaryData(
+        status=status,
+        attending=attending_for(status),
+        selections=selections,
+        companions=count_companions(selected),
+        has_note=bool((note or "").strip()),
+    )
+
+
+def selected_ids(selections: dict) -> set:
+    return {choice_id for choice_ids in selections.values() for choice_id in choice_ids}
+
+
+# --- инкрементальное обновление ------------------------------------------
+
+def apply_rsvp(invitation, plan: dict, index) -> None:
+    """
+    Обновляет сводку после записи ответов; вызывается внутри transaction.atomic,
+    после UPDATE приглашения (он держит блокировку строки до коммита).
+    plan — {question_id: [CompiledChoice, ...]} из ingest_rsvp.
+    """
+    from .models import RsvpSummary
+
+    # сводку из памяти (select_related во view) брать нельзя: параллельная
+    # отправка могла её уже изменить, и разница счётчиков посчиталась бы дважды
+    summary = RsvpSummary.objects.select_for_update().filter(invitation=invitation).first()
+    old = summary.selections if summary else {}
+    new = dict(old)
+    for question_id, choices in plan.items():
+        ids = sorted({choice.id for choice in choices})
+        if ids:
+            new[str(question_id)] = ids
+        else:
+            new.pop(str(question_id), None)
+
+    companion = index.companion_question
+    companion_choices = {c.id: c.text for c in companion.choices} if companion else {}
+    fields = summarize(invitation.status, invitation.note, new, companion_choices).as_fields()
+
+    # первая отправка и повторная — один запрос
+    summary = RsvpSummary(invitation=invitation, **fields)
+    RsvpSummary.objects.bulk_create(
+        [summary], update_conflicts=True, unique_fields=["invitation"], update_fields=[*fields, "updated_at"],
+    )
+    invitation.rsvp_summary = summary
+
+    before, after = selected_ids(old), selected_ids(new)
+    delta = {choice_id: 1 for choice_id in after - before}
+    delta.update({choice_id: -1 for choice_id in before - after})
+    shift_totals(delta)
+
+
+def shift_totals(delta: dict) -> None:
+    """Сдвигает счётчики ChoiceTotal одним UPDATE; недостающие строки создаёт."""
+    from .models import ChoiceTotal
+
+    delta = {choice_id: d for choice_id, d in delta.items() if d}
+    if not delta:
+        return
+    count = Case(
+        *[When(choice_id=choice_id, then=F("count") + Value(d)) for choice_id, d in delta.items()],
+        default=F("count"),
+    )
+    updated = ChoiceTotal.objects.filter(choice_id__in=list(delta)).update(count=count)
+    if updated < len(delta):
+        # варианты, созданные мимо сигнала (bulk_create, старые данные)
+        existing = set(ChoiceTotal.objects.filter(choice_id__in=list(delta)).values_list("choice_id", flat=True))
+        ChoiceTotal.objects.bulk_create(
+            [ChoiceTotal(choice_id=choice_id, count=max(d, 0)) for choice_id, d in delta.items() if choice_id not in existing],
+            ignore_conflicts=True,
+        )
+
+
+# --- пересборка с нуля -----------------------------------------------------
+
+def compute_all(Invitation, Answer, Choice, chunk_size: int = 2000):
+    """
+    Ожидаемые сводки и счётчики по исходным строкам.
+    Модели передаются явно, чтобы работало и с историческими моделями миграций.
+    Возвращает ({invitation_id: SummaryData}, Counter{choice_id: count}).
+    """
+    companion_choices = dict(
+        Choice.objects.filter(question__text__contains=COMPANION_Q_MARKER).values_list("id", "text")
+    )
+
+    selections: dict[int, dict] = {}
+    answers = Answer.objects.order_by("invitation_id", "question_id", "choice_id").values_list(
+        "invitation_id", "question_id", "choice_id"
+    )
+    for invitation_id, question_id, choice_id in answers.iterator(chunk_size=chunk_size):
+        selections.setdefault(invitation_id, {}).setdefault(str(question_id), []).append(choice_id)
+
+    summaries = {}
+    totals: Counter = Counter()
+    invitations = Invitation.objects.filter(responded_at__isnull=False).values_list("id", "status", "note")
+    for invitation_id, status, note in invitations.iterator(chunk_size=chunk_size):
+        data = summarize(status, note, selections.get(invitation_id, {}), companion_choices)
+        summaries[invitation_id] = data
+        totals.update(selected_ids(data.selections))
+    return summaries, totals
@@ -1,3 +1,1190 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import logging
+import os
+import tempfile
+import unittest
+import zipfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import benchmark, page_cache, rsvp_log, throttle
+from .admin import GUEST_INDEX_PER_PAGE
+from .export import iter_export, iter_xlsx
+from .guest_import import import_guests, read_rows
+from .models import Guest, Invitation, Question, Choice, Answer, ChoiceTotal, RsvpSummary, allocate_tokens
+from .questionnaire import VERSION_CACHE_KEY, get_index, invalidate_questionnaire
+from .services import RsvpReport, ingest_rsvp
+from .tracking import tracker
+
+
+FOOD_Q = "Відмітьте, будь ласка, ваші вподобання:"
+ALLERGY_Q = "Чи є у вас харчові алергії або продукти, які вам не можна:"
+DRINKS_Q = "Відмітьте, будь ласка, ваші уподобання щодо напоїв:"
+TRANSFER_Q = "Чи потрібна вам трансфер до місця проведення або назад:"
+COMPANION_Q = "Чи потрібно вам запрошення \"+1\"?"
+
+
+IPHONE_UA = "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 Mobile/15E148"
+TELEGRAM_UA = "TelegramBot (like TwitterBot)"
+
+
+def setUpModule():
+    # события RSVP пишутся в консоль (settings.LOGGING); в тестах их проверяет
+    # assertLogs, а в вывод прогона они не попадают
+    logger = logging.getLogger("apps.invitations.rsvp")
+    unittest.addModuleCleanup(setattr, logger, "handlers", logger.handlers)
+    logger.handlers = [logging.NullHandler()]
+
+
+def create_questionnaire():
+    call_command("create_questions", stdout=StringIO())
+    call_command("add_companion_choices", stdout=StringIO())
+    invalidate_questionnaire()
+
+
+class RsvpIngestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_questionnaire()
+        cls.guest = Guest.objects.create(full_name="Ярослав", gender=Guest.Gender.MALE)
+
+    def setUp(self):
+        # TestCase откатывает транзакцию, on_commit из сигналов не срабатывает
+        invalidate_questionnaire()
+        self.invitation = Invitation.objects.create(guest=self.guest)
+
+    def full_answers(self):
+        return {
+            COMPANION_Q: "Так (Друга половинка, Дитина)",
+            FOOD_Q: ["Лосось", "Курятина", "Овочі"],
+            ALLERGY_Q: "Ні",
+            DRINKS_Q: ["Шампанське", "Біле вино"],
+            TRANSFER_Q: "Так",
+        }
+
+    def test_full_submission_is_saved(self):
+        report = ingest_rsvp(self.invitation, {
+            "attendance": "Так, з радістю буду!",
+            "answers": self.full_answers(),
+            "note": "Дякуємо!",
+        })
+
+        self.assertEqual(report.saved, 11)
+        self.assertEqual(report.skipped, 0)
+        self.assertEqual(self.invitation.answers.count(), 11)
+        self.invitation.refresh_from_db()
+        self.assertEqual(self.invitation.status, Invitation.Status.ACCEPTED)
+        self.assertEqual(self.invitation.note, "Дякуємо!")
+        self.assertIsNotNone(self.invitation.responded_at)
+
+    def test_query_count_does_not_depend_on_answer_count(self):
+        get_index()
+        small = ingest_rsvp(self.invitation, {"answers": {ALLERGY_Q: "Так"}})
+        # свежий объект, как в view: сводка читается заново
+        invitation = Invitation.objects.get(pk=self.invitation.pk)
+        full = ingest_rsvp(invitation, {"attendance": "На жаль, не зможу бути.", "answers": self.full_answers()})
+
+        self.assertEqual(small.queries, full.queries)
+        self.assertLessEqual(full.queries, 8)
+        self.assertGreaterEqual(full.duration_ms, 0)
+
+    def test_resubmission_replaces_previous_answers(self):
+        ingest_rsvp(self.invitation, {"answers": {FOOD_Q: ["Лосось", "Свинина"]}})
+        ingest_rsvp(self.invitation, {"answers": {FOOD_Q: ["Яловичина"]}})
+
+        food = Question.objects.get(text=FOOD_Q)
+        texts = list(Answer.objects.filter(invitation=self.invitation, question=food).values_list("choice__text", flat=True))
+        self.assertEqual(texts, ["Яловичина"])
+
+    def test_unknown_question_and_choice_are_skipped(self):
+        report = ingest_rsvp(self.invitation, {"answers": {"Неіснуюче питання": "Так", TRANSFER_Q: "Можливо"}})
+        self.assertEqual(report.saved, 0)
+        self.assertEqual(report.skipped, 2)
+        self.assertFalse(self.invitation.answers.exists())
+
+    def test_submit_view(self):
+        url = reverse("submit_rsvp", args=[self.invitation.token])
+        response = self.client.post(
+            url,
+            data=json.dumps({"attendance": "Так, з радістю буду!", "answers": {ALLERGY_Q: "Ні"}, "note": ""}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"ok": True, "saved": 2, "skipped": 0})
+
+
+class IdPayloadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_questionnaire()
+        cls.guest = Guest.objects.create(full_name="Світлана")
+
+    def setUp(self):
+        invalidate_questionnaire()
+        self.invitation = Invitation.objects.create(guest=self.guest)
+        self.schema = self.client.get(reverse("invitations:questionnaire_schema")).json()
+
+    def ids(self, question_text, *choice_texts):
+        question = next(q for q in self.schema["questions"] if q["text"] == question_text)
+        return str(question["id"]), [c["id"] for c in question["choices"] if c["text"] in choice_texts]
+
+    def test_schema_is_cacheable(self):
+        url = reverse("invitations:questionnaire_schema")
+        response = self.client.get(url)
+        self.assertEqual(response["Cache-Control"], "public, max-age=300")
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+        self.assertEqual(self.schema["protocol"], 2)
+        self.assertEqual(len(self.schema["questions"]), 6)
+
+    def test_id_payload_is_saved(self):
+        attendance_q = next(q for q in self.schema["questions"] if q["id"] == self.schema["attendance_question"])
+        declined = next(c["id"] for c in attendance_q["choices"] if "не зможу" in c["text"])
+        food_id, food_choices = self.ids(FOOD_Q, "Лосось", "Овочі")
+        companion_id, companion_choices = self.ids(COMPANION_Q, "Так", "Дитина")
+
+        report = ingest_rsvp(self.invitation, {
+            "version": 2,
+            "answers": {
+                str(attendance_q["id"]): [declined],
+                food_id: food_choices,
+                companion_id: companion_choices,
+            },
+            "note": "  Вибачте  ",
+        })
+
+        self.assertEqual((report.saved, report.skipped), (5, 0))
+        self.invitation.refresh_from_db()
+        self.assertEqual(self.invitation.status, Invitation.Status.DECLINED)
+        self.assertEqual(self.invitation.note, "Вибачте")
+        self.assertEqual(self.invitation.answers.count(), 5)
+
+    def test_unknown_ids_are_skipped(self):
+        food_id, _ = self.ids(FOOD_Q)
+        _, allergy_choices = self.ids(ALLERGY_Q, "Так")
+        report = ingest_rsvp(self.invitation, {
+            "version": 2,
+            "answers": {"999999": [1], "abc": [1], food_id: allergy_choices},
+        })
+        self.assertEqual((report.saved, report.skipped), (0, 3))
+
+    def test_single_question_keeps_only_first_choice(self):
+        transfer_id, transfer_choices = self.ids(TRANSFER_Q, "Так", "Ні")
+        companion_id, companion_choices = self.ids(COMPANION_Q, "Так", "Друга половинка", "Дитина")
+        report = ingest_rsvp(self.invitation, {
+            "version": 2,
+            "answers": {transfer_id: transfer_choices, companion_id: companion_choices},
+        })
+        self.assertEqual((report.saved, report.skipped), (4, 1))
+        self.assertEqual(report.reasons, {"extra_choice": 1})
+        transfer = self.invitation.answers.filter(question_id=int(transfer_id))
+        self.assertEqual(list(transfer.values_list("choice_id", flat=True)), transfer_choices[:1])
+
+    def test_malformed_payload_is_rejected(self):
+        url = reverse("submit_rsvp", args=[self.invitation.token])
+        response = self.client.post(url, data=json.dumps({"version": 2, "answers": [1, 2]}), content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+
+class RsvpSummaryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_questionnaire()
+        cls.guest = Guest.objects.create(full_name="Ярослав", gender=Guest.Gender.MALE)
+
+    def setUp(self):
+        invalidate_questionnaire()
+        self.invitation = Invitation.objects.create(guest=self.guest)
+
+    def totals(self, question_text):
+        return dict(
+            ChoiceTotal.objects.filter(choice__question__text=question_text).values_list("choice__text", "count")
+        )
+
+    def submit(self, answers, **payload):
+        invitation = Invitation.objects.get(pk=self.invitation.pk)
+        ingest_rsvp(invitation, {"answers": answers, **payload})
+
+    def test_summary_follows_submissions(self):
+        self.submit(
+            {COMPANION_Q: "Так (Друга половинка, Дитина)", FOOD_Q: ["Лосось", "Овочі"]},
+            attendance="Так, з радістю буду!", note="Дякуємо!",
+        )
+        summary = RsvpSummary.objects.get(invitation=self.invitation)
+        self.assertEqual(summary.status, Invitation.Status.ACCEPTED)
+        self.assertIs(summary.attending, True)
+        self.assertEqual(summary.companions, 2)
+        self.assertTrue(summary.has_note)
+        self.assertEqual(len(summary.selections), 3)
+        self.assertEqual(self.totals(FOOD_Q)["Лосось"], 1)
+
+        self.submit({FOOD_Q: ["Овочі", "Курятина"], COMPANION_Q: "Ні"}, attendance="На жаль, не зможу бути.")
+        summary.refresh_from_db()
+        self.assertIs(summary.attending, False)
+        self.assertEqual(summary.companions, 0)
+        self.assertFalse(summary.has_note)
+        self.assertEqual(self.totals(FOOD_Q), {**self.totals(FOOD_Q), "Лосось": 0, "Овочі": 1, "Курятина": 1})
+        self.assertEqual(sum(self.totals(COMPANION_Q).values()), 1)
+
+    def test_admin_edit_and_delete_keep_summary_in_sync(self):
+        self.submit({TRANSFER_Q: "Так"}, attendance="Так, з радістю буду!")
+        self.invitation.refresh_from_db()
+        self.invitation.status = Invitation.Status.DECLINED
+        self.invitation.save()
+        self.assertIs(RsvpSummary.objects.get(invitation=self.invitation).attending, False)
+
+        self.invitation.delete()
+        self.assertEqual(self.totals(TRANSFER_Q)["Так"], 0)
+
+    def test_rebuild_checks_and_repairs(self):
+        self.submit({FOOD_Q: ["Лосось"]}, attendance="Так, з радістю буду!")
+        call_command("rebuild_rsvp_summary", "--check", stdout=StringIO())
+
+        ChoiceTotal.objects.filter(choice__text="Лосось").update(count=5)
+        RsvpSummary.objects.update(companions=3)
+        with self.assertRaises(CommandError):
+            call_command("rebuild_rsvp_summary", "--check", stdout=StringIO())
+        call_command("rebuild_rsvp_summary", stdout=StringIO())
+        call_command("rebuild_rsvp_summary", "--check", stdout=StringIO())
+        self.assertEqual(self.totals(FOOD_Q)["Лосось"], 1)
+
+    def test_dashboard_does_not_scan_answers(self):
+        self.submit({COMPANION_Q: "Так (Дитина)", FOOD_Q: ["Лосось"]}, attendance="Так, з радістю буду!")
+        get_index()
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "pass"))
+        url = reverse("admin:invitations_invitation_dashboard")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["stats"]["headcount"], 2)
+        self.assertFalse([q for q in queries if "invitations_answer" in q["sql"]])
+        self.assertContains(response, "Лосось")
+
+
+class RsvpSummaryConcurrencyTests(TransactionTestCase):
+    # настоящие транзакции: сводка перечитывается в atomic ingest_rsvp, а не берётся из объекта
+
+    def setUp(self):
+        create_questionnaire()
+        self.invitation = Invitation.objects.create(guest=Guest.objects.create(full_name="Ярослав"))
+
+    def food_totals(self):
+        return dict(ChoiceTotal.objects.filter(choice__question__text=FOOD_Q).values_list("choice__text", "count"))
+
+    def load(self):
+        # как прочитал бы параллельный запрос: вместе со сводкой на момент чтения
+        return Invitation.objects.select_related("rsvp_summary").get(pk=self.invitation.pk)
+
+    def test_interleaved_submits_keep_totals_consistent(self):
+        # оба запроса прочитали приглашение до того, как кто-то из них записал ответ
+        first, second = self.load(), self.load()
+        ingest_rsvp(first, {"answers": {FOOD_Q: ["Лосось"]}})
+        ingest_rsvp(second, {"answers": {FOOD_Q: ["Курятина"]}})
+
+        third, fourth = self.load(), self.load()
+        ingest_rsvp(third, {"answers": {FOOD_Q: ["Овочі"]}})
+        ingest_rsvp(fourth, {"answers": {FOOD_Q: ["Овочі"]}})
+
+        totals = self.food_totals()
+        self.assertEqual(totals["Овочі"], 1)
+        self.assertEqual(sum(totals.values()), 1)
+        summary = RsvpSummary.objects.get(invitation=self.invitation)
+        self.assertEqual(list(summary.selections.values()), [[Choice.objects.get(question__text=FOOD_Q, text="Овочі").pk]])
+        call_command("rebuild_rsvp_summary", "--check", stdout=StringIO())
+
+
+class RsvpExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_questionnaire()
+
+    def setUp(self):
+        invalidate_questionnaire()
+
+    def respond(self, name, answers, **payload):
+        invitation = Invitation.objects.create(guest=Guest.objects.create(full_name=name))
+        ingest_rsvp(invitation, {"answers": answers, **payload})
+        return invitation
+
+    def read_csv(self, content):
+        text = b"".join(content).decode("utf-8")
+        self.assertTrue(text.startswith("\ufeff"))
+        return list(csv.reader(io.StringIO(text[1:])))
+
+    def test_csv_is_pivoted_one_row_per_invitation(self):
+        self.respond("Богдана", {FOOD_Q: ["Овочі", "Лосось"], TRANSFER_Q: "Так"}, attendance="Так, з радістю буду!", note="Без цибулі")
+        self.respond("Андрій", {COMPANION_Q: "Так (Дитина)"}, attendance="Так, з радістю буду!")
+        Invitation.objects.create(guest=Guest.objects.create(full_name="Без відповіді"))
+
+        header, *rows = self.read_csv(iter_export(Invitation.objects.filter(responded_at__isnull=False), "csv"))
+        self.assertEqual(header[0], "Гість")
+        self.assertEqual(header[-1], "Коментар")
+        self.assertEqual(len(header), 4 + Question.objects.count() + 1)
+        self.assertEqual([row[0] for row in rows], ["Андрій", "Богдана"])
+
+        bohdana = dict(zip(header, rows[1]))
+        self.assertEqual(bohdana[FOOD_Q], "Лосось, Овочі")
+        self.assertEqual(bohdana[TRANSFER_Q], "Так")
+        self.assertEqual(bohdana[DRINKS_Q], "")
+        self.assertEqual(bohdana["Коментар"], "Без цибулі")
+        self.assertEqual(dict(zip(header, rows[0]))["Супутників (+1)"], "1")
+
+    def test_query_count_does_not_depend_on_guest_count(self):
+        self.respond("Перший", {FOOD_Q: ["Лосось"]})
+        with self.assertNumQueries(3):
+            small = list(iter_export(Invitation.objects.all(), "csv", chunk_size=2))
+        for i in range(5):
+            self.respond(f"Гість {i}", {FOOD_Q: ["Курятина"], ALLERGY_Q: "Ні"})
+        with self.assertNumQueries(3):
+            full = list(iter_export(Invitation.objects.all(), "csv", chunk_size=2))
+        self.assertEqual(len(full) - len(small), 5)
+
+    def test_xlsx_is_a_valid_workbook(self):
+        self.respond("Ганна & <Ко>", {FOOD_Q: ["Овочі"]})
+        data = b"".join(iter_export(Invitation.objects.all(), "xlsx"))
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            self.assertIn("[Content_Types].xml", archive.namelist())
+            sheet = archive.read("xl/worksheets/sheet1.xml").decode("utf-8")
+        self.assertIn("Ганна &amp; &lt;Ко&gt;", sheet)
+        self.assertIn('<row r="2">', sheet)
+
+    def test_admin_action_streams_selected_invitations(self):
+        invitation = self.respond("Олена", {TRANSFER_Q: "Ні"})
+        self.respond("Інша", {TRANSFER_Q: "Так"})
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "pass"))
+        response = self.client.post(reverse("admin:invitations_invitation_changelist"), {
+            "action": "export_answers_csv",
+            "_selected_action": [invitation.pk],
+        })
+        self.assertTrue(response.streaming)
+        self.assertIn("attachment;", response["Content-Disposition"])
+        rows = self.read_csv(response.streaming_content)
+        self.assertEqual([row[0] for row in rows[1:]], ["Олена"])
+
+    def test_command_writes_file(self):
+        self.respond("Марко", {FOOD_Q: ["Лосось"]})
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "rsvp.xlsx")
+            call_command("export_rsvp", "--format", "xlsx", "--output", path, stdout=StringIO())
+            self.assertTrue(zipfile.is_zipfile(path))
+
+
+class AdminQueryBudgetTests(TestCase):
+    GUESTS = 5000
+
+    @classmethod
+    def setUpTestData(cls):
+        create_questionnaire()
+        guests = Guest.objects.bulk_create(Guest(full_name=f"Гість {i:04d}") for i in range(cls.GUESTS))
+        Invitation.objects.bulk_create(
+            Invitation(guest=guest, token=f"budget{i:06d}") for i, guest in enumerate(guests)
+        )
+        cls.invitation = Invitation.objects.get(token="budget000000")
+        ingest_rsvp(cls.invitation, {"answers": {FOOD_Q: ["Лосось", "Овочі"], TRANSFER_Q: "Так"}})
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "pass")
+
+    def setUp(self):
+        invalidate_questionnaire()
+        self.client.force_login(self.admin)
+
+    def assertQueryBudget(self, url, budget):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(queries), budget, "\n".join(q["sql"] for q in queries))
+        return response
+
+    def test_changelists_have_fixed_query_budget(self):
+        guest_id = self.invitation.guest_id
+        self.assertQueryBudget(reverse("admin:invitations_guest_changelist"), 5)
+        self.assertQueryBudget(reverse("admin:invitations_invitation_changelist"), 5)
+        self.assertQueryBudget(reverse("admin:invitations_answer_changelist"), 4)
+        response = self.assertQueryBudget(
+            reverse("admin:invitations_answer_changelist") + f"?invitation__guest__id__exact={guest_id}", 9
+        )
+        self.assertContains(response, "Лосось")
+
+    def test_change_forms_do_not_list_all_guests(self):
+        response = self.assertQueryBudget(reverse("admin:invitations_invitation_change", args=[self.invitation.pk]), 7)
+        self.assertNotContains(response, "Гість 4999")
+        answer = self.invitation.answers.first()
+        response = self.assertQueryBudget(reverse("admin:invitations_answer_change", args=[answer.pk]), 8)
+        self.assertNotContains(response, "Гість 4999")
+
+    def test_invitations_count_is_annotated(self):
+        response = self.client.get(reverse("admin:invitations_guest_changelist") + "?o=-6")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["cl"].result_list[0].invitations_total, 1)
+
+
+class AnswerGuestIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_questionnaire()
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "pass")
+
+    def setUp(self):
+        invalidate_questionnaire()
+        self.client.force_login(self.admin)
+        self.url = reverse("admin:invitations_answer_changelist")
+
+    def respond(self, guest, note=""):
+        invitation = Invitation.objects.create(guest=guest)
+        ingest_rsvp(invitation, {"answers": {TRANSFER_Q: "Так"}, "note": note})
+        return invitation
+
+    def test_index_lists_each_responded_guest_once_in_order(self):
+        zoya = Guest.objects.create(full_name="Зоя")
+        self.respond(zoya, note="Перше")
+        self.respond(zoya, note="Останнє слово")
+        self.respond(Guest.objects.create(full_name="Анна"))
+        Invitation.objects.create(guest=Guest.objects.create(full_name="Мовчун"))
+
+        with self.assertNumQueries(4):  # сессия, пользователь, COUNT, страница
+            response = self.client.get(self.url)
+        guests = list(response.context["page"].object_list)
+        self.assertEqual([g.full_name for g in guests], ["Анна", "Зоя"])
+        self.assertEqual(guests[1].last_note, "Останнє слово")
+        self.assertContains(response, "Останнє слово")
+        self.assertNotContains(response, "Мовчун")
+
+    def test_index_is_searchable_and_paginated(self):
+        for i in range(GUEST_INDEX_PER_PAGE + 5):
+            self.respond(Guest.objects.create(full_name=f"Гість {i:03d}"))
+        self.respond(Guest.objects.create(full_name="Particular"))
+
+        response = self.client.get(self.url, {"p": 2})
+        self.assertEqual(len(response.context["page"].object_list), 6)
+        response = self.client.get(self.url, {"q": "partic"})
+        self.assertEqual([g.full_name for g in response.context["page"].object_list], ["Particular"])
+
+    def test_selected_guest_note_comes_from_loaded_rows(self):
+        guest = Guest.objects.create(full_name="Оксана")
+        self.respond(guest, note="Буду з квітами")
+        response = self.client.get(self.url, {"invitation__guest__id__exact": guest.pk})
+        self.assertEqual(response.context["selected_guest"], "Оксана")
+        self.assertContains(response, "Буду з квітами")
+        self.assertIsNotNone(response.context["selected_guest_responded_at"])
+
+
+class GuestImportTests(TestCase):
+    CSV = (
+        "ПІБ;Стать;Email\n"
+        "Тарас Шевченко;ч;taras@example.com\n"
+        ";ж;\n"
+        "Леся Українка;жіночий;\n"
+        "Хтось;невідомо;\n"
+    )
+
+    def test_allocate_tokens_skips_taken_ones_with_one_check_per_batch(self):
+        Invitation.objects.create(guest=Guest.objects.create(full_name="Є"), token="taken0000000")
+        candidates = iter(["taken0000000", "fresh0000001", "fresh0000001", "fresh0000002", "fresh0000003"])
+        with mock.patch("apps.invitations.models.generate_token", side_effect=lambda: next(candidates)):
+            with self.assertNumQueries(2):
+                tokens = allocate_tokens(3)
+        self.assertEqual(sorted(tokens), ["fresh0000001", "fresh0000002", "fresh0000003"])
+
+    def test_save_does_not_reuse_existing_token(self):
+        guest = Guest.objects.create(full_name="Є")
+        Invitation.objects.create(guest=guest, token="taken0000000")
+        candidates = iter(["taken0000000", "fresh0000001"])
+        with mock.patch("apps.invitations.models.generate_token", side_effect=lambda: next(candidates)):
+            invitation = Invitation.objects.create(guest=guest)
+        self.assertEqual(invitation.token, "fresh0000001")
+
+    def test_csv_import_creates_guests_and_invitations(self):
+        report = import_guests(read_rows(io.BytesIO(self.CSV.encode("utf-8")), "guests.csv"))
+
+        self.assertEqual([name for name, _ in report.created], ["Тарас Шевченко", "Леся Українка"])
+        self.assertEqual([line for line, _ in report.skipped], [3, 5])
+        taras = Guest.objects.get(full_name="Тарас Шевченко")
+        self.assertEqual(taras.gender, Guest.Gender.MALE)
+        self.assertEqual(taras.email, "taras@example.com")
+        self.assertEqual(taras.full_name_genitive, "Тараса Шевченка")
+        self.assertEqual(taras.invitations.get().token, report.created[0][1])
+        self.assertIsNone(Guest.objects.get(full_name="Леся Українка").telegram)
+
+    def test_missing_gender_stays_unset(self):
+        import_guests(read_rows(io.BytesIO("ПІБ;Стать\nОлег Коваль;\n".encode("utf-8")), "guests.csv"))
+        guest = Guest.objects.get(full_name="Олег Коваль")
+        self.assertEqual(guest.gender, "")
+        self.assertEqual(guest.full_name_genitive, "Олега Коваля")
+
+    def test_token_checks_are_batched(self):
+        rows = [{"full_name": f"Гість {i}"} for i in range(250)]
+        with CaptureQueriesContext(connection) as queries:
+            report = import_guests(rows, chunk_size=100)
+        self.assertEqual(len(report.created), 250)
+        self.assertEqual(len({token for _, token in report.created}), 250)
+        token_checks = [q for q in queries if q["sql"].startswith("SELECT") and '"token" IN' in q["sql"]]
+        self.assertEqual(len(token_checks), 3)
+
+    def test_xlsx_import(self):
+        data = b"".join(iter_xlsx(["Ім'я", "Gender", "Telegram"], [["Марія", "female", "@maria"], ["Іван", "male", ""]]))
+        report = import_guests(read_rows(io.BytesIO(data), "guests.xlsx"))
+        self.assertEqual(len(report.created), 2)
+        self.assertEqual(Guest.objects.get(full_name="Марія").telegram, "@maria")
+
+    def test_admin_import_returns_links(self):
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "pass"))
+        upload = SimpleUploadedFile("guests.csv", self.CSV.encode("utf-8"), content_type="text/csv")
+        response = self.client.post(reverse("admin:invitations_guest_import"), {"file": upload})
+        self.assertEqual(response["X-Import-Created"], "2")
+        rows = list(csv.reader(io.StringIO(response.content.decode("utf-8-sig"))))
+        token = Guest.objects.get(full_name="Леся Українка").invitations.get().token
+        self.assertEqual(rows[2][:2], ["Леся Українка", token])
+        self.assertTrue(rows[2][2].endswith(f"/Invitation/{token}/"))
+
+    def test_admin_action_creates_invitations_in_bulk(self):
+        Guest.objects.bulk_create(Guest(full_name=f"Гість {i}") for i in range(20))
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "pass"))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse("admin:invitations_guest_changelist"), {
+                "action": "create_invitations",
+                "_selected_action": list(Guest.objects.values_list("pk", flat=True)),
+            })
+        self.assertEqual(Invitation.objects.count(), 20)
+        self.assertLess(len(queries), 15)
+
+    def test_bulk_writes_are_batched(self):
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "pass"))
+        with mock.patch("apps.invitations.guest_import.IMPORT_BATCH_SIZE", 1), \
+                CaptureQueriesContext(connection) as queries:
+            upload = SimpleUploadedFile("guests.csv", self.CSV.encode("utf-8"), content_type="text/csv")
+            self.client.post(reverse("admin:invitations_guest_import"), {"file": upload})
+        inserts = [q for q in queries if q["sql"].startswith('INSERT INTO "invitations_invitation"')]
+        self.assertEqual(len(inserts), 2)
+
+        Guest.objects.bulk_create(Guest(full_name=f"Гість {i}") for i in range(5))
+        with mock.patch("apps.invitations.admin.IMPORT_BATCH_SIZE", 2), \
+                CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse("admin:invitations_guest_changelist"), {
+                "action": "create_invitations",
+                "_selected_action": list(Guest.objects.filter(invitations=None).values_list("pk", flat=True)),
+            })
+        inserts = [q for q in queries if q["sql"].startswith('INSERT INTO "invitations_invitation"')]
+        self.assertEqual(len(inserts), 3)
+
+    def test_command_writes_links(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "guests.csv")
+            links = os.path.join(tmp, "links.csv")
+            with open(source, "w", encoding="utf-8") as fh:
+                fh.write(self.CSV)
+            call_command("import_guests", source, "--links", links, stdout=StringIO(), stderr=StringIO())
+            with open(links, encoding="utf-8-sig") as fh:
+                self.assertEqual(len(list(csv.reader(fh))), 3)
+
+
+class HotQueryIndexTests(TestCase):
+    """EXPLAIN горячих запросов: каждый должен идти по индексу (SQLite и PostgreSQL)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_questionnaire()
+        cls.guest = Guest.objects.create(full_name="Індекс")
+        cls.invitation = Invitation.objects.create(guest=cls.guest)
+
+    def plan(self, queryset):
+        if connection.vendor == "postgresql":
+            # на крошечных таблицах планировщик иначе всегда выбирает Seq Scan
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                return queryset.explain()
+        return queryset.explain()
+
+    def assertUsesIndex(self, queryset, *names):
+        plan = self.plan(queryset)
+        self.assertTrue(any(name in plan for name in names), plan)
+        self.assertNotRegex(plan, r"(?m)SCAN \w+\s*$|Seq Scan")
+
+    def test_answers_by_invitation_and_question(self):
+        self.assertUsesIndex(
+            Answer.objects.filter(invitation=self.invitation, question_id__in=[1, 2]),
+            "unique_answer", "sqlite_autoindex_invitations_answer",
+        )
+
+    def test_choice_by_question_and_normalized_text(self):
+        question = Question.objects.get(text=TRANSFER_Q)
+        self.assertUsesIndex(Choice.objects.filter(question=question, normalized_text="так"), "choice_question_normalized")
+
+    def test_active_questions(self):
+        self.assertUsesIndex(Question.objects.filter(is_active=True).order_by("order", "id"), "question_active_order")
+        self.assertUsesIndex(
+            Question.objects.filter(is_active=True, normalized_text__contains="+1"), "question_active_order"
+        )
+
+    def test_responded_invitations(self):
+        self.assertUsesIndex(
+            Invitation.objects.filter(responded_at__isnull=False, status=Invitation.Status.ACCEPTED),
+            "invitation_responded_status",
+        )
+        self.assertUsesIndex(
+            Invitation.objects.filter(guest=self.guest, responded_at__isnull=False).order_by("-responded_at"),
+            "invitation_guest_responded",
+        )
+
+    def test_normalized_text_is_kept_in_sync(self):
+        question = Question.objects.get(text=TRANSFER_Q)
+        question.text = "  Потрібен   ТРАНСФЕР? "
+        question.save(update_fields=["text"])
+        question.refresh_from_db()
+        self.assertEqual(question.normalized_text, "потрібен трансфер?")
+        self.assertTrue(Choice.objects.filter(question=question, normalized_text="ні").exists())
+
+
+class IdempotentSubmitTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_questionnaire()
+        cls.guest = Guest.objects.create(full_name="Ярослав", gender=Guest.Gender.MALE)
+
+    def setUp(self):
+        invalidate_questionnaire()
+        throttle.reset()
+        self.invitation = Invitation.objects.create(guest=self.guest)
+        self.url = reverse("submit_rsvp", args=[self.invitation.token])
+
+    def post(self, payload, key="", **extra):
+        headers = {"HTTP_IDEMPOTENCY_KEY": key} if key else {}
+        return self.client.post(self.url, json.dumps(payload), content_type="application/json", **headers, **extra)
+
+    def test_identical_resubmission_is_replayed_without_writes(self):
+        payload = {"attendance": "Так, з радістю буду!", "answers": {TRANSFER_Q: "Так"}}
+        first = self.post(payload, key="k1")
+        self.assertEqual(first.status_code, 200)
+
+        get_index()
+        with CaptureQueriesContext(connection) as queries:
+            again = self.post(payload, key="k1")
+            retry = self.post(payload)  # двойной клик без ключа
+        self.assertEqual(again.json(), first.json())
+        self.assertEqual(again["Idempotent-Replayed"], "true")
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertFalse([q for q in queries if not q["sql"].startswith("SELECT")])
+
+    def test_replay_survives_questionnaire_version_change(self):
+        # версия анкеты — метка процесса: другой воркер или перезапуск видят другую
+        payload = {"answers": {TRANSFER_Q: "Так"}}
+        first = self.post(payload, key="k1")
+        invalidate_questionnaire()
+        again = self.post(payload, key="k1")
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.json(), first.json())
+        self.assertEqual(again["Idempotent-Replayed"], "true")
+
+    def test_changed_payload_is_processed(self):
+        self.post({"answers": {TRANSFER_Q: "Так"}}, key="k1")
+        response = self.post({"answers": {TRANSFER_Q: "Ні"}}, key="k2")
+        self.assertFalse(response.has_header("Idempotent-Replayed"))
+        self.assertEqual(self.invitation.answers.get().choice.text, "Ні")
+
+    def test_reused_key_with_other_payload_is_rejected(self):
+        self.post({"answers": {TRANSFER_Q: "Так"}}, key="k1")
+        response = self.post({"answers": {TRANSFER_Q: "Ні"}}, key="k1")
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.invitation.answers.get().choice.text, "Так")
+
+    def test_replay_window_and_admin_edit_expire_the_cache(self):
+        payload = {"answers": {TRANSFER_Q: "Так"}}
+        self.post(payload)
+        Invitation.objects.filter(pk=self.invitation.pk).update(responded_at=timezone.now() - timedelta(days=2))
+        self.assertFalse(self.post(payload).has_header("Idempotent-Replayed"))
+
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "pass"))
+        self.client.post(
+            reverse("admin:invitations_invitation_change", args=[self.invitation.pk]),
+            {"guest": self.guest.pk, "status": Invitation.Status.DECLINED},
+        )
+        self.invitation.refresh_from_db()
+        self.assertEqual(self.invitation.payload_hash, "")
+        self.assertFalse(self.post(payload).has_header("Idempotent-Replayed"))
+
+    @override_settings(RSVP_THROTTLE_RATES={"token": "3/min", "ip": ""})
+    def test_token_is_throttled_before_touching_the_database(self):
+        for i in range(3):
+            self.assertEqual(self.post({"answers": {TRANSFER_Q: "Так"}, "note": str(i)}).status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.post({"answers": {TRANSFER_Q: "Ні"}})
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response["Retry-After"]), 1)
+
+    @override_settings(RSVP_THROTTLE_RATES={"token": "", "ip": "2/min"})
+    def test_ip_is_throttled_across_tokens(self):
+        other = Invitation.objects.create(guest=self.guest)
+        self.post({"answers": {}}, REMOTE_ADDR="10.0.0.1")
+        self.client.post(reverse("submit_rsvp", args=[other.token]), "{}", content_type="application/json", REMOTE_ADDR="10.0.0.1")
+        self.assertEqual(self.post({"answers": {}}, REMOTE_ADDR="10.0.0.1").status_code, 429)
+        self.assertEqual(self.post({"answers": {}}, REMOTE_ADDR="10.0.0.2").status_code, 200)
+
+    @override_settings(RSVP_THROTTLE_RATES={"token": "", "ip": "1/min"}, RSVP_TRUSTED_PROXIES=["10.0.0.0/8"])
+    def test_ip_behind_trusted_proxy_comes_from_forwarded_for(self):
+        def post(forwarded, remote="10.0.0.1"):
+            return self.post({"answers": {}}, REMOTE_ADDR=remote, HTTP_X_FORWARDED_FOR=forwarded).status_code
+
+        # разные гости за одним прокси — разные вёдра
+        self.assertEqual(post("203.0.113.5, 10.0.0.7"), 200)
+        self.assertEqual(post("203.0.113.6"), 200)
+        self.assertEqual(post("203.0.113.5"), 429)
+        # от недоверенного адреса X-Forwarded-For не учитывается
+        self.assertEqual(post("198.51.100.1", remote="192.0.2.1"), 200)
+        self.assertEqual(post("198.51.100.2", remote="192.0.2.1"), 429)
+
+    @override_settings(RSVP_THROTTLE_RATES={"token": "2/min", "ip": ""}, RSVP_THROTTLE_CACHE="default")
+    def test_shared_cache_backend(self):
+        self.assertEqual(throttle.check("abc", "", now=100.0), 0)
+        self.assertEqual(throttle.check("abc", "", now=100.0), 0)
+        self.assertAlmostEqual(throttle.check("abc", "", now=100.0), 30.0)
+        # через 30 секунд ведро пополнилось на единицу
+        self.assertEqual(throttle.check("abc", "", now=130.0), 0)
+
+
+class RsvpLogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_questionnaire()
+        cls.guest = Guest.objects.create(full_name="Ярослав", gender=Guest.Gender.MALE)
+
+    def setUp(self):
+        invalidate_questionnaire()
+        throttle.reset()
+        self.invitation = Invitation.objects.create(guest=self.guest)
+        self.url = reverse("submit_rsvp", args=[self.invitation.token])
+
+    def post(self, payload):
+        return self.client.post(self.url, json.dumps(payload), content_type="application/json")
+
+    def events(self, logs):
+        return [json.loads(record.getMessage()) for record in logs.records]
+
+    def test_one_json_event_per_submission(self):
+        with self.assertLogs("apps.invitations.rsvp", "INFO") as logs:
+            self.post({"answers": {TRANSFER_Q: "Можливо", "Неіснуюче питання": "Так", ALLERGY_Q: "Ні"}})
+        [event] = self.events(logs)
+        self.assertEqual(event["outcome"], "saved")
+        self.assertEqual(event["invitation"], self.invitation.pk)
+        self.assertEqual((event["saved"], event["skipped"]), (1, 2))
+        self.assertEqual(event["skip_reasons"], {"unknown_choice": 1, "unknown_question": 1})
+        self.assertNotIn(self.invitation.token, logs.output[0])
+        # без выборки и DEBUG подробности не собираются
+        self.assertNotIn("trace", event)
+
+    @override_settings(RSVP_LOG_SAMPLE_RATE=1)
+    def test_sampled_submission_carries_trace(self):
+        with self.assertLogs("apps.invitations.rsvp", "INFO") as logs:
+            self.post({"answers": {TRANSFER_Q: "Можливо"}})
+        [event] = self.events(logs)
+        [skip] = event["trace"]
+        self.assertEqual(skip["reason"], "unknown_choice")
+        self.assertEqual(skip["value"], "Можливо")
+        self.assertIn("Так", skip["available"])
+
+    def test_debug_level_enables_trace(self):
+        with self.assertLogs("apps.invitations.rsvp", "DEBUG") as logs:
+            self.post({"answers": {"Неіснуюче питання": "Так"}})
+        [event] = self.events(logs)
+        self.assertEqual(event["trace"], [{"reason": "unknown_question", "question": "Неіснуюче питання"}])
+
+    def test_replay_and_throttle_outcomes(self):
+        payload = {"answers": {TRANSFER_Q: "Так"}}
+        with override_settings(RSVP_THROTTLE_RATES={"token": "2/min", "ip": ""}):
+            with self.assertLogs("apps.invitations.rsvp", "INFO") as logs:
+                for _ in range(3):
+                    self.post(payload)
+        self.assertEqual([e["outcome"] for e in self.events(logs)], ["saved", "replayed", "throttled"])
+
+    def test_disabled_logger_formats_nothing(self):
+        logger = logging.getLogger("apps.invitations.rsvp")
+        previous = logger.level
+        logger.setLevel(logging.WARNING)
+        self.addCleanup(logger.setLevel, previous)
+        with mock.patch.object(rsvp_log.JsonEvent, "__str__") as dumps, \
+                mock.patch.object(RsvpReport, "as_dict") as as_dict:
+            response = self.post({"answers": {TRANSFER_Q: "Можливо"}})
+        self.assertEqual(response.json()["skipped"], 1)
+        dumps.assert_not_called()
+        as_dict.assert_not_called()
+
+
+@override_settings(INVITATION_OPEN_FLUSH_INTERVAL=0)
+class BenchmarkTests(TransactionTestCase):
+    # без обёртки теста в транзакцию: atomic в ingest_rsvp даёт те же запросы, что и в проде
+
+    def setUp(self):
+        invalidate_questionnaire()
+        self.addCleanup(benchmark.cleanup)
+
+    def run_bench(self, guests=20, requests=150):
+        tokens = benchmark.seed(guests)
+        with self.assertLogs("apps.invitations.rsvp", "INFO"):
+            return benchmark.run(tokens, requests).summary()
+
+    def test_traffic_mix_stays_within_committed_baseline(self):
+        summary = self.run_bench()
+        self.assertEqual(set(summary), set(benchmark.TRAFFIC_MIX))
+        self.assertEqual(sum(row["requests"] for row in summary.values()), 150)
+        baseline = benchmark.load_baseline()
+        self.assertEqual(set(baseline), set(benchmark.TRAFFIC_MIX))
+        self.assertTrue(all(row.get("p95_ms") for row in baseline.values()))
+        # время зависит от машины и загрузки: p95 сверяет только bench_flows,
+        # здесь — детерминированное число SQL-запросов и отсутствие ошибок
+        queries_only = {name: {"queries": row["queries"]} for name, row in baseline.items()}
+        self.assertEqual(benchmark.regressions(summary, queries_only), [])
+        for row in summary.values():
+            self.assertLessEqual(row["p50_ms"], row["p95_ms"])
+            self.assertLessEqual(row["p95_ms"], row["p99_ms"])
+
+    def test_query_counts_do_not_grow_with_guests(self):
+        small = self.run_bench(guests=10, requests=100)
+        benchmark.cleanup()
+        large = self.run_bench(guests=200, requests=100)
+        self.assertEqual(
+            {name: row["queries"] for name, row in small.items()},
+            {name: row["queries"] for name, row in large.items()},
+        )
+
+    def test_regressions(self):
+        row = {"queries": 7, "p95_ms": 20.0, "errors": 0}
+        self.assertEqual(benchmark.regressions({"submit_rsvp": row}, {"submit_rsvp": {"queries": 7, "p95_ms": 15.0}}), [])
+        problems = benchmark.regressions(
+            {"submit_rsvp": {**row, "queries": 8, "p95_ms": 30.0}, "index": {**row, "errors": 2}},
+            {"submit_rsvp": {"queries": 7, "p95_ms": 15.0}},
+        )
+        self.assertEqual(len(problems), 3)
+
+    def test_command_records_and_checks_baseline(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "baseline.json")
+            with self.assertLogs("apps.invitations.rsvp", "INFO"):
+                call_command("bench_flows", guests=10, requests=60, baseline=path, update_baseline=True, stdout=StringIO())
+            baseline = json.loads(open(path, encoding="utf-8").read())
+            self.assertIn("p95_ms", baseline["invitation_page"])
+            # гости бенчмарка удаляются после прогона
+            self.assertFalse(Guest.objects.filter(full_name__startswith=benchmark.BENCH_PREFIX).exists())
+
+            baseline["index"]["queries"] = -1
+            with open(path, "w", encoding="utf-8") as fh:
+                json.dump(baseline, fh)
+            with self.assertLogs("apps.invitations.rsvp", "INFO"), self.assertRaises(CommandError):
+                call_command("bench_flows", guests=10, requests=60, baseline=path, stdout=StringIO())
+
+
+class QuestionnaireIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_questionnaire()
+
+    def setUp(self):
+        invalidate_questionnaire()
+
+    def test_warm_index_does_not_touch_db(self):
+        index = get_index()
+        with self.assertNumQueries(0):
+            self.assertIs(get_index(), index)
+            self.assertEqual(index.find_question(FOOD_Q.upper()).text, FOOD_Q)
+            self.assertEqual(index.find_attendance_choice("так, з радістю буду!").text, "Так, з радістю буду!")
+
+    def test_warm_ingest_only_writes(self):
+        get_index()
+        invitation = Invitation.objects.create(guest=Guest.objects.create(full_name="Світлана"))
+        report = ingest_rsvp(invitation, {"answers": {FOOD_Q: ["Лосось"]}})
+        # UPDATE приглашения, DELETE и INSERT ответов, SELECT FOR UPDATE и upsert сводки,
+        # UPDATE счётчика варианта (+ SAVEPOINT/RELEASE внутри TestCase)
+        self.assertEqual(report.queries, 8)
+
+    def test_question_change_invalidates_index(self):
+        before = get_index()
+        question = Question.objects.get(text=TRANSFER_Q)
+        with self.captureOnCommitCallbacks(execute=True):
+            Choice.objects.create(question=question, text="Тільки назад", order=3)
+
+        after = get_index()
+        self.assertNotEqual(before.version, after.version)
+        self.assertIsNotNone(after.exact[TRANSFER_Q].choice_by_text("Тільки назад"))
+
+    def test_invalidation_from_another_process_is_seen(self):
+        before = get_index()
+        # правка без сигналов и сброса локальной копии: так её видит другой воркер
+        Choice.objects.filter(question__text=TRANSFER_Q, text="Так").update(text="Так, обидва боки")
+        self.assertIs(get_index(), before)
+        caches[settings.QUESTIONNAIRE_VERSION_CACHE].set(VERSION_CACHE_KEY, "другой процесс")
+        after = get_index()
+        self.assertNotEqual(before.version, after.version)
+        self.assertIsNotNone(after.exact[TRANSFER_Q].choice_by_text("Так, обидва боки"))
+
+    def test_index_expires_without_shared_stamp(self):
+        before = get_index()
+        Choice.objects.filter(question__text=TRANSFER_Q, text="Так").update(text="Так, обидва боки")
+        self.assertIs(get_index(), before)
+        # срок жизни индекса (QUESTIONNAIRE_INDEX_TTL) вышел
+        before.expires = 0
+        after = get_index()
+        self.assertIsNot(after, before)
+        self.assertIsNotNone(after.exact[TRANSFER_Q].choice_by_text("Так, обидва боки"))
+
+    def test_version_depends_only_on_content(self):
+        before = get_index()
+        invalidate_questionnaire()
+        self.assertEqual(get_index().version, before.version)
+
+    def test_inactive_question_is_dropped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Question.objects.filter(text=ALLERGY_Q).update(is_active=False)
+            invalidate_questionnaire()
+        self.assertNotIn(ALLERGY_Q, get_index().exact)
+
+
+@override_settings(INVITATION_OPEN_FLUSH_INTERVAL=0)
+class InvitationPageCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.guest = Guest.objects.create(full_name="мама Світлана")
+
+    def setUp(self):
+        page_cache.get_cache().clear()
+        self.invitation = Invitation.objects.create(guest=self.guest)
+        self.url = reverse("invitation_page", args=[self.invitation.token])
+
+    def tearDown(self):
+        tracker.flush()
+
+    def test_repeat_visit_is_served_from_cache(self):
+        first = self.client.get(self.url)
+        self.assertContains(first, "Дорога мама Світлана!")
+        self.assertContains(first, "Запрошення для мами Світлани")
+
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        # CSRF-токен маскируется заново на каждый запрос, остальной HTML тот же
+        self.assertEqual(len(second.content), len(first.content))
+        self.assertNotContains(second, page_cache.CSRF_PLACEHOLDER)
+        self.assertContains(second, f'content="http://testserver{self.url}"')
+
+    def test_device_classes_are_cached_separately(self):
+        pc = self.client.get(self.url)
+        mobile = self.client.get(self.url, HTTP_USER_AGENT=IPHONE_UA)
+        self.assertContains(pc, 'value="u1079u1072u1087u1088u1086u1096u1077u1085u1085u1103"')
+        self.assertContains(mobile, "home-page-mobile")
+
+    def test_guest_edit_invalidates_page(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.guest.full_name = "тато Сергій"
+            self.guest.save()
+        self.assertContains(self.client.get(self.url), "Запрошення для тата Сергія")
+
+    def test_invalidation_does_not_depend_on_local_cache(self):
+        self.client.get(self.url)
+        self.assertIsNotNone(page_cache.get_page(self.invitation.token, "pc"))
+        # LocMem других воркеров отсюда не очистить: меняется только общий штамп токена
+        with mock.patch.object(page_cache, "get_cache") as local_cache:
+            page_cache.invalidate_tokens([self.invitation.token])
+        local_cache.assert_not_called()
+        self.assertIsNone(page_cache.get_page(self.invitation.token, "pc"))
+
+    def test_rsvp_does_not_invalidate_page(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.invitation.mark_responded()
+            # настоящий приём RSVP пишет ещё и ключ/хэш/ответ для повторов
+            ingest_rsvp(self.invitation, {"answers": {}, "note": "Дякуємо"}, submission_key="k1", digest="abc")
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+    def test_unknown_token(self):
+        self.assertEqual(self.client.get(reverse("invitation_page", args=["missing"])).status_code, 404)
+
+    def test_modal_is_not_inlined_or_prefetched(self):
+        response = self.client.get(self.url)
+        modal_url = reverse("rsvp_modal")
+        self.assertNotContains(response, 'id="modalOverlay"')
+        self.assertContains(response, f'<meta name="rsvp-modal" content="{modal_url}">')
+        self.assertNotContains(response, 'rel="prefetch"')
+        self.assertContains(response, '<meta name="guest-name" content="мама Світлана">')
+
+    def test_modal_fragment_is_shared_and_revalidated(self):
+        response = self.client.get(reverse("rsvp_modal"))
+        self.assertContains(response, 'id="modalOverlay"')
+        self.assertContains(response, 'loading="lazy"')
+        self.assertNotContains(response, "мама Світлана")
+        self.assertEqual(response["Cache-Control"], "public, max-age=3600")
+        with self.assertNumQueries(0):
+            again = self.client.get(reverse("rsvp_modal"), HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(again.status_code, 304)
+
+    def test_genitive_is_stored_on_save(self):
+        self.assertEqual(self.guest.full_name_genitive, "мами Світлани")
+        self.guest.full_name = "тато Сергій"
+        self.guest.gender = Guest.Gender.MALE
+        self.guest.save(update_fields=["full_name", "gender"])
+        self.guest.refresh_from_db()
+        self.assertEqual(self.guest.full_name_genitive, "тата Сергія")
+
+
+@override_settings(INVITATION_SHELL_MODE=True, INVITATION_OPEN_FLUSH_INTERVAL=0)
+class InvitationShellTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_questionnaire()
+        cls.guest = Guest.objects.create(full_name="тато Сергій", gender=Guest.Gender.MALE)
+
+    def setUp(self):
+        invalidate_questionnaire()
+        page_cache.get_cache().clear()
+        self.invitation = Invitation.objects.create(guest=self.guest)
+        self.url = reverse("invitation_page", args=[self.invitation.token])
+
+    def tearDown(self):
+        tracker.flush()
+
+    def test_shell_is_shared_and_revalidated(self):
+        # первый визит проверяет токен, дальше он помнится
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertNotContains(response, "Сергій")
+        self.assertContains(response, 'name="invitation-shell"')
+        self.assertEqual(response["Cache-Control"], "public, max-age=300")
+
+        other = Invitation.objects.create(guest=Guest.objects.create(full_name="Світлана"))
+        other_response = self.client.get(reverse("invitation_page", args=[other.token]))
+        self.assertEqual(other_response["ETag"], response["ETag"])
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+    def test_guest_data(self):
+        ingest_rsvp(self.invitation, {"attendance": "Так, з радістю буду!", "note": "До зустрічі"})
+        response = self.client.get(reverse("invitations:guest_data", args=[self.invitation.token]))
+
+        data = response.json()
+        self.assertEqual(data["greeting"], "Дорогий тато Сергій!")
+        self.assertEqual(data["name_genitive"], "тата Сергія")
+        self.assertEqual(data["rsvp"]["status"], Invitation.Status.ACCEPTED)
+        self.assertEqual(data["rsvp"]["note"], "До зустрічі")
+        self.assertEqual(len(data["rsvp"]["answers"]), 1)
+        self.assertTrue(data["csrf_token"])
+        self.assertEqual(response["Cache-Control"], "private, no-store")
+        self.assertEqual(tracker.pending(), 1)
+
+    def test_preview_bot_gets_personalized_page(self):
+        response = self.client.get(self.url, HTTP_USER_AGENT=TELEGRAM_UA)
+        self.assertContains(response, "Запрошення для тата Сергія")
+        self.assertEqual(tracker.pending(), 0)
+
+    def test_guest_data_unknown_token(self):
+        response = self.client.get(reverse("invitations:guest_data", args=["missing"]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_unknown_token_gets_404_not_shell(self):
+        response = self.client.get(reverse("invitation_page", args=["missing"]))
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn("public", response.get("Cache-Control", ""))
+
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.invitation.delete()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+@override_settings(INVITATION_OPEN_FLUSH_INTERVAL=0)
+class OpenTrackingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.guest = Guest.objects.create(full_name="Світлана")
+
+    def setUp(self):
+        page_cache.get_cache().clear()
+        tracker.flush()
+        self.invitation = Invitation.objects.create(guest=self.guest)
+        self.url = reverse("invitation_page", args=[self.invitation.token])
+
+    def tearDown(self):
+        tracker.flush()
+
+    def test_page_view_does_not_write(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+        self.invitation.refresh_from_db()
+        self.assertIsNone(self.invitation.opened_at)
+        self.assertEqual(tracker.pending(), 1)
+
+    def test_opens_are_coalesced_into_one_batch(self):
+        other = Invitation.objects.create(guest=self.guest)
+        for _ in range(3):
+            self.client.get(self.url)
+        self.client.get(self.url, HTTP_USER_AGENT=IPHONE_UA)
+        self.client.get(reverse("invitation_page", args=[other.token]))
+        self.client.get(self.url, HTTP_USER_AGENT=TELEGRAM_UA)
+
+        # SELECT id по токенам + один bulk_update
+        with self.assertNumQueries(2):
+            self.assertEqual(tracker.flush(), 2)
+
+        self.invitation.refresh_from_db()
+        self.assertEqual(self.invitation.open_count, 4)
+        self.assertEqual(self.invitation.last_device, "mobile")
+        self.assertIsNotNone(self.invitation.opened_at)
+        self.assertGreaterEqual(self.invitation.last_opened_at, self.invitation.opened_at)
+        other.refresh_from_db()
+        self.assertEqual(other.open_count, 1)
+
+    def test_first_open_is_kept(self):
+        self.client.get(self.url)
+        tracker.flush()
+        self.invitation.refresh_from_db()
+        first_opened = self.invitation.opened_at
+
+        self.client.get(self.url)
+        tracker.flush()
+        self.invitation.refresh_from_db()
+        self.assertEqual(self.invitation.opened_at, first_opened)
+        self.assertEqual(self.invitation.open_count, 2)
+
+
+@override_settings(INVITATION_OPEN_FLUSH_INTERVAL=0)
+class AsyncViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_questionnaire()
+        cls.guest = Guest.objects.create(full_name="Ярослав", gender=Guest.Gender.MALE)
+
+    def setUp(self):
+        invalidate_questionnaire()
+        page_cache.get_cache().clear()
+        self.invitation = Invitation.objects.create(guest=self.guest)
+
+    def tearDown(self):
+        tracker.flush()
+
+    async def test_invitation_page(self):
+        response = await self.async_client.get(reverse("invitation_page", args=[self.invitation.token]))
+        self.assertContains(response, "Дорогий Ярослав!")
+        missing = await self.async_client.get(reverse("invitation_page", args=["missing"]))
+        self.assertEqual(missing.status_code, 404)
+
+    async def test_submit_rsvp(self):
+        response = await self.async_client.post(
+            reverse("submit_rsvp", args=[self.invitation.token]),
+            data=json.dumps({"attendance": "Так, з радістю буду!", "answers": {FOOD_Q: ["Лосось"]}}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.json(), {"ok": True, "saved": 2, "skipped": 0})
+        self.assertEqual(await self.invitation.answers.acount(), 2)
+
+    async def test_get_is_not_allowed(self):
+        response = await self.async_client.get(reverse("submit_rsvp", args=[self.invitation.token]))
+        self.assertEqual(response.status_code, 405)
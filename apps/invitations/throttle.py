@@ -0,0 +1,164 @@
+"""
+Ограничение частоты отправки RSVP: token bucket на токен приглашения и на IP.
+
+Ведро ёмкостью N пополняется со скоростью N за период («10/min»), каждая
+отправка забирает одну единицу; пустое ведро — ответ 429 с Retry-After.
+Состояние хранится в памяти процесса (словарь под блокировкой, без
+запросов к БД и кэшу). Если задан RSVP_THROTTLE_CACHE, вёдра лежат в этом
+кэше Django и общие для всех процессов; чтение-запись там не атомарны, так
+что при гонке лимит может быть превышен на единицы — для защиты пути
+записи этого достаточно.
+
+За обратным прокси REMOTE_ADDR у всех гостей один и тот же, и лимит на IP
+стал бы общим лимитом сайта. Поэтому адрес клиента берётся из
+X-Forwarded-For, но только если запрос пришёл от прокси из
+RSVP_TRUSTED_PROXIES (client_ip); иначе заголовок подделывается кем угодно.
+"""
+from __future__ import annotations
+
+import ipaddress
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+PERIODS = {"s": 1, "sec": 1, "m": 60, "min": 60, "h": 3600, "hour": 3600, "d": 86400, "day": 86400}
+
+# сколько вёдер держать в памяти процесса, прежде чем выбросить полные
+LOCAL_MAX_BUCKETS = 10000
+CACHE_KEY_PREFIX = "invitations:throttle:"
+
+
+@dataclass(frozen=True)
+class Rate:
+    capacity: float
+    per_second: float
+
+    @property
+    def period(self) -> float:
+        return self.capacity / self.per_second
+
+
+@lru_cache(maxsize=16)
+def parse_rate(value: str | None) -> Rate | None:
+    """«10/min» -> Rate(10, 10/60); пустая строка — без ограничения."""
+    if not value:
+        return None
+    count, _, period = value.partition("/")
+    seconds = PERIODS[period.strip().lower()]
+    return Rate(capacity=float(count), per_second=float(count) / seconds)
+
+
+def _refill(state, rate: Rate, now: float) -> float:
+    if state is None:
+        return rate.capacity
+    tokens, updated = state
+    return min(rate.capacity, tokens + (now - updated) * rate.per_second)
+
+
+class LocalBuckets:
+    def __init__(self, max_buckets: int = LOCAL_MAX_BUCKETS):
+        self.max_buckets = max_buckets
+        self._buckets: dict[str, tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: Rate, now: float) -> float:
+        """0 — отправка разрешена, иначе — через сколько секунд появится единица."""
+        with self._lock:
+            tokens = _refill(self._buckets.get(key), rate, now)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                return (1 - tokens) / rate.per_second
+            self._buckets[key] = (tokens - 1, now)
+            if len(self._buckets) > self.max_buckets:
+                self._prune(rate, now)
+            return 0.0
+
+    def _prune(self, rate: Rate, now: float) -> None:
+        # ведро, которое успело наполниться, ничем не отличается от отсутствующего
+        full = [key for key, (_, updated) in self._buckets.items() if now - updated >= rate.period]
+        for key in full:
+            del self._buckets[key]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBuckets:
+    def __init__(self, alias: str):
+        self.alias = alias
+
+    def take(self, key: str, rate: Rate, now: float) -> float:
+        cache = caches[self.alias]
+        cache_key = CACHE_KEY_PREFIX + key
+        tokens = _refill(cache.get(cache_key), rate, now)
+        timeout = int(rate.period) + 1
+        if tokens < 1:
+            cache.set(cache_key, (tokens, now), timeout)
+            return (1 - tokens) / rate.per_second
+        cache.set(cache_key, (tokens - 1, now), timeout)
+        return 0.0
+
+
+_local = LocalBuckets()
+
+
+def _store():
+    alias = getattr(settings, "RSVP_THROTTLE_CACHE", "")
+    return CacheBuckets(alias) if alias else _local
+
+
+@lru_cache(maxsize=4)
+def _networks(proxies: tuple[str, ...]):
+    return tuple(ipaddress.ip_network(proxy.strip(), strict=False) for proxy in proxies if proxy.strip())
+
+
+def _trusted(address: str, networks) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in networks)
+
+
+def client_ip(request) -> str:
+    """
+    IP гостя: REMOTE_ADDR, а если он — доверенный прокси, то самый правый
+    адрес X-Forwarded-For, не принадлежащий доверенным прокси.
+    """
+    remote = request.META.get("REMOTE_ADDR", "")
+    networks = _networks(tuple(getattr(settings, "RSVP_TRUSTED_PROXIES", ())))
+    if not networks or not _trusted(remote, networks):
+        return remote
+    forwarded = [part.strip() for part in request.META.get("HTTP_X_FORWARDED_FOR", "").split(",") if part.strip()]
+    for address in reversed(forwarded):
+        if not _trusted(address, networks):
+            return address
+    return forwarded[0] if forwarded else remote
+
+
+def check(token: str, ip: str, now: float | None = None) -> float:
+    """
+    Забирает единицу из вёдер IP и токена. 0 — можно обрабатывать,
+    иначе — Retry-After в секундах.
+    """
+    now = time.time() if now is None else now
+    store = _store()
+    for scope, ident in (("ip", ip), ("token", token)):
+        rate = parse_rate(settings.RSVP_THROTTLE_RATES.get(scope))
+        if rate is None or not ident:
+            continue
+        wait = store.take(f"{scope}:{ident}", rate, now)
+        if wait:
+            return wait
+    return 0.0
+
+
+def reset() -> None:
+    """Очищает вёдра процесса (для тестов); общий кэш не трогает."""
+    _local.reset()
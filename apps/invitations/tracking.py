@@ -0,0 +1,138 @@
+"""
+Учёт открытий приглашений.
+
+Страница не пишет в БД: открытие кладётся в буфер в памяти процесса, где
+повторные открытия одного токена схлопываются (первое/последнее время,
+счётчик, класс устройства). Фоновый поток раз в
+settings.INVITATION_OPEN_FLUSH_INTERVAL секунд сбрасывает буфер пачкой —
+один SELECT id по токенам и один bulk_update. Если буфер дорос до
+settings.INVITATION_OPEN_BUFFER_SIZE, поток будится раньше; при остановке
+процесса остаток сбрасывается через atexit.
+
+Боты, которые забирают OG-теги для превью ссылок (Telegram, Viber,
+WhatsApp, ...), открытием не считаются — их отсекают вызывающие
+(apps.main.devices).
+"""
+from __future__ import annotations
+
+import atexit
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import DateTimeField, F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class OpenStats:
+    """Схлопнутые открытия одного токена между двумя сбросами."""
+    first: datetime
+    last: datetime
+    count: int
+    device: str
+
+
+class OpenTracker:
+    def __init__(self):
+        self._pending: dict[str, OpenStats] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._worker: threading.Thread | None = None
+
+    def record(self, token: str, device: str = "", at: datetime | None = None) -> None:
+        """Ставит открытие в буфер; никогда не обращается к БД."""
+        at = at or timezone.now()
+        with self._lock:
+            stats = self._pending.get(token)
+            if stats is None:
+                self._pending[token] = OpenStats(first=at, last=at, count=1, device=device)
+            else:
+                stats.last = max(stats.last, at)
+                stats.count += 1
+                stats.device = device or stats.device
+            size = len(self._pending)
+
+        self._ensure_worker()
+        if size >= settings.INVITATION_OPEN_BUFFER_SIZE:
+            self._wakeup.set()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self) -> int:
+        """Записывает буфер в БД пачкой. Возвращает число обновлённых приглашений."""
+        from .models import Invitation
+
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return 0
+
+        try:
+            invitations = list(Invitation.objects.filter(token__in=list(batch)).only("pk", "token"))
+            for invitation in invitations:
+                stats = batch[invitation.token]
+                invitation.opened_at = Coalesce(F("opened_at"), Value(stats.first, output_field=DateTimeField()))
+                invitation.last_opened_at = stats.last
+                invitation.open_count = F("open_count") + stats.count
+                invitation.last_device = stats.device
+            if invitations:
+                Invitation.objects.bulk_update(
+                    invitations, ["opened_at", "last_opened_at", "open_count", "last_device"]
+                )
+        except Exception:
+            self._requeue(batch)
+            raise
+        return len(invitations)
+
+    def _requeue(self, batch: dict[str, OpenStats]) -> None:
+        """Возвращает несохранённую пачку в буфер, чтобы не потерять открытия."""
+        with self._lock:
+            for token, old in batch.items():
+                stats = self._pending.get(token)
+                if stats is None:
+                    self._pending[token] = old
+                else:
+                    stats.first = min(stats.first, old.first)
+                    stats.last = max(stats.last, old.last)
+                    stats.count += old.count
+                    stats.device = stats.device or old.device
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None or settings.INVITATION_OPEN_FLUSH_INTERVAL <= 0:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="invitation-open-tracker", daemon=True)
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(settings.INVITATION_OPEN_FLUSH_INTERVAL)
+            self._wakeup.clear()
+            try:
+                close_old_connections()
+                count = self.flush()
+                if count:
+                    logger.info(f"Открытия приглашений записаны: {count}")
+            except Exception:
+                logger.exception("Не удалось записать открытия приглашений")
+
+
+tracker = OpenTracker()
+
+
+@atexit.register
+def _flush_on_exit() -> None:
+    try:
+        tracker.flush()
+    except Exception:
+        logger.exception("Не удалось записать открытия приглашений при остановке")
@@ -1,8 +1,9 @@
 from django.urls import path
-from .views import invitation_page, submit_rsvp
+from .views import invitation_page, rsvp_modal, submit_rsvp
 
 urlpatterns = [
     path("Invitation/<str:token>/", invitation_page, name="invitation_page"),
+    path("invitation-modal/", rsvp_modal, name="rsvp_modal"),
     path("api/invitation/<str:token>/submit/", submit_rsvp, name="submit_rsvp"),
 ]
 
@@ -1,48 +1,58 @@
 import json
-import logging
+import math
 
-from django.http import JsonResponse, HttpResponseBadRequest
-from django.shortcuts import get_object_or_404, render
-from django.utils import timezone
-from django.views.decorators.http import require_POST
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse, HttpResponseBadRequest
+from django.views.decorators.http import require_GET, require_POST
 from django.views.decorators.csrf import csrf_protect
 
-from .models import Invitation, Question, Choice, Answer
-from apps.main.utils import is_mobile_device, ua_genitive_phrase
-
-
-logger = logging.getLogger(__name__)
-
-
-def invitation_page(request, token: str):
-    invitation = get_object_or_404(Invitation, token=token)
-
-    # отметить opened_at
-    if not invitation.opened_at:
-        invitation.opened_at = timezone.now()
-        invitation.save(update_fields=["opened_at"])
-
-    # Определяем устройство
-    user_agent = request.META.get("HTTP_USER_AGENT", "")
-    is_mobile = is_mobile_device(user_agent)
-
-    template = "main/home_mobile.html" if is_mobile else "main/home_pc.html"
-
-    response = render(
-        request,
-        template,
-        {
-            "invitation": invitation,
-            "guest": invitation.guest,
-            "token": invitation.token,
-            "absolute_url": request.build_absolute_uri(),
-            # ✅ ВАЖНО: имя в родительном падеже для preview/карточек ссылок
-            "guest_name_for_link": ua_genitive_phrase(invitation.guest.full_name) if invitation.guest else "",
-        },
-    )
+from . import page_cache, rsvp_log, throttle
+from .models import Invitation
+from .questionnaire import aget_index
+from .services import IdempotencyConflict, PayloadError, ingest_rsvp, payload_hash, replay_response
+from .tracking import tracker
+from apps.main.devices import DEVICE_VARY, classify_request
+
+
+async def invitation_page(request, token: str):
+    # Определяем устройство (UA + Sec-CH-UA-Mobile, с кэшем по строке UA)
+    info = classify_request(request)
+    device = info.device
+
+    # Боты превью ссылок JS не выполняют: им нужна персональная страница с OG-тегами,
+    # но открытием приглашения их визит не считается
+    preview_bot = info.bot
+
+    # Оболочка без данных гостя; имя и состояние RSVP подгружает JS (api/invitations/<token>/guest/)
+    if settings.INVITATION_SHELL_MODE and not preview_bot:
+        # оболочка кэшируется публично, поэтому неизвестный токен — 404, а не она
+        if not await page_cache.token_exists(token):
+            raise Http404("Invitation not found")
+        return page_cache.shell_response(request, device)
+
+    # Повторный визит — это только чтение из кэша, без рендера и без UPDATE.
+    # Ключ страницы зависит от версии анкеты и штампа гостя; индекс
+    # перестраивается в sync-потоке только после инвалидации или по TTL,
+    # а кэш страниц — LocMem в памяти процесса и вызывается напрямую
+    await aget_index()
+    html = page_cache.get_page(token, device)
+    if html is None:
+        try:
+            invitation = await Invitation.objects.select_related("guest").aget(token=token)
+        except Invitation.DoesNotExist:
+            raise Http404("Invitation not found")
+        html = page_cache.render_page(invitation, device)
+        page_cache.store_page(token, device, html)
+
+    # открытие пишется в БД пачкой фоновым потоком (tracking.py), ответ его не ждёт
+    if not preview_bot:
+        tracker.record(token, device)
+
+    response = HttpResponse(page_cache.personalize(html, request))
 
     # Настройка кэширования
-    response["Vary"] = "User-Agent"
+    response["Vary"] = DEVICE_VARY
     response["Cache-Control"] = "no-cache, no-store, must-revalidate"
     response["Pragma"] = "no-cache"
     response["Expires"] = "0"
@@ -50,230 +60,60 @@ def invitation_page(request, token: str):
     return response
 
 
+@require_GET
+async def rsvp_modal(request):
+    # общий фрагмент без данных гостя: имя подставляет JS, токен берётся из URL страницы
+    await aget_index()
+    return page_cache.modal_response(request)
+
+
 @require_POST
 @csrf_protect
-def submit_rsvp(request, token: str):
-    invitation = get_object_or_404(Invitation, token=token)
+async def submit_rsvp(request, token: str):
+    # лимит проверяется до любого запроса к БД
+    wait = throttle.check(token, throttle.client_ip(request))
+    if wait:
+        rsvp_log.log_submission("throttled", token, retry_after=round(wait, 3))
+        response = JsonResponse({"ok": False, "error": "rate_limited"}, status=429)
+        response["Retry-After"] = str(math.ceil(wait))
+        return response
+
+    try:
+        invitation = await Invitation.objects.aget(token=token)
+    except Invitation.DoesNotExist:
+        rsvp_log.log_submission("not_found", token)
+        raise Http404("Invitation not found")
 
     try:
         payload = json.loads(request.body.decode("utf-8"))
     except Exception:
+        rsvp_log.log_submission("bad_request", token, invitation=invitation.pk, error="invalid_json")
         return HttpResponseBadRequest("Invalid JSON")
 
-    note = (payload.get("note") or "").strip()
-    attendance = (payload.get("attendance") or "").strip()
-    answers = payload.get("answers") or {}
-
-    logger.info(f"=== ОБРАБОТКА RSVP ДЛЯ {invitation.guest.full_name} (token: {token}) ===")
-    logger.info(f"Attendance: {attendance}")
-    logger.info(f"Note: {note[:100] if note else '(пусто)'}")
-    logger.info(f"Всего вопросов в answers: {len(answers)}")
-    logger.info(f"Вопросы в answers: {list(answers.keys())}")
-
-    # 1) статус по attendance
-    if attendance:
-        att_lower = attendance.lower()
-        if "не зможу" in att_lower or "не сможу" in att_lower:
-            invitation.status = Invitation.Status.DECLINED
-        else:
-            invitation.status = Invitation.Status.ACCEPTED
-
-    invitation.note = note
-    invitation.responded_at = timezone.now()
-    invitation.save(update_fields=["status", "note", "responded_at"])
-
-    # Счётчики
-    saved_count = 0
-    skipped_count = 0
-
-    # 1.5) ДОПОЛНИТЕЛЬНО: сохранить attendance как Answer (чтобы в админке был ответ на 1-й вопрос)
-    # ВАЖНО: ищем мягко (icontains), чтобы не сломалось из-за "?" и пробелов
-    ATTENDANCE_Q_TEXT = "Чи зможете ви бути присутніми на весіллі"
-    attendance_q = Question.objects.filter(is_active=True, text__icontains=ATTENDANCE_Q_TEXT).first()
-
-    if attendance:
-        if attendance_q:
-            # Пытаемся найти Choice под пришедший текст
-            attendance_choice = Choice.objects.filter(
-                question=attendance_q,
-                text__iexact=attendance
-            ).first()
-
-            # Запасной вариант: сравнение по началу строки (если чуть отличается пунктуация/окончание)
-            if not attendance_choice:
-                attendance_choice = Choice.objects.filter(
-                    question=attendance_q,
-                    text__istartswith=attendance.strip()[:10]
-                ).first()
-
-            if attendance_choice:
-                Answer.objects.filter(invitation=invitation, question=attendance_q).delete()
-                Answer.objects.create(
-                    invitation=invitation,
-                    question=attendance_q,
-                    choice=attendance_choice
-                )
-                saved_count += 1
-                logger.info(f"✓ Attendance сохранён в Answer: {attendance_choice.text}")
-            else:
-                logger.warning(f"✗ Choice для attendance не найден: '{attendance}'")
-                logger.warning(
-                    f"  Доступные choices: {list(Choice.objects.filter(question=attendance_q).values_list('text', flat=True))}"
-                )
-                skipped_count += 1
-        else:
-            logger.warning(f"✗ Вопрос attendance не найден в БД (icontains): '{ATTENDANCE_Q_TEXT}'")
-            skipped_count += 1
-
-    # 2) сохранение ответов из payload["answers"]
-    all_questions = Question.objects.filter(is_active=True)
-
-    questions_exact = {q.text.strip(): q for q in all_questions}
-    questions_normalized = {}
-    for q in all_questions:
-        normalized = q.text.strip().lower().replace("  ", " ")
-        questions_normalized[normalized] = q
-
-    logger.info(f"Активных вопросов в БД: {len(questions_exact)}")
-    logger.info(f"Тексты вопросов в БД: {list(questions_exact.keys())}")
-
-    for q_text, selected in answers.items():
-        q_text_norm = (q_text or "").strip()
-        if not q_text_norm:
-            logger.warning("Пропущен пустой вопрос")
-            skipped_count += 1
-            continue
-
-        # точное совпадение
-        question = questions_exact.get(q_text_norm)
-
-        # нормализованное
-        if not question:
-            normalized = q_text_norm.lower().replace("  ", " ")
-            question = questions_normalized.get(normalized)
-            if question:
-                logger.info(f"Вопрос найден по нормализованному тексту: '{q_text_norm}' → '{question.text}'")
-
-        # частичное совпадение
-        if not question:
-            for db_q in all_questions:
-                db_text_norm = db_q.text.strip()
-                if q_text_norm in db_text_norm or db_text_norm in q_text_norm:
-                    question = db_q
-                    logger.info(f"Вопрос найден по частичному совпадению: '{q_text_norm}' → '{question.text}'")
-                    break
-
-        if not question:
-            logger.warning(f"Вопрос не найден в БД: '{q_text_norm}'")
-            logger.warning(f"  Полученный ответ: {selected}")
-            logger.warning(f"  Доступные вопросы в БД: {list(questions_exact.keys())}")
-            skipped_count += 1
-            continue
-
-        logger.info(f"Обработка вопроса: '{q_text_norm}' → {selected}")
-
-        # MULTI
-        if question.kind == Question.Kind.MULTI:
-            if isinstance(selected, str):
-                selected_list = [selected]
-            else:
-                selected_list = list(selected or [])
-
-            selected_list = [str(s).strip() for s in selected_list if str(s).strip()]
-
-            Answer.objects.filter(invitation=invitation, question=question).delete()
-
-            for choice_text in selected_list:
-                choice = Choice.objects.filter(question=question, text=choice_text).first()
-                if choice:
-                    Answer.objects.create(
-                        invitation=invitation,
-                        question=question,
-                        choice=choice
-                    )
-                    saved_count += 1
-                    logger.info(f"  ✓ Сохранен ответ: {choice_text}")
-                else:
-                    logger.warning(f"  ✗ Choice не найден: '{choice_text}' для вопроса '{q_text_norm}'")
-                    skipped_count += 1
-
-        # SINGLE
-        else:
-            if isinstance(selected, list):
-                selected_value = (selected[0] if selected else "")
-            else:
-                selected_value = selected
-
-            selected_value = str(selected_value).strip()
-            if not selected_value:
-                skipped_count += 1
-                continue
-
-            # Специальная обработка для "+1" формата "Так (....)"
-            if "+1" in q_text_norm and "(" in selected_value and selected_value.startswith("Так"):
-                base_text = "Так"
-                base_choice = Choice.objects.filter(question=question, text=base_text).first()
-
-                companion_types_text = selected_value.split("(", 1)[1].split(")", 1)[0].strip()
-                companion_types = [t.strip() for t in companion_types_text.split(",") if t.strip()]
-
-                Answer.objects.filter(invitation=invitation, question=question).delete()
-
-                if base_choice:
-                    Answer.objects.create(invitation=invitation, question=question, choice=base_choice)
-                    saved_count += 1
-                    logger.info(f"  ✓ Сохранен ответ: {base_text}")
-                else:
-                    logger.warning(f"  ✗ Base choice не найден: '{base_text}'")
-                    skipped_count += 1
-
-                for companion_type in companion_types:
-                    type_choice = Choice.objects.filter(question=question, text=companion_type).first()
-                    if type_choice:
-                        Answer.objects.create(invitation=invitation, question=question, choice=type_choice)
-                        saved_count += 1
-                        logger.info(f"  ✓ Сохранен ответ: {companion_type}")
-                    else:
-                        logger.warning(f"  ✗ Choice не найден для типа спутника: '{companion_type}'")
-                        skipped_count += 1
-
-                continue
-
-            # точное совпадение choice
-            choice = Choice.objects.filter(question=question, text=selected_value).first()
-
-            # если "Так (....)" → пробуем "Так"
-            if not choice:
-                base_text = selected_value.split("(", 1)[0].strip()
-                if base_text and base_text != selected_value:
-                    choice = Choice.objects.filter(question=question, text=base_text).first()
-                    if choice:
-                        logger.info(f"  Найден choice по базовому тексту: '{base_text}' вместо '{selected_value}'")
-
-            # частичное совпадение
-            if not choice:
-                for c in Choice.objects.filter(question=question):
-                    if c.text in selected_value or selected_value in c.text:
-                        choice = c
-                        logger.info(f"  Найден choice по частичному совпадению: '{c.text}' для '{selected_value}'")
-                        break
-
-            if not choice:
-                logger.warning(f"  ✗ Choice не найден для значения: '{selected_value}' (вопрос: '{q_text_norm}')")
-                logger.warning(
-                    f"  Доступные choices: {list(Choice.objects.filter(question=question).values_list('text', flat=True))}"
-                )
-                skipped_count += 1
-                continue
-
-            Answer.objects.filter(invitation=invitation, question=question).delete()
-            Answer.objects.create(invitation=invitation, question=question, choice=choice)
-            saved_count += 1
-            logger.info(f"  ✓ Сохранен ответ: {selected_value}")
+    # повтор той же отправки — сохранённый ответ, без записи
+    submission_key = request.headers.get("Idempotency-Key", "")[:64]
+    digest = payload_hash(payload)
+    try:
+        cached = replay_response(invitation, submission_key, digest, settings.RSVP_IDEMPOTENCY_WINDOW)
+    except IdempotencyConflict as exc:
+        rsvp_log.log_submission("conflict", token, invitation=invitation.pk)
+        return JsonResponse({"ok": False, "error": str(exc)}, status=422)
+    if cached is not None:
+        rsvp_log.log_submission("replayed", token, invitation=invitation.pk)
+        response = JsonResponse(cached)
+        response["Idempotent-Replayed"] = "true"
+        return response
+
+    # запись идёт в transaction.atomic, а транзакции в async ORM недоступны,
+    # поэтому весь приём RSVP — один переход в sync-поток
+    try:
+        report = await sync_to_async(ingest_rsvp)(
+            invitation, payload, submission_key=submission_key, digest=digest, trace=rsvp_log.should_trace(),
+        )
+    except PayloadError as exc:
+        rsvp_log.log_submission("bad_request", token, invitation=invitation.pk, error=str(exc))
+        return HttpResponseBadRequest(str(exc))
 
-    logger.info("=== ИТОГИ ОБРАБОТКИ ===")
-    logger.info(f"Сохранено ответов: {saved_count}")
-    logger.info(f"Пропущено: {skipped_count}")
-    logger.info(f"Всего обработано answers: {len(answers)}")
+    rsvp_log.log_submission("saved", token, report, invitation=invitation.pk)
 
-    return JsonResponse({"ok": True, "saved": saved_count, "skipped": skipped_count})
+    return JsonResponse(report.response())
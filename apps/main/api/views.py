@@ -1,22 +1,33 @@
+import hmac
+
+from django.conf import settings
 from django.shortcuts import render
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_GET
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from apps.main.utils import is_mobile_device
+from apps.invitations import page_cache
+from apps.main import metrics
+from apps.main.devices import DEVICE_VARY, device_class
 
 # Create your views here.
 
-def index(request):
+async def index(request):
     """Главная страница сайта (HTML)"""
-    user_agent = request.META.get('HTTP_USER_AGENT', '')
-    is_mobile = is_mobile_device(user_agent)
+    device = device_class(request)
+
+    # В режиме оболочки главная — это та же общая страница с ETag
+    if settings.INVITATION_SHELL_MODE:
+        return page_cache.shell_response(request, device)
     
-    template = 'main/home_mobile.html' if is_mobile else 'main/home_pc.html'
+    template = page_cache.TEMPLATES[device]
     
-    response = render(request, template)
+    with metrics.template_render():
+        response = render(request, template)
     
-    # Настройка кэширования: Vary: User-Agent для правильного кэширования разных версий
-    response['Vary'] = 'User-Agent'
+    # Настройка кэширования: Vary по UA/Client Hints для правильного кэширования разных версий
+    response['Vary'] = DEVICE_VARY
     # Для HTML можно отключить кэш или установить короткий срок
     response['Cache-Control'] = 'no-cache, no-store, must-revalidate'
     response['Pragma'] = 'no-cache'
@@ -28,3 +39,21 @@ def index(request):
 def home_data(request):
     """Данные для главной страницы (API)"""
     return Response({'message': 'Home data endpoint'})
+
+
+def _metrics_allowed(request) -> bool:
+    token = settings.METRICS_TOKEN
+    auth = request.headers.get("Authorization", "")
+    if token and hmac.compare_digest(auth.encode(), f"Bearer {token}".encode()):
+        return True
+    return request.user.is_authenticated and request.user.is_staff
+
+
+@require_GET
+@never_cache
+def metrics_view(request):
+    """Метрики процесса в текстовом формате Prometheus (Bearer METRICS_TOKEN или staff)"""
+    if not _metrics_allowed(request):
+        # не выдаём, что эндпоинт существует
+        raise Http404()
+    return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
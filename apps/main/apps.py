@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class MainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.main'
+
+    def ready(self):
+        # счётчик SQL ставится на соединения с момента их открытия
+        from . import metrics
+        metrics.instrument_open_connections()
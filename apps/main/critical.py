@@ -0,0 +1,293 @@
+"""
+Критический CSS для страниц приглашения.
+
+Вёрстка экспортирована из Figma: почти каждый элемент — position: absolute
+с top в пикселях. Поэтому «первый экран» считается без браузера: шаблон
+разбирается как HTML, абсолютный top элемента = top родителя + top его
+класса из CSS, и видимыми считаются классы элементов выше линии сгиба
+(PAGES[...]["fold"]).
+
+В критический CSS попадают:
+- правила без классов (reset, html/body, :root);
+- правила, все классы которых есть у видимых элементов;
+- @media с такими правилами внутри;
+- @font-face и @keyframes, на которые ссылаются попавшие правила.
+Локальные @import встраиваются, внешние отбрасываются. Относительные url()
+заменяются на {% static %}, поэтому результат — шаблон
+templates/main/critical/<страница>.html со <style>, который подключается
+через {% include %}; полные таблицы стилей грузятся асинхронно.
+
+Команда build_critical_css пересобирает шаблоны и печатает, сколько байт
+блокировало первую отрисовку до и после.
+"""
+from __future__ import annotations
+
+import posixpath
+import re
+from html.parser import HTMLParser
+from pathlib import Path
+
+
+APP_DIR = Path(__file__).resolve().parent
+STATIC_DIR = APP_DIR / "static"
+TEMPLATES_DIR = APP_DIR / "templates"
+OUTPUT_DIR = TEMPLATES_DIR / "main" / "critical"
+
+# линия сгиба — с запасом на высокие экраны (в CSS-пикселях макета)
+PAGES = {
+    "home_pc": {
+        "template": "main/home_pc.html",
+        "styles": ("main/styles/fonts.css", "main/styles/globals.css", "main/styles/main.css"),
+        "fold": 1100,
+    },
+    "home_mobile": {
+        "template": "main/home_mobile.html",
+        "styles": (
+            "main/styles/fonts.css",
+            "main/styles/mobile/globals.css",
+            "main/styles/mobile/styleguide.css",
+            "main/styles/mobile/home-page-mobile.css",
+        ),
+        "fold": 950,
+    },
+}
+
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+_TEMPLATE_TAG = re.compile(r"{%.*?%}|{#.*?#}", re.S)
+_TEMPLATE_VAR = re.compile(r"{{.*?}}", re.S)
+_CLASS = re.compile(r"\.(-?[_a-zA-Z][\w-]*)")
+_TOP = re.compile(r"(?:^|;)\s*top\s*:\s*(-?[\d.]+)px", re.I)
+_URL = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+_IMPORT = re.compile(r"""@import\s+(?:url\()?\s*['"]?([^'")\s;]+)""")
+_VAR = re.compile(r"var\(\s*(--[\w-]+)")
+_QUOTED = re.compile(r"""["']([^"']+)["']""")
+
+
+# --- разбор CSS -----------------------------------------------------------
+
+def parse_css(css: str) -> list:
+    """
+    Плоский разбор на правила: [(prelude, body)], где body — строка
+    деклараций или (для @media/@supports) вложенный список правил.
+    """
+    css = _COMMENT.sub("", css)
+    rules = []
+    i, n = 0, len(css)
+    while i < n:
+        brace = css.find("{", i)
+        semi = css.find(";", i)
+        # @import/@charset без блока
+        if semi != -1 and (brace == -1 or semi < brace) and css[i:semi].strip().startswith("@"):
+            rules.append((css[i:semi].strip(), None))
+            i = semi + 1
+            continue
+        if brace == -1:
+            break
+        prelude = " ".join(css[i:brace].split())
+        depth, j = 1, brace + 1
+        while j < n and depth:
+            if css[j] == "{":
+                depth += 1
+            elif css[j] == "}":
+                depth -= 1
+            j += 1
+        inner = css[brace + 1:j - 1]
+        if prelude.startswith(("@media", "@supports")):
+            rules.append((prelude, parse_css(inner)))
+        else:
+            rules.append((prelude, inner.strip()))
+        i = j
+    return rules
+
+
+def serialize(rules) -> str:
+    out = []
+    for prelude, body in rules:
+        if body is None:
+            out.append(prelude + ";")
+        elif isinstance(body, list):
+            out.append(f"{prelude}{{{serialize(body)}}}")
+        else:
+            out.append(f"{prelude}{{{minify_declarations(body)}}}")
+    return "".join(out)
+
+
+def minify_declarations(body: str) -> str:
+    parts = [" ".join(d.split()) for d in body.split(";")]
+    return ";".join(p.replace(": ", ":", 1) for p in parts if p)
+
+
+def rewrite_urls(body: str, css_path: str) -> str:
+    """Относительные url() -> {% static %} относительно каталога CSS-файла."""
+    base = posixpath.dirname(css_path)
+
+    def replace(match):
+        url = match.group(2).strip()
+        if url.startswith(("data:", "http:", "https:", "/", "#", "{%")):
+            return match.group(0)
+        path, _, fragment = url.partition("#")
+        resolved = posixpath.normpath(posixpath.join(base, path.split("?")[0]))
+        return f"url(\"{{% static '{resolved}' %}}{'#' + fragment if fragment else ''}\")"
+
+    return _URL.sub(replace, body)
+
+
+def load_rules(css_path: str) -> list:
+    """Правила файла из static/ с встроенными локальными @import и переписанными url()."""
+    rules = []
+    for prelude, body in parse_css((STATIC_DIR / css_path).read_text(encoding="utf-8")):
+        if body is None:
+            match = _IMPORT.match(prelude)
+            if match and not match.group(1).startswith(("http:", "https:", "//")):
+                rules.extend(load_rules(posixpath.normpath(posixpath.join(posixpath.dirname(css_path), match.group(1)))))
+            continue
+        rules.append((prelude, _rewrite_body(body, css_path)))
+    return rules
+
+
+def _rewrite_body(body, css_path):
+    if isinstance(body, list):
+        return [(p, _rewrite_body(b, css_path)) for p, b in body]
+    return rewrite_urls(body, css_path)
+
+
+# --- разметка ---------------------------------------------------------------
+
+class _FoldParser(HTMLParser):
+    def __init__(self, class_tops, fold):
+        super().__init__(convert_charrefs=True)
+        self.class_tops = class_tops
+        self.fold = fold
+        self.stack = [0.0]
+        self.visible = set()
+
+    def _enter(self, attrs):
+        classes = (dict(attrs).get("class") or "").split()
+        tops = [self.class_tops[c] for c in classes if c in self.class_tops]
+        top = self.stack[-1] + (min(tops) if tops else 0.0)
+        if top < self.fold:
+            self.visible.update(classes)
+        return top
+
+    def handle_starttag(self, tag, attrs):
+        top = self._enter(attrs)
+        if tag not in VOID_TAGS:
+            self.stack.append(top)
+
+    def handle_startendtag(self, tag, attrs):
+        self._enter(attrs)
+
+    def handle_endtag(self, tag):
+        if tag not in VOID_TAGS and len(self.stack) > 1:
+            self.stack.pop()
+
+
+def class_tops(rules) -> dict:
+    """{класс: top в px} по правилам, где класс — последний в селекторе."""
+    tops = {}
+    for prelude, body in rules:
+        if not isinstance(body, str) or prelude.startswith("@"):
+            continue
+        match = _TOP.search(";" + body)
+        if not match:
+            continue
+        for selector in prelude.split(","):
+            classes = _CLASS.findall(selector.split()[-1]) if selector.split() else []
+            for name in classes:
+                tops.setdefault(name, float(match.group(1)))
+    return tops
+
+
+def visible_classes(template_source: str, rules, fold: int) -> set:
+    markup = _TEMPLATE_VAR.sub("x", _TEMPLATE_TAG.sub("", template_source))
+    parser = _FoldParser(class_tops(rules), fold)
+    parser.feed(markup)
+    parser.close()
+    return parser.visible
+
+
+# --- отбор ------------------------------------------------------------------
+
+def _critical_selector(selector: str, visible: set) -> bool:
+    return all(name in visible for name in _CLASS.findall(selector))
+
+
+def _select(rules, visible):
+    kept = []
+    for prelude, body in rules:
+        if isinstance(body, list):
+            inner = _select(body, visible)
+            if inner:
+                kept.append((prelude, inner))
+        elif prelude.startswith("@"):
+            continue  # @font-face/@keyframes — отдельно, по ссылкам
+        else:
+            selectors = [s.strip() for s in prelude.split(",") if _critical_selector(s, visible)]
+            if selectors:
+                kept.append((",".join(selectors), body))
+    return kept
+
+
+def _flat_bodies(rules):
+    for prelude, body in rules:
+        if isinstance(body, list):
+            yield from _flat_bodies(body)
+        elif isinstance(body, str):
+            yield prelude, body
+
+
+def _referenced_at_rules(rules, kept):
+    """@font-face и @keyframes, на которые ссылаются отобранные правила."""
+    root_vars = {}
+    for prelude, body in _flat_bodies(rules):
+        if prelude == ":root":
+            for decl in body.split(";"):
+                name, _, value = decl.partition(":")
+                if name.strip().startswith("--"):
+                    root_vars[name.strip()] = value
+
+    used = " ".join(body for prelude, body in _flat_bodies(kept) if prelude != ":root")
+    families = set()
+    for prelude, body in _flat_bodies(kept):
+        for decl in body.split(";"):
+            name, _, value = decl.partition(":")
+            if name.strip() not in ("font-family", "font"):
+                continue
+            value += " ".join(root_vars.get(var, "") for var in _VAR.findall(value))
+            families.update(f.lower() for f in _QUOTED.findall(value))
+
+    at_rules = []
+    for prelude, body in rules:
+        if prelude == "@font-face":
+            family = _QUOTED.search(body)
+            if family and family.group(1).lower() in families:
+                at_rules.append((prelude, body))
+        elif prelude.startswith("@keyframes") and prelude.split()[-1] in used:
+            at_rules.append((prelude, body))
+    return at_rules
+
+
+def extract(page: str) -> str:
+    """Критический CSS страницы из PAGES (с {% static %} в url())."""
+    config = PAGES[page]
+    rules = []
+    for css_path in config["styles"]:
+        rules.extend(load_rules(css_path))
+    source = (TEMPLATES_DIR / config["template"]).read_text(encoding="utf-8")
+    kept = _select(rules, visible_classes(source, rules, config["fold"]))
+    return serialize(_referenced_at_rules(rules, kept) + kept)
+
+
+def render_template(css: str) -> str:
+    if "{{" in css or "{#" in css:
+        raise ValueError("критический CSS не должен содержать синтаксис шаблонов")
+    return (
+        "{% load static %}{# Сгенерировано командой build_critical_css, не редактировать вручную #}\n"
+        f"<style>{css}</style>\n"
+    )
+
+
+def output_path(page: str) -> Path:
+    return OUTPUT_DIR / f"{page}.html"
@@ -0,0 +1,131 @@
+"""
+Классификация устройств по User-Agent и Client Hints.
+
+Результат для строки UA кэшируется (LRU с ограниченным размером), поэтому
+на повторных запросах от тех же браузеров разбор UA не выполняется.
+Правила — упорядоченные таблицы подстрок; первая сработавшая побеждает.
+
+Классы устройств совпадают с шаблонами страниц:
+- mobile: телефоны, включая встроенные браузеры Instagram/Facebook/Telegram/Viber
+- pc: всё остальное, в том числе планшеты и боты
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import lru_cache
+
+
+MOBILE = "mobile"
+PC = "pc"
+
+CACHE_SIZE = 1024
+
+# от чего зависит класс устройства — для заголовка Vary
+DEVICE_VARY = "User-Agent, Sec-CH-UA-Mobile"
+
+# боты превью ссылок и краулеры (подстроки UA в нижнем регистре)
+BOT_MARKERS = (
+    "telegrambot",
+    "viber-url-downloader",
+    "whatsapp",
+    "facebookexternalhit",
+    "facebookcatalog",
+    "meta-externalagent",
+    "twitterbot",
+    "slackbot",
+    "discordbot",
+    "linkedinbot",
+    "skypeuripreview",
+    "vkshare",
+    "pinterestbot",
+    "embedly",
+    "redditbot",
+    "applebot",
+    "googlebot",
+    "bingbot",
+    "yandexbot",
+    "bot/",
+    "bot;",
+    "crawler",
+    "spider",
+    "preview",
+    "curl/",
+    "python-requests",
+    "wget/",
+)
+
+# встроенные браузеры мессенджеров и соцсетей -> название
+IN_APP_MARKERS = (
+    ("instagram", "instagram"),
+    ("fban/", "facebook"),
+    ("fbav/", "facebook"),
+    ("fb_iab", "facebook"),
+    ("telegram", "telegram"),
+    ("viber", "viber"),
+    ("line/", "line"),
+    ("tiktok", "tiktok"),
+    ("musical_ly", "tiktok"),
+    ("snapchat", "snapchat"),
+)
+
+# планшеты идут в pc, поэтому проверяются раньше телефонов
+TABLET_MARKERS = ("ipad", "tablet", "kindle", "silk/", "playbook", "sm-t", "lenovo tab", "mi pad")
+
+PHONE_MARKERS = ("iphone", "ipod", "windows phone", "opera mini", "mobile safari", "blackberry", "bb10")
+
+
+@dataclass(frozen=True)
+class DeviceInfo:
+    device: str
+    in_app: str = ""
+    bot: bool = False
+
+    @property
+    def is_mobile(self) -> bool:
+        return self.device == MOBILE
+
+
+def _has_any(ua: str, markers) -> bool:
+    return any(marker in ua for marker in markers)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def classify(user_agent: str, ch_mobile: str = "") -> DeviceInfo:
+    """
+    Класс устройства для строки UA.
+
+    ch_mobile — значение заголовка Sec-CH-UA-Mobile ("?1"/"?0"). Chromium
+    присылает его сам, и он точнее UA: планшеты на Android шлют "?0".
+    """
+    ua = (user_agent or "").lower()
+    if _has_any(ua, BOT_MARKERS):
+        return DeviceInfo(PC, bot=True)
+
+    in_app = next((name for marker, name in IN_APP_MARKERS if marker in ua), "")
+
+    if ch_mobile in ("?1", "?0"):
+        return DeviceInfo(MOBILE if ch_mobile == "?1" else PC, in_app)
+
+    if _has_any(ua, TABLET_MARKERS):
+        return DeviceInfo(PC, in_app)
+    if _has_any(ua, PHONE_MARKERS):
+        return DeviceInfo(MOBILE, in_app)
+    if "android" in ua:
+        # телефоны на Android пишут "Mobile"; встроенные браузеры (WebView, "; wv)")
+        # иногда его теряют, но на планшетах они почти не встречаются
+        if "mobile" in ua or in_app or "; wv)" in ua:
+            return DeviceInfo(MOBILE, in_app)
+        return DeviceInfo(PC, in_app)
+    return DeviceInfo(PC, in_app)
+
+
+def classify_request(request) -> DeviceInfo:
+    return classify(
+        request.META.get("HTTP_USER_AGENT", ""),
+        request.META.get("HTTP_SEC_CH_UA_MOBILE", ""),
+    )
+
+
+def device_class(request) -> str:
+    """"mobile" или "pc" — какой шаблон страницы отдавать."""
+    return classify_request(request).device
@@ -0,0 +1,84 @@
+"""
+Сабсеттинг декоративных шрифтов.
+
+Команда build_fonts собирает набор символов, которые реально встречаются
+на сайте (шаблоны, тексты вопросов/вариантов анкеты) плюс базовые
+украинский/латинский алфавиты для имён гостей, и режет каждый TTF из
+FONTS до этих глифов в WOFF2. Результат — fonts/subset/*.woff2 с хэшем в
+имени и styles/fonts.css с @font-face (unicode-range, font-display: swap)
+для всех имён семейств, которые используются в CSS.
+
+Нужны fontTools и brotli (только для сборки): pip install fonttools brotli.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+
+
+APP_DIR = Path(__file__).resolve().parent
+FONTS_DIR = APP_DIR / "static" / "main" / "fonts"
+SUBSET_DIR = FONTS_DIR / "subset"
+MANIFEST = SUBSET_DIR / "manifest.json"
+FONTS_CSS = APP_DIR / "static" / "main" / "styles" / "fonts.css"
+
+# исходный TTF -> имена семейств, под которыми он подключается в CSS
+FONTS = {
+    "timesnewromanpsmt.ttf": ("Times New Roman-Regular",),
+    "markizdesadscript.ttf": ("Markiz de Sad Script-Regular", "Markiz de Sad script"),
+    "decor.ttf": ("Decor", "Decor-Regular"),
+    "ofont.ru_Liberty TL.ttf": ("Liberty TL-Regular",),
+    "Liberty LT.ttf": ("Liberty LT",),
+    "Literature-Decor.ttf": ("Literature Decor-Regular", "Literature-Decor"),
+    "calligraphiaone.ttf": ("Calligraphia One-Regular", "Calligraphia One"),
+    "ofont.ru_Isadora Cyr .ttf": ("Isadora Cyr", "Isadora Cyr-Regular"),
+    "gabriola.ttf": ("Gabriola-Regular",),
+}
+
+# имена гостей подставляются динамически, поэтому алфавиты нужны целиком
+BASE_CHARSET = (
+    "".join(chr(c) for c in range(0x20, 0x7F))
+    + "АБВГҐДЕЄЖЗИІЇЙКЛМНОПРСТУФХЦЧШЩЬЮЯабвгґдеєжзиіїйклмнопрстуфхцчшщьюя"
+    + "ЁЫЪЭёыъэ"
+    + "ʼ’‘“”«»„–—…№•·° "
+)
+
+# OpenType-фичи, без которых рукописные шрифты теряют лигатуры и альтернативы
+LAYOUT_FEATURES = ("*",)
+
+
+def template_dirs() -> list[Path]:
+    return sorted(p for p in (APP_DIR.parent).glob("*/templates") if p.is_dir())
+
+
+def script_files() -> list[Path]:
+    # тексты, которые скрипты вставляют в страницу
+    return sorted((APP_DIR.parent).glob("*/static/**/*.js"))
+
+
+def collect_charset(extra_texts=()) -> str:
+    """Все символы из шаблонов, скриптов, переданных текстов и BASE_CHARSET (без управляющих)."""
+    chars = set(BASE_CHARSET)
+    for directory in template_dirs():
+        for path in directory.rglob("*.html"):
+            chars.update(path.read_text(encoding="utf-8"))
+    for path in script_files():
+        chars.update(path.read_text(encoding="utf-8"))
+    for text in extra_texts:
+        chars.update(text or "")
+    return "".join(sorted(c for c in chars if c.isprintable() or c == " "))
+
+
+def unicode_ranges(codepoints) -> str:
+    """[0x41, 0x42, 0x43, 0x45] -> "U+41-43, U+45" для unicode-range."""
+    ranges = []
+    start = prev = None
+    for cp in sorted(set(codepoints)):
+        if prev is not None and cp == prev + 1:
+            prev = cp
+            continue
+        if start is not None:
+            ranges.append((start, prev))
+        start = prev = cp
+    if start is not None:
+        ranges.append((start, prev))
+    return ", ".join(f"U+{a:X}" if a == b else f"U+{a:X}-{b:X}" for a, b in ranges)
@@ -0,0 +1,143 @@
+"""
+Оптимизированные варианты статических картинок.
+
+Команда build_images проходит по SOURCE_DIRS и складывает в OUTPUT_DIR:
+- для PNG/JPEG — WebP (и AVIF, если Pillow умеет его писать) нескольких
+  ширин из VARIANT_WIDTHS для srcset;
+- для SVG — минифицированную копию.
+
+Имена файлов содержат хэш содержимого исходника, поэтому их можно отдавать
+с долгим кэшем. manifest.json хранит хэш исходника, размеры и варианты;
+при повторном запуске неизменённые исходники пропускаются.
+
+Тег {% picture %} (templatetags/images.py) по манифесту превращает
+обычный <img> в <picture> с <source> для каждого формата.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.conf import settings
+from django.templatetags.static import static
+
+
+APP_STATIC = Path(__file__).resolve().parent / "static"
+
+# каталоги внутри static/, чьи картинки оптимизируются (favicon и OG-превью — нет)
+SOURCE_DIRS = ("main/img", "main/img-mobile")
+OUTPUT_DIR = "main/img-opt"
+MANIFEST_NAME = "manifest.json"
+
+RASTER_SUFFIXES = (".png", ".jpg", ".jpeg")
+VARIANT_WIDTHS = (480, 960, 1440, 1920)
+# картинки уже меньше этого размера (иконки, однопиксельные заливки) не трогаем
+MIN_RASTER_BYTES = 4 * 1024
+
+WEBP_OPTIONS = {"quality": 82, "method": 6}
+AVIF_OPTIONS = {"quality": 60, "speed": 6}
+
+# порядок <source>: браузер берёт первый поддерживаемый формат
+FORMATS = (
+    ("image/avif", "avif", AVIF_OPTIONS),
+    ("image/webp", "webp", WEBP_OPTIONS),
+)
+
+
+def avif_supported() -> bool:
+    """AVIF есть в Pillow >= 11.2 или через pillow-avif-plugin."""
+    try:
+        import pillow_avif  # noqa: F401
+    except ImportError:
+        pass
+    from PIL import Image
+
+    Image.init()
+    return "AVIF" in Image.SAVE
+
+
+def source_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+# --- SVG ----------------------------------------------------------------
+
+_SVG_COMMENT = re.compile(r"<!--.*?-->", re.S)
+_SVG_METADATA = re.compile(r"<(metadata|title|desc)\b.*?</\1>", re.S)
+_SVG_BETWEEN_TAGS = re.compile(r">\s+<")
+_SVG_NUMBER = re.compile(r"(?<![\d.])(-?\d+\.\d{3,})")
+SVG_PRECISION = 2
+
+
+def _round_number(match: re.Match) -> str:
+    value = f"{float(match.group(1)):.{SVG_PRECISION}f}".rstrip("0").rstrip(".")
+    return "0" if value in ("-0", "") else value
+
+
+def minify_svg(text: str) -> str:
+    """Комментарии, метаданные и пробелы между тегами убираются, числа округляются."""
+    text = _SVG_COMMENT.sub("", text)
+    text = _SVG_METADATA.sub("", text)
+    text = _SVG_NUMBER.sub(_round_number, text)
+    text = _SVG_BETWEEN_TAGS.sub("><", text)
+    return text.strip()
+
+
+# --- манифест -------------------------------------------------------------
+
+@dataclass(frozen=True)
+class Picture:
+    src: str  # путь исходника внутри static/
+    width: int = 0
+    height: int = 0
+    sources: tuple = ()  # ((mime, ((путь, ширина), ...)), ...)
+    svg: str = ""  # путь минифицированного SVG
+
+
+def manifest_path() -> Path:
+    return Path(getattr(settings, "IMAGE_MANIFEST", APP_STATIC / OUTPUT_DIR / MANIFEST_NAME))
+
+
+_lock = threading.Lock()
+_loaded: tuple[float, dict] | None = None
+
+
+def _load() -> dict:
+    """{static URL исходника: Picture}; перечитывается, только если файл изменился."""
+    global _loaded
+    path = manifest_path()
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return {}
+
+    loaded = _loaded
+    if loaded is not None and loaded[0] == mtime:
+        return loaded[1]
+
+    with _lock:
+        with open(path, encoding="utf-8") as fh:
+            images = json.load(fh).get("images", {})
+        by_url = {}
+        for src, entry in images.items():
+            by_url[static(src)] = Picture(
+                src=src,
+                width=entry.get("width", 0),
+                height=entry.get("height", 0),
+                sources=tuple(
+                    (mime, tuple((p, w) for p, w in variants))
+                    for mime, variants in entry.get("sources", {}).items()
+                ),
+                svg=entry.get("svg", ""),
+            )
+        _loaded = (mtime, by_url)
+    return by_url
+
+
+def picture_for_url(url: str) -> Picture | None:
+    return _load().get(url)
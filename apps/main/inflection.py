@@ -0,0 +1,204 @@
+"""
+Родительный падеж украинских имён для приглашений ("Запрошення для ...").
+
+Правила окончаний собраны в таблицу и при импорте компилируются в trie по
+перевёрнутым суффиксам: для слова берётся самое длинное подходящее
+окончание за один проход с конца слова. Роли (мама, тато, ...) и
+исключения для фамилий/имён — отдельные словари. Результат для слова и
+для всей фразы кэшируется (LRU) по нормализованному тексту и роду.
+
+Род (Guest.gender) нужен только фамилиям, где одно и то же окончание
+склоняется по-разному: мужские фамилии на -ко склоняются (Шевченка),
+женские — нет; женские фамилии на согласную и -ь тоже не склоняются
+(Олени Мельник), а на -ова/-єва склоняются как прилагательные
+(Петрової). Фамилией считается последнее из нескольких подряд идущих
+имён (между ролями и союзами); одиночные имена и остальные слова
+склоняются по своему окончанию без рода. Без рода остаются прежние
+эвристики.
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+
+
+MALE = "male"
+FEMALE = "female"
+
+LRU_SIZE = 4096
+
+# роль/родственник -> родительный падеж
+ROLE_GENITIVE = {
+    "мама": "мами",
+    "тато": "тата",
+    "бабуся": "бабусі",
+    "дідусь": "дідуся",
+    "хрещена": "хрещеної",
+    "хрещений": "хрещеного",
+    "тітка": "тітки",
+    "дядько": "дядька",
+    "сестра": "сестри",
+    "брат": "брата",
+    "кума": "куми",
+    "кум": "кума",
+    "сім'я": "сім'ї",
+    "родина": "родини",
+}
+
+# имена и фамилии, которые не подходят под общие правила
+NAME_EXCEPTIONS = {
+    "ігор": "ігоря",
+    "лазар": "лазаря",
+    "любов": "любові",
+    "ілля": "іллі",
+    "кузьма": "кузьми",
+    "лев": "лева",
+    "павло": "павла",
+}
+
+# союзы между именами: разделяют имена разных людей
+CONJUNCTIONS = frozenset({"і", "й", "та"})
+
+# несклоняемые слова: союзы, иностранные имена на гласную и т.п.
+INDECLINABLE = CONJUNCTIONS | frozenset({
+    "мері",
+    "ніколь",
+    "лілі",
+})
+
+# (окончание, сколько букв отрезать, что дописать, для какого рода: None — для любого)
+SUFFIX_RULES = (
+    ("", 0, "а", None),  # по умолчанию: мужские на согласную (Ярослав -> Ярослава)
+    ("", 0, "", FEMALE),  # женские фамилии на согласную не склоняются (Олена Мельник)
+    ("а", 1, "и", None),
+    ("жа", 1, "і", None),
+    ("ча", 1, "і", None),
+    ("ша", 1, "і", None),
+    ("ща", 1, "і", None),
+    ("ська", 1, "ої", None),
+    ("цька", 1, "ої", None),
+    ("зька", 1, "ої", None),
+    ("ова", 1, "ої", FEMALE),
+    ("єва", 1, "ої", FEMALE),
+    ("я", 1, "і", None),
+    ("ія", 1, "ї", None),
+    ("ая", 1, "ї", None),
+    ("ея", 1, "ї", None),
+    ("єя", 1, "ї", None),
+    ("оя", 1, "ї", None),
+    ("уя", 1, "ї", None),
+    ("юя", 1, "ї", None),
+    ("'я", 1, "ї", None),
+    ("й", 1, "я", None),
+    ("ський", 2, "ого", None),
+    ("цький", 2, "ого", None),
+    ("зький", 2, "ого", None),
+    ("ь", 1, "я", None),
+    ("ь", 0, "", FEMALE),
+    ("о", 1, "а", None),
+    ("ко", 0, "", None),
+    ("ко", 1, "а", MALE),
+    ("ов", 0, "а", None),
+    ("ев", 0, "а", None),
+    ("єв", 0, "а", None),
+    ("ін", 0, "а", None),
+    ("ов", 0, "", FEMALE),
+    ("ев", 0, "", FEMALE),
+    ("єв", 0, "", FEMALE),
+    ("ін", 0, "", FEMALE),
+    ("их", 0, "", None),  # "родина Іванових" — уже родительный падеж множественного числа
+    ("ів", 0, "", None),  # "родина Петренків" — тоже
+    ("їв", 0, "", None),
+)
+
+
+def _compile(rules):
+    """Trie по перевёрнутым окончаниям: узел -> {буква: узел, None: {род: правило}}."""
+    root: dict = {}
+    for suffix, strip, append, gender in rules:
+        node = root
+        for ch in reversed(suffix):
+            node = node.setdefault(ch, {})
+        node.setdefault(None, {})[gender] = (strip, append)
+    return root
+
+
+_TRIE = _compile(SUFFIX_RULES)
+
+
+def _as_rule(word: str, form: str) -> tuple[int, str]:
+    """Готовая форма из словаря -> (сколько отрезать, что дописать)."""
+    common = 0
+    for a, b in zip(word, form):
+        if a != b:
+            break
+        common += 1
+    return len(word) - common, form[common:]
+
+
+def _pick(rules: dict, gender: str | None):
+    return rules.get(gender) or rules.get(None)
+
+
+@lru_cache(maxsize=LRU_SIZE)
+def word_rule(word: str, gender: str | None = None) -> tuple[int, str]:
+    """Правило для слова в нижнем регистре: (сколько букв отрезать, что дописать)."""
+    if word in ROLE_GENITIVE:
+        return _as_rule(word, ROLE_GENITIVE[word])
+    if word in NAME_EXCEPTIONS:
+        return _as_rule(word, NAME_EXCEPTIONS[word])
+    if word in INDECLINABLE:
+        return 0, ""
+
+    node = _TRIE
+    rule = _pick(node[None], gender)
+    for ch in reversed(word):
+        node = node.get(ch)
+        if node is None:
+            break
+        if None in node:
+            rule = _pick(node[None], gender) or rule
+    return rule
+
+
+def inflect_word(word: str, gender: str | None = None) -> str:
+    strip, append = word_rule(word.lower(), gender)
+    if word.isupper() and len(word) > 1:
+        append = append.upper()
+    return (word[:-strip] if strip else word) + append
+
+
+def _surnames(words: list[str]) -> set[int]:
+    """Позиции фамилий: последнее слово в каждой группе из 2+ имён подряд."""
+    positions = set()
+    run = 0
+    for i, word in enumerate(words + [""]):
+        lower = word.lower()
+        if not lower or lower in ROLE_GENITIVE or lower in CONJUNCTIONS:
+            if run > 1:
+                positions.add(i - 1)
+            run = 0
+        else:
+            run += 1
+    return positions
+
+
+@lru_cache(maxsize=LRU_SIZE)
+def _genitive(phrase: str, gender: str | None) -> str:
+    words = phrase.split(" ")
+    surnames = _surnames(words) if gender else set()
+    return " ".join(inflect_word(w, gender if i in surnames else None) for i, w in enumerate(words))
+
+
+def genitive(text: str, gender: str | None = None) -> str:
+    """
+    Родительный падеж фразы с сохранением регистра букв:
+    - "Ярослав" -> "Ярослава"
+    - "мама Світлана" -> "мами Світлани"
+    - "тато Сергій" -> "тата Сергія"
+    """
+    if not text:
+        return text
+    phrase = " ".join(text.split())
+    if not phrase:
+        return phrase
+    return _genitive(phrase, gender or None)
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.main import devices
+from apps.main.ua_corpus import UA_CORPUS
+
+
+class Command(BaseCommand):
+    help = 'Бенчмарк классификации устройств на размеченном корпусе UA (без кэша и с LRU-кэшем)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=100000)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        corpus = [(ua, ch) for ua, ch, *_ in UA_CORPUS]
+
+        wrong = [
+            ua for ua, ch, device, in_app, bot in UA_CORPUS
+            if devices.classify(ua, ch) != devices.DeviceInfo(device, in_app, bot)
+        ]
+
+        # без кэша: стоимость самих правил
+        classify = devices.classify.__wrapped__
+        started = time.perf_counter()
+        for i in range(iterations):
+            classify(*corpus[i % len(corpus)])
+        cold = time.perf_counter() - started
+
+        devices.classify.cache_clear()
+        started = time.perf_counter()
+        for i in range(iterations):
+            devices.classify(*corpus[i % len(corpus)])
+        warm = time.perf_counter() - started
+
+        self.stdout.write(f'UA в корпусе: {len(corpus)}, ошибок классификации: {len(wrong)}')
+        for ua in wrong:
+            self.stdout.write(self.style.ERROR(f'  {ua}'))
+        self.stdout.write(f'Без кэша: {iterations / cold:,.0f} UA/с ({cold / iterations * 1e6:.2f} мкс)')
+        self.stdout.write(f'С LRU-кэшем: {iterations / warm:,.0f} UA/с ({warm / iterations * 1e6:.2f} мкс)')
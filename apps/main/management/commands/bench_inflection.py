@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.invitations.models import Guest
+from apps.main import inflection
+
+
+SAMPLE_NAMES = [
+    ("Ярослав", "male"),
+    ("мама Світлана", "female"),
+    ("тато Сергій", "male"),
+    ("Олена Петрова", "female"),
+    ("Тарас Шевченко", "male"),
+    ("Андрій Ковальський", "male"),
+    ("хрещена Наталія", "female"),
+    ("Олена та Андрій", None),
+]
+
+
+class Command(BaseCommand):
+    help = 'Микробенчмарк склонения имён: холодный и тёплый кэш, по гостям из БД или по образцам'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=10000)
+        parser.add_argument('--sample', action='store_true', help='брать образцы имён вместо гостей из БД')
+
+    def handle(self, *args, **options):
+        names = SAMPLE_NAMES
+        if not options['sample']:
+            names = list(Guest.objects.values_list('full_name', 'gender')) or SAMPLE_NAMES
+        iterations = options['iterations']
+
+        def clear():
+            inflection.word_rule.cache_clear()
+            inflection._genitive.cache_clear()
+
+        # холодный: каждый раз без кэша — стоимость самих правил (trie + словари)
+        started = time.perf_counter()
+        for i in range(iterations):
+            clear()
+            name, gender = names[i % len(names)]
+            inflection.genitive(name, gender)
+        cold = time.perf_counter() - started
+
+        clear()
+        started = time.perf_counter()
+        for i in range(iterations):
+            name, gender = names[i % len(names)]
+            inflection.genitive(name, gender)
+        warm = time.perf_counter() - started
+
+        self.stdout.write(f'Имён: {len(names)}, итераций: {iterations}')
+        self.stdout.write(f'Без кэша: {cold / iterations * 1e6:.2f} мкс/вызов')
+        self.stdout.write(f'С LRU-кэшем: {warm / iterations * 1e6:.2f} мкс/вызов')
+        self.stdout.write(f'Кэш фраз: {inflection._genitive.cache_info()}')
@@ -0,0 +1,25 @@
+import gzip
+
+from django.core.management.base import BaseCommand
+
+from apps.main import critical
+
+
+class Command(BaseCommand):
+    help = 'Извлекает критический CSS первого экрана для home_pc/home_mobile в templates/main/critical/'
+
+    def handle(self, *args, **options):
+        critical.OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+        for page, config in critical.PAGES.items():
+            blocking = b''.join((critical.STATIC_DIR / path).read_bytes() for path in config['styles'])
+            html = critical.render_template(critical.extract(page))
+            critical.output_path(page).write_text(html, encoding='utf-8')
+
+            inline = html.encode('utf-8')
+            self.stdout.write(
+                f'{page}: блокирующий CSS {self._size(blocking)} -> встроенный {self._size(inline)}'
+            )
+        self.stdout.write(self.style.SUCCESS(f'Записано в {critical.OUTPUT_DIR}'))
+
+    def _size(self, data):
+        return f'{len(data) / 1024:.1f} КБ (gzip {len(gzip.compress(data)) / 1024:.1f} КБ)'
@@ -0,0 +1,118 @@
+import hashlib
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from apps.main import fonts
+
+
+class Command(BaseCommand):
+    help = 'Режет шрифты до используемых на сайте глифов, пишет WOFF2 и styles/fonts.css с unicode-range'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='пересобрать все шрифты')
+
+    def handle(self, *args, **options):
+        try:
+            from fontTools import subset
+            import brotli  # noqa: F401  (нужен fontTools для WOFF2)
+        except ImportError:
+            raise CommandError('Нужны fontTools и brotli: pip install fonttools brotli')
+
+        charset = fonts.collect_charset(self._questionnaire_texts())
+        charset_hash = hashlib.sha256(charset.encode('utf-8')).hexdigest()[:12]
+        self.stdout.write(f'Символов в наборе: {len(charset)}')
+
+        fonts.SUBSET_DIR.mkdir(parents=True, exist_ok=True)
+        old = {}
+        if fonts.MANIFEST.exists() and not options['force']:
+            old = json.loads(fonts.MANIFEST.read_text(encoding='utf-8')).get('fonts', {})
+
+        manifest = {}
+        before = after = 0
+        for filename, families in fonts.FONTS.items():
+            source = fonts.FONTS_DIR / filename
+            data = source.read_bytes()
+            digest = hashlib.sha256(data).hexdigest()[:12]
+            before += len(data)
+
+            entry = old.get(filename)
+            if (
+                entry and entry['source_hash'] == digest and entry['charset_hash'] == charset_hash
+                and (fonts.SUBSET_DIR / entry['file']).exists()
+            ):
+                manifest[filename] = entry
+                after += (fonts.SUBSET_DIR / entry['file']).stat().st_size
+                continue
+
+            subsetter_options = subset.Options()
+            subsetter_options.flavor = 'woff2'
+            subsetter_options.layout_features = list(fonts.LAYOUT_FEATURES)
+            subsetter_options.hinting = False
+            subsetter_options.desubroutinize = True
+            subsetter_options.name_IDs = [1, 2, 4, 6]
+            subsetter_options.notdef_outline = True
+
+            font = subset.load_font(str(source), subsetter_options)
+            cmap = font.getBestCmap()
+            wanted = [ord(c) for c in charset if ord(c) in cmap]
+            subsetter = subset.Subsetter(subsetter_options)
+            subsetter.populate(unicodes=wanted)
+            subsetter.subset(font)
+
+            stem = source.stem.replace('ofont.ru_', '').strip().replace(' ', '-').lower()
+            target = f'{stem}.{hashlib.sha256((digest + charset_hash).encode()).hexdigest()[:10]}.woff2'
+            subset.save_font(font, str(fonts.SUBSET_DIR / target), subsetter_options)
+            font.close()
+
+            size = (fonts.SUBSET_DIR / target).stat().st_size
+            after += size
+            manifest[filename] = {
+                'file': target,
+                'families': list(families),
+                'source_hash': digest,
+                'charset_hash': charset_hash,
+                'unicode_range': fonts.unicode_ranges(wanted),
+            }
+            self.stdout.write(f'  {filename}: {len(data) // 1024} КБ -> {size // 1024} КБ')
+
+        keep = {fonts.MANIFEST.name} | {entry['file'] for entry in manifest.values()}
+        for path in fonts.SUBSET_DIR.iterdir():
+            if path.name not in keep:
+                path.unlink()
+
+        fonts.MANIFEST.write_text(
+            json.dumps({'charset': charset, 'fonts': manifest}, ensure_ascii=False, indent=1, sort_keys=True),
+            encoding='utf-8',
+        )
+        fonts.FONTS_CSS.write_text(self._css(manifest), encoding='utf-8')
+        self.stdout.write(self.style.SUCCESS(f'Шрифты: {before // 1024} КБ -> {after // 1024} КБ'))
+
+    def _questionnaire_texts(self):
+        from apps.invitations.models import Choice, Question
+
+        try:
+            return list(Question.objects.values_list('text', flat=True)) + list(
+                Choice.objects.values_list('text', flat=True)
+            )
+        except DatabaseError:
+            # сборка без БД: тексты анкеты покрываются BASE_CHARSET
+            return []
+
+    def _css(self, manifest):
+        lines = ['/* Сгенерировано командой build_fonts, не редактировать вручную */']
+        for filename, entry in manifest.items():
+            for family in entry['families']:
+                lines += [
+                    '',
+                    '@font-face {',
+                    f'  font-family: "{family}";',
+                    '  font-style: normal;',
+                    '  font-weight: 400;',
+                    '  font-display: swap;',
+                    f'  src: url("../fonts/subset/{entry["file"]}") format("woff2");',
+                    f'  unicode-range: {entry["unicode_range"]};',
+                    '}',
+                ]
+        return '\n'.join(lines) + '\n'
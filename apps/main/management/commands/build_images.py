@@ -0,0 +1,135 @@
+import json
+
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from apps.main import images
+
+
+class Command(BaseCommand):
+    help = 'Генерирует WebP/AVIF варианты картинок для srcset и минифицирует SVG (инкрементально, по хэшу исходника)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='пересобрать всё, даже неизменённые исходники')
+        parser.add_argument('--no-avif', action='store_true', help='не генерировать AVIF')
+
+    def handle(self, *args, **options):
+        output_dir = images.APP_STATIC / images.OUTPUT_DIR
+        output_dir.mkdir(parents=True, exist_ok=True)
+        manifest_file = images.manifest_path()
+
+        old = {}
+        if manifest_file.exists() and not options['force']:
+            old = json.loads(manifest_file.read_text(encoding='utf-8')).get('images', {})
+
+        formats = [f for f in images.FORMATS if f[1] != 'avif']
+        if not options['no_avif']:
+            if images.avif_supported():
+                formats = list(images.FORMATS)
+            else:
+                self.stdout.write(self.style.WARNING('AVIF не поддерживается этим Pillow, только WebP'))
+
+        manifest = {}
+        built = skipped = 0
+        before = after = 0
+        for source in self._sources():
+            rel = source.relative_to(images.APP_STATIC).as_posix()
+            data = source.read_bytes()
+            digest = images.source_hash(data)
+
+            entry = old.get(rel)
+            if entry and entry.get('hash') == digest and self._outputs_exist(entry) and self._has_formats(entry, formats):
+                manifest[rel] = entry
+                skipped += 1
+                continue
+
+            if source.suffix.lower() == '.svg':
+                entry = self._build_svg(source, digest, data, output_dir)
+            else:
+                entry = self._build_raster(source, digest, output_dir, formats)
+            manifest[rel] = entry
+            built += 1
+            before += len(data)
+            after += self._smallest_size(entry)
+            self.stdout.write(f'  {rel}')
+
+        self._remove_stale(output_dir, manifest)
+        manifest_file.write_text(
+            json.dumps({'version': 1, 'images': manifest}, ensure_ascii=False, indent=1, sort_keys=True),
+            encoding='utf-8',
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Собрано: {built}, пропущено без изменений: {skipped}. '
+            f'Размер собранных исходников {before // 1024} КБ -> {after // 1024} КБ (наибольший вариант / SVG)'
+        ))
+
+    def _sources(self):
+        for directory in images.SOURCE_DIRS:
+            root = images.APP_STATIC / directory
+            for path in sorted(root.iterdir()):
+                if not path.is_file():
+                    continue
+                suffix = path.suffix.lower()
+                if suffix == '.svg':
+                    yield path
+                elif suffix in images.RASTER_SUFFIXES and path.stat().st_size >= images.MIN_RASTER_BYTES:
+                    yield path
+
+    def _output_name(self, source, digest, suffix):
+        # img и img-mobile содержат файлы с одинаковыми именами
+        prefix = source.parent.name
+        return f'{images.OUTPUT_DIR}/{prefix}-{source.stem}.{digest}{suffix}'
+
+    def _build_svg(self, source, digest, data, output_dir):
+        target = self._output_name(source, digest, '.svg')
+        (images.APP_STATIC / target).write_text(images.minify_svg(data.decode('utf-8')), encoding='utf-8')
+        return {'hash': digest, 'svg': target}
+
+    def _build_raster(self, source, digest, output_dir, formats):
+        with Image.open(source) as img:
+            img.load()
+            width, height = img.size
+            if img.mode not in ('RGB', 'RGBA'):
+                img = img.convert('RGBA' if 'transparency' in img.info or img.mode in ('LA', 'P') else 'RGB')
+
+            widths = [w for w in images.VARIANT_WIDTHS if w < width] + [width]
+            sources = {}
+            for mime, ext, save_options in formats:
+                variants = []
+                for w in widths:
+                    target = self._output_name(source, digest, f'.{w}.{ext}')
+                    variant = img if w == width else img.resize((w, round(height * w / width)), Image.LANCZOS)
+                    variant.save(images.APP_STATIC / target, format=ext.upper(), **save_options)
+                    variants.append([target, w])
+                sources[mime] = variants
+        return {'hash': digest, 'width': width, 'height': height, 'sources': sources}
+
+    def _outputs_exist(self, entry):
+        paths = [entry['svg']] if entry.get('svg') else [p for variants in entry.get('sources', {}).values() for p, _ in variants]
+        return all((images.APP_STATIC / p).exists() for p in paths)
+
+    def _has_formats(self, entry, formats):
+        if entry.get('svg'):
+            return True
+        return set(entry.get('sources', {})) == {mime for mime, _, _ in formats}
+
+    def _smallest_size(self, entry):
+        if entry.get('svg'):
+            return (images.APP_STATIC / entry['svg']).stat().st_size
+        # размер самого широкого варианта в самом компактном формате
+        return min(
+            (images.APP_STATIC / variants[-1][0]).stat().st_size
+            for variants in entry['sources'].values()
+        )
+
+    def _remove_stale(self, output_dir, manifest):
+        keep = {images.manifest_path().name}
+        for entry in manifest.values():
+            if entry.get('svg'):
+                keep.add(entry['svg'].rsplit('/', 1)[-1])
+            for variants in entry.get('sources', {}).values():
+                keep.update(p.rsplit('/', 1)[-1] for p, _ in variants)
+        for path in output_dir.iterdir():
+            if path.is_file() and path.name not in keep:
+                path.unlink()
@@ -0,0 +1,238 @@
+"""
+Метрики запросов в памяти процесса и их выдача в текстовом формате Prometheus.
+
+RequestMetricsMiddleware кладёт замеры запроса (RequestSample) в contextvar
+и замеряет полное время ответа; по завершении результат пишется в
+гистограммы с меткой view — но только для отслеживаемых представлений
+(TRACKED_VIEWS), остальные запросы стоят одну проверку имени маршрута.
+
+SQL считает execute_wrapper, который ставится на каждое соединение при его
+открытии (сигнал connection_created, см. instrument). Соединения Django
+свои у каждого потока, а async-представления ходят в БД из потоков
+sync_to_async; contextvar копируется туда вместе с контекстом, поэтому
+запросы попадают в замеры своего запроса при WSGI и ASGI одинаково.
+Время рендера шаблонов замеряют сами места рендера через
+template_render(); вне запроса и то и другое — no-op.
+
+Гистограмма — фиксированные границы и список счётчиков на значение метки:
+наблюдение — bisect и два сложения под блокировкой, без выделения памяти,
+так что накладные расходы — единицы микросекунд. Кумулятивные суммы
+считаются только при выдаче (render). Данные живут в процессе: у каждого
+воркера gunicorn свои, сбрасываются при перезапуске.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+
+TRACKED_VIEWS = frozenset({"index", "invitation_page", "submit_rsvp"})
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+SIZE_BUCKETS = (512, 2048, 8192, 32768, 131072, 524288, 2097152)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        # view -> [счётчики по корзинам (+Inf последней), сумма]
+        self._series: dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, view: str, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(view)
+            if series is None:
+                series = self._series[view] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def snapshot(self) -> dict[str, tuple[list[int], float]]:
+        with self._lock:
+            return {view: (list(counts), total) for view, (counts, total) in self._series.items()}
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for view, (counts, total) in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{view="{view}",le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{view="{view}"}} {total:.6g}')
+            lines.append(f'{self.name}_count{{view="{view}"}} {cumulative}')
+        return lines
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values: dict[tuple[str, int], int] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, view: str, status: int) -> None:
+        key = (view, status)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + 1
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        lines.extend(f'{self.name}{{view="{view}",status="{status}"}} {value}' for (view, status), value in values)
+        return lines
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+REQUESTS = Counter("wedding_requests_total", "Ответы по представлению и коду статуса.")
+LATENCY = Histogram("wedding_request_duration_seconds", "Полное время ответа.", LATENCY_BUCKETS)
+DB_QUERIES = Histogram("wedding_request_db_queries", "SQL-запросов за запрос.", QUERY_BUCKETS)
+DB_TIME = Histogram("wedding_request_db_seconds", "Время SQL-запросов за запрос.", LATENCY_BUCKETS)
+RENDER_TIME = Histogram("wedding_template_render_seconds", "Время рендера шаблонов за запрос.", LATENCY_BUCKETS)
+RESPONSE_SIZE = Histogram("wedding_response_size_bytes", "Размер тела ответа.", SIZE_BUCKETS)
+
+METRICS = (REQUESTS, LATENCY, DB_QUERIES, DB_TIME, RENDER_TIME, RESPONSE_SIZE)
+
+
+def render() -> str:
+    return "\n".join(line for metric in METRICS for line in metric.render()) + "\n"
+
+
+def reset() -> None:
+    """Обнуляет все метрики процесса (для тестов и бенчмарков)."""
+    for metric in METRICS:
+        metric.reset()
+
+
+class RequestSample:
+    """Замеры одного запроса."""
+
+    __slots__ = ("queries", "db_time", "render_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+
+
+_current: ContextVar[RequestSample | None] = ContextVar("request_metrics", default=None)
+
+
+def _record_query(execute, sql, params, many, context):
+    sample = _current.get()
+    if sample is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        sample.queries += 1
+        sample.db_time += time.perf_counter() - started
+
+
+def instrument(connection, **kwargs) -> None:
+    """Ставит счётчик SQL на соединение (один раз на объект соединения)."""
+    if _record_query not in connection.execute_wrappers:
+        # в начало: connection.execute_wrapper() снимает свою обёртку через pop()
+        connection.execute_wrappers.insert(0, _record_query)
+
+
+def instrument_open_connections() -> None:
+    # соединения, открытые до подключения сигнала (например, в manage.py shell)
+    for connection in connections.all(initialized_only=True):
+        instrument(connection)
+
+
+connection_created.connect(instrument, dispatch_uid="apps.main.metrics.instrument")
+
+
+@contextmanager
+def template_render():
+    """Добавляет время блока к рендеру шаблонов текущего запроса."""
+    sample = _current.get()
+    if sample is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        sample.render_time += time.perf_counter() - started
+
+
+def _response_size(response) -> int | None:
+    if response.streaming:
+        length = response.get("Content-Length")
+        return int(length) if length else None
+    return len(response.content)
+
+
+def record(request, response, sample: RequestSample, duration: float) -> None:
+    match = request.resolver_match
+    view = match.url_name if match else None
+    if view not in TRACKED_VIEWS:
+        return
+    REQUESTS.inc(view, response.status_code)
+    LATENCY.observe(view, duration)
+    DB_QUERIES.observe(view, sample.queries)
+    DB_TIME.observe(view, sample.db_time)
+    RENDER_TIME.observe(view, sample.render_time)
+    size = _response_size(response)
+    if size is not None:
+        RESPONSE_SIZE.observe(view, size)
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        sample = RequestSample()
+        token = _current.set(sample)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        record(request, response, sample, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        # sync_to_async копирует контекст, поэтому _current виден и в потоках с ORM
+        sample = RequestSample()
+        token = _current.set(sample)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        record(request, response, sample, time.perf_counter() - started)
+        return response
@@ -0,0 +1,136 @@
+"""
+Отдача статики из STATIC_ROOT без отдельного веб-сервера.
+
+PrecompressedStaticMiddleware перехватывает запросы к STATIC_URL, выбирает
+по Accept-Encoding заранее сжатую копию (.br, затем .gz — их пишет
+CompressedManifestStaticFilesStorage) и отдаёт её FileResponse, то есть
+через wsgi.file_wrapper (sendfile у gunicorn/uwsgi). Файлы с хэшем в
+имени (есть в staticfiles.json) кэшируются на год с immutable, остальные —
+на STATIC_MAX_AGE. Если файла в STATIC_ROOT нет, запрос идёт дальше.
+"""
+from __future__ import annotations
+
+import json
+import mimetypes
+import os
+import threading
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+
+from .storage import ENCODINGS
+
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+MANIFEST_NAME = "staticfiles.json"
+
+_lock = threading.Lock()
+_hashed: tuple[str, float, frozenset] | None = None
+
+
+def hashed_names(root: str) -> frozenset:
+    """Хэшированные имена из staticfiles.json; перечитывается при изменении файла."""
+    global _hashed
+    path = os.path.join(root, MANIFEST_NAME)
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return frozenset()
+
+    cached = _hashed
+    if cached is not None and cached[0] == path and cached[1] == mtime:
+        return cached[2]
+
+    with _lock:
+        with open(path, encoding="utf-8") as fh:
+            names = frozenset(json.load(fh).get("paths", {}).values())
+        _hashed = (path, mtime, names)
+    return names
+
+
+def accepted_encodings(header: str) -> set[str]:
+    """Кодировки из Accept-Encoding, кроме явно запрещённых через q=0."""
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding)
+    return accepted
+
+
+def static_response(request):
+    """FileResponse для файла из STATIC_ROOT или None, если это не статика."""
+    static_url = settings.STATIC_URL or ""
+    root = settings.STATIC_ROOT
+    if not root or request.method not in ("GET", "HEAD"):
+        return None
+    prefix = static_url if static_url.startswith("/") else "/" + static_url
+    if not request.path.startswith(prefix):
+        return None
+
+    name = request.path[len(prefix):]
+    try:
+        path = safe_join(str(root), name)
+    except SuspiciousFileOperation:
+        return None
+    if not name or not os.path.isfile(path):
+        return None
+
+    stat = os.stat(path)
+    if_modified_since = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+    hashed = name in hashed_names(str(root))
+    cache_control = IMMUTABLE_CACHE_CONTROL if hashed else f"public, max-age={settings.STATIC_MAX_AGE}"
+    if if_modified_since is not None and int(stat.st_mtime) <= if_modified_since:
+        response = HttpResponseNotModified()
+        response["Cache-Control"] = cache_control
+        return response
+
+    content_type, _ = mimetypes.guess_type(name)
+    served, encoding = path, None
+    accepted = accepted_encodings(request.headers.get("Accept-Encoding", ""))
+    for coding, suffix in ENCODINGS:
+        if coding in accepted and os.path.isfile(path + suffix):
+            served, encoding = path + suffix, coding
+            break
+
+    response = FileResponse(open(served, "rb"), content_type=content_type or "application/octet-stream")
+    if encoding:
+        response["Content-Encoding"] = encoding
+    response["Vary"] = "Accept-Encoding"
+    response["Cache-Control"] = cache_control
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    return response
+
+
+class PrecompressedStaticMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        response = static_response(request)
+        return response if response is not None else self.get_response(request)
+
+    async def __acall__(self, request):
+        response = static_response(request)
+        return response if response is not None else await self.get_response(request)
+
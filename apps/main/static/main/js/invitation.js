@@ -0,0 +1,696 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Получение CSRF токена
+    function getCSRFToken() {
+        const meta = document.querySelector('meta[name="csrf-token"]');
+        return meta ? meta.getAttribute('content') : '';
+    }
+
+    // Режим оболочки: HTML общий для всех гостей, данные гостя приходят отдельным JSON
+    function hydrateGuest() {
+        if (!document.querySelector('meta[name="invitation-shell"]')) return;
+        const pathMatch = window.location.pathname.match(/\/Invitation\/([^\/]+)/);
+        if (!pathMatch) return;
+
+        fetch(`/api/invitations/${pathMatch[1]}/guest/`, { credentials: 'same-origin' })
+            .then(function(res) { return res.ok ? res.json() : null; })
+            .then(function(data) {
+                if (!data) return;
+                document.querySelectorAll('[data-guest-greeting]').forEach(function(el) {
+                    el.textContent = data.greeting;
+                });
+                const meta = document.querySelector('meta[name="csrf-token"]');
+                if (meta && data.csrf_token) {
+                    meta.setAttribute('content', data.csrf_token);
+                }
+                setGuestName(data.name);
+                const noteEl = document.querySelector('textarea[name="comments"]');
+                if (noteEl && data.rsvp && data.rsvp.note && !noteEl.value) {
+                    noteEl.value = data.rsvp.note;
+                }
+            })
+            .catch(function(error) {
+                console.error("Guest data error:", error);
+            });
+    }
+
+    // Имя гостя для модалки RSVP: из <meta name="guest-name"> или из JSON оболочки
+    function setGuestName(name) {
+        if (!name) return;
+        let meta = document.querySelector('meta[name="guest-name"]');
+        if (!meta) {
+            meta = document.createElement('meta');
+            meta.setAttribute('name', 'guest-name');
+            document.head.appendChild(meta);
+        }
+        meta.setAttribute('content', name);
+        document.querySelectorAll('[data-guest-name]').forEach(function(el) {
+            el.textContent = name;
+        });
+    }
+
+    // Модалка RSVP не входит в страницу: фрагмент загружается только при
+    // намерении открыть её (наведение/фокус/касание кнопки, клик) и кэшируется
+    // браузером. Без кнопки открытия на странице фрагмент не запрашивается вовсе
+    function lazyRsvpModal() {
+        const source = document.querySelector('meta[name="rsvp-modal"]');
+        const triggers = '#openModalBtn, [data-rsvp-open]';
+        if (!source || !document.querySelector(triggers)) return;
+        let loading = null;
+
+        function load() {
+            if (loading) return loading;
+            loading = fetch(source.getAttribute('content'), { credentials: 'same-origin' })
+                .then(function(res) {
+                    if (!res.ok) throw new Error('RSVP modal: HTTP ' + res.status);
+                    return res.text();
+                })
+                .then(function(html) {
+                    const template = document.createElement('template');
+                    template.innerHTML = html;
+                    // скрипты, вставленные через innerHTML, не выполняются — пересоздаём их
+                    const scripts = Array.from(template.content.querySelectorAll('script'));
+                    scripts.forEach(function(script) { script.remove(); });
+                    document.body.appendChild(template.content);
+
+                    const nameMeta = document.querySelector('meta[name="guest-name"]');
+                    if (nameMeta) setGuestName(nameMeta.getAttribute('content'));
+
+                    scripts.forEach(function(old) {
+                        const script = document.createElement('script');
+                        script.textContent = old.textContent;
+                        document.body.appendChild(script);
+                    });
+                })
+                .catch(function(error) {
+                    loading = null;
+                    throw error;
+                });
+            return loading;
+        }
+
+        function preload() {
+            load().catch(function(error) {
+                console.error(error);
+            });
+        }
+
+        ['pointerover', 'focusin', 'touchstart'].forEach(function(type) {
+            document.addEventListener(type, function(event) {
+                if (event.target.closest && event.target.closest(triggers)) preload();
+            }, { passive: true });
+        });
+
+        // клик до загрузки: дожидаемся фрагмента и повторяем клик —
+        // обработчик открытия к этому моменту уже навешан скриптом модалки
+        document.addEventListener('click', function(event) {
+            const trigger = event.target.closest && event.target.closest(triggers);
+            if (!trigger || document.getElementById('modalOverlay')) return;
+            event.preventDefault();
+            event.stopPropagation();
+            load().then(function() {
+                trigger.click();
+            }).catch(function(error) {
+                console.error(error);
+            });
+        }, true);
+    }
+
+    hydrateGuest();
+    lazyRsvpModal();
+
+    // Функция для показа звезды вместо кружочка
+    function showStar(rectangle) {
+        // Проверяем, нет ли уже звезды
+        if (rectangle.querySelector('.star-checkbox')) {
+            return;
+        }
+
+        // Определяем путь к звезде в зависимости от версии
+        const isMobile = document.querySelector('.home-page-mobile');
+        const starPath = isMobile 
+            ? '/static/main/img-mobile/star-2.svg' 
+            : '/static/main/img/star-2-1.svg';
+
+        // Получаем data-input-id для связи звезды с rectangle
+        const inputId = rectangle.getAttribute('data-input-id');
+        
+        // Создаем элемент звезды
+        const star = document.createElement('img');
+        star.className = 'star-checkbox';
+        star.src = starPath;
+        star.alt = 'Star';
+        // Добавляем data-атрибут для связи с rectangle
+        if (inputId) {
+            star.setAttribute('data-rectangle-id', inputId);
+        }
+        
+        // Получаем размеры и позицию rectangle
+        const rect = rectangle.getBoundingClientRect();
+        const computedStyle = window.getComputedStyle(rectangle);
+        const baseWidth = parseFloat(computedStyle.width) || 18;
+        const baseHeight = parseFloat(computedStyle.height) || 18;
+        
+        // Получаем позицию родителя для правильного позиционирования звезды
+        const parent = rectangle.parentElement;
+        const parentRect = parent.getBoundingClientRect();
+        
+        // Вычисляем относительные координаты центра rectangle
+        const centerX = rect.left - parentRect.left + rect.width / 2;
+        const centerY = rect.top - parentRect.top + rect.height / 2;
+        
+        // Позиционируем звезду в центре rectangle (увеличена в 1.7 раза)
+        const width = baseWidth * 1.7;
+        const height = baseHeight * 1.7;
+        
+        // Убеждаемся что родитель имеет position: relative или absolute
+        const parentPosition = window.getComputedStyle(parent).position;
+        if (parentPosition === 'static') {
+            parent.style.position = 'relative';
+        }
+        
+        // Скрываем кружок при выборе
+        rectangle.classList.add('rectangle-selected');
+        
+        star.style.cssText = `
+            position: absolute;
+            left: ${centerX}px;
+            top: ${centerY}px;
+            transform: translate(-50%, -50%);
+            width: ${width}px;
+            height: ${height}px;
+            object-fit: contain;
+            pointer-events: none;
+            z-index: 10;
+            margin: 0;
+            padding: 0;
+        `;
+
+        // Добавляем звезду в родителя rectangle (не в сам rectangle)
+        parent.appendChild(star);
+    }
+
+    // Функция для скрытия звезды
+    function hideStar(rectangle) {
+        // Звезда находится в родителе rectangle, ищем её по data-атрибуту
+        const inputId = rectangle.getAttribute('data-input-id');
+        if (!inputId) return;
+        
+        const parent = rectangle.parentElement;
+        if (!parent) return;
+        
+        // Ищем звезду по data-атрибуту (более точный способ)
+        const star = parent.querySelector(`.star-checkbox[data-rectangle-id="${inputId}"]`);
+        if (star) {
+            star.remove();
+        } else {
+            // Fallback: ищем все звезды в родителе и проверяем позицию
+            const stars = parent.querySelectorAll('.star-checkbox');
+            const rectRect = rectangle.getBoundingClientRect();
+            const rectCenterX = rectRect.left + rectRect.width / 2;
+            const rectCenterY = rectRect.top + rectRect.height / 2;
+            
+            stars.forEach(function(starEl) {
+                const starRect = starEl.getBoundingClientRect();
+                const starCenterX = starRect.left + starRect.width / 2;
+                const starCenterY = starRect.top + starRect.height / 2;
+                
+                // Если звезда находится в центре rectangle (в пределах 10px), удаляем её
+                const distance = Math.sqrt(
+                    Math.pow(starCenterX - rectCenterX, 2) +
+                    Math.pow(starCenterY - rectCenterY, 2)
+                );
+                if (distance < 10) {
+                    starEl.remove();
+                }
+            });
+        }
+        
+        // Также проверяем старый способ (если звезда была внутри rectangle)
+        const starInRect = rectangle.querySelector('.star-checkbox');
+        if (starInRect) {
+            starInRect.remove();
+        }
+        
+        // Показываем кружок обратно при снятии выбора
+        rectangle.classList.remove('rectangle-selected');
+    }
+
+    // Обработка показа/скрытия дополнительных вариантов для вопроса "+1"
+    function toggleCompanionDetails() {
+        const companionYes = document.querySelector('input[name="companion"][value="yes"]');
+        const companionDetails = document.querySelectorAll('.companion-details');
+        
+        if (companionYes && companionYes.checked) {
+            // Показываем дополнительные варианты
+            companionDetails.forEach(function(details) {
+                details.style.display = 'block';
+            });
+        } else {
+            // Скрываем дополнительные варианты и сбрасываем выбор
+            companionDetails.forEach(function(details) {
+                details.style.display = 'none';
+                // Сбрасываем выбор типа спутника
+                const companionTypeInputs = details.querySelectorAll('input[name="companion_type"]');
+                companionTypeInputs.forEach(function(input) {
+                    input.checked = false;
+                    const rectId = input.id;
+                    const rectEl = document.querySelector(`[data-input-id="${rectId}"]`);
+                    if (rectEl) hideStar(rectEl);
+                });
+            });
+        }
+    }
+
+    // Обработка кликов на rectangles
+    document.querySelectorAll('[class*="rectangle-"]').forEach(function(rectangle) {
+        const inputId = rectangle.getAttribute('data-input-id');
+        if (!inputId) return;
+
+        const input = document.getElementById(inputId);
+        if (!input) return;
+
+        // Делаем rectangle кликабельным
+        rectangle.style.cursor = 'pointer';
+
+        // Обработчик клика
+        rectangle.addEventListener('click', function() {
+            if (input.type === 'radio') {
+                // Для radio - снимаем выбор с других в группе
+                const groupName = input.name;
+                document.querySelectorAll(`input[name="${groupName}"]`).forEach(function(radio) {
+                    radio.checked = false;
+                    const rectId = radio.id;
+                    const rectEl = document.querySelector(`[data-input-id="${rectId}"]`);
+                    if (rectEl) hideStar(rectEl);
+                });
+                // Выбираем текущий
+                input.checked = true;
+                showStar(rectangle);
+                
+                // Если это вопрос о "+1", показываем/скрываем дополнительные варианты
+                if (input.name === 'companion') {
+                    toggleCompanionDetails();
+                }
+            } else if (input.type === 'checkbox') {
+                // Для checkbox - множественный выбор разрешен для food и companion_type
+                // Для остальных - работаем как radio (только один выбор в группе)
+                const groupName = input.name;
+                
+                if (groupName === 'food' || groupName === 'companion_type' || groupName === 'drinks') {
+                    // Множественный выбор: toggle текущего checkbox
+                    input.checked = !input.checked;
+                    if (input.checked) {
+                        showStar(rectangle);
+                    } else {
+                        hideStar(rectangle);
+                    }
+                } else {
+                    // Одиночный выбор: снимаем выбор со всех checkbox в группе
+                    document.querySelectorAll(`input[name="${groupName}"]`).forEach(function(checkbox) {
+                        checkbox.checked = false;
+                        const rectId = checkbox.id;
+                        const rectEl = document.querySelector(`[data-input-id="${rectId}"]`);
+                        if (rectEl) hideStar(rectEl);
+                    });
+                    // Выбираем текущий
+                    input.checked = true;
+                    showStar(rectangle);
+                }
+            }
+        });
+
+        // Инициализация: показываем звезду если input уже выбран
+        if (input.checked) {
+            showStar(rectangle);
+        }
+    });
+
+    // Слушаем изменения в вопросе "+1"
+    document.addEventListener('change', function(e) {
+        if (e.target.name === 'companion') {
+            toggleCompanionDetails();
+        }
+    });
+
+    // Инициализация при загрузке страницы
+    setTimeout(function() {
+        toggleCompanionDetails();
+    }, 100);
+
+    // Схема анкеты (id вопросов и вариантов): загружается один раз и кэшируется браузером
+    let questionnairePromise = null;
+    function loadQuestionnaire() {
+        if (!questionnairePromise) {
+            questionnairePromise = fetch('/api/invitations/questionnaire/', { credentials: 'same-origin' })
+                .then(function(res) { return res.ok ? res.json() : null; })
+                .catch(function() { return null; });
+        }
+        return questionnairePromise;
+    }
+
+    function normalizeText(text) {
+        return (text || '').replace(/\s+/g, ' ').trim().toLowerCase();
+    }
+
+    // Тексты выбранных вариантов (data-text у rectangle) для группы input'ов
+    function selectedTexts(name) {
+        return Array.from(document.querySelectorAll(`input[name="${name}"]:checked`)).map(function(input) {
+            const rect = document.querySelector(`[data-input-id="${input.id}"]`);
+            return rect ? rect.getAttribute('data-text') : '';
+        }).filter(Boolean);
+    }
+
+    // Текст вопроса из HTML страницы (у ПК и мобильной версии разные классы)
+    function questionTextFor(name, groupSelector, textSelector, fallback) {
+        const input = document.querySelector(`input[name="${name}"]`);
+        const rect = input ? document.querySelector(`[data-input-id="${input.id}"]`) : null;
+        const group = rect ? rect.closest(groupSelector) : null;
+        const el = group ? group.querySelector(textSelector) : null;
+        return el ? el.textContent.trim() : fallback;
+    }
+
+    // Сбор данных формы: [{ question, choices: [...], multi }]
+    function collectSelections() {
+        const attendance = selectedTexts('attendance')[0] || "";
+
+        const noteEl = document.querySelector('textarea[name="comments"]');
+        const note = noteEl ? noteEl.value.trim() : "";
+
+        const selections = [];
+
+        // Companion (SINGLE - radio) + типы спутника, если выбрано "Так"
+        const companion = selectedTexts('companion');
+        if (companion.length) {
+            const companionYes = document.querySelector('input[name="companion"][value="yes"]:checked');
+            selections.push({
+                question: questionTextFor('companion', '.group-33-5', '.text-26-5', "Чи потрібно вам запрошення \"+1\"?"),
+                choices: companion,
+                companions: companionYes ? selectedTexts('companion_type') : [],
+                multi: false,
+            });
+        }
+
+        // Еда (MULTI)
+        const food = selectedTexts('food');
+        if (food.length) {
+            selections.push({
+                question: questionTextFor('food', '.group-34', '.text-34, .text', "Відмітьте, будь ласка, ваші вподобання:"),
+                choices: food,
+                multi: true,
+            });
+        }
+
+        // Аллергии (SINGLE)
+        const allergies = selectedTexts('allergies');
+        if (allergies.length) {
+            selections.push({
+                question: questionTextFor('allergies', '.group-35', '.text-37, .text-31', "Чи є у вас харчові алергії або продукти, які вам не можна:"),
+                choices: allergies,
+                multi: false,
+            });
+        }
+
+        // Напитки (MULTI)
+        const drinks = selectedTexts('drinks');
+        if (drinks.length) {
+            selections.push({
+                question: questionTextFor('drinks', '.group-36', '.text-40, .text', "Відмітьте, будь ласка, ваші уподобання щодо напоїв:"),
+                choices: drinks,
+                multi: true,
+            });
+        }
+
+        // Трансфер (SINGLE)
+        const transfer = selectedTexts('transfer');
+        if (transfer.length) {
+            selections.push({
+                question: questionTextFor('transfer', '.group-37', '.text-38, .text-32', "Чи потрібна вам трансфер до місця проведення або назад:"),
+                choices: transfer,
+                multi: false,
+            });
+        }
+
+        return { attendance, selections, note };
+    }
+
+    // Старый текстовый формат: { attendance, answers: { "текст вопроса": "текст" | [...] }, note }
+    function toTextPayload(collected) {
+        const answers = {};
+        collected.selections.forEach(function(s) {
+            if (s.multi) {
+                answers[s.question] = s.choices;
+            } else if (s.companions && s.companions.length) {
+                answers[s.question] = s.choices[0] + ' (' + s.companions.join(', ') + ')';
+            } else {
+                answers[s.question] = s.choices[0];
+            }
+        });
+        return { attendance: collected.attendance, answers, note: collected.note };
+    }
+
+    // Формат v2: { version: 2, answers: { question_id: [choice_id, ...] }, note }.
+    // Если что-то не сопоставилось со схемой — null, и уходит старый формат.
+    function toIdPayload(collected, schema) {
+        if (!schema || !schema.questions) return null;
+
+        const byText = {};
+        const byId = {};
+        schema.questions.forEach(function(q) {
+            byText[normalizeText(q.text)] = q;
+            byId[q.id] = q;
+        });
+
+        const answers = {};
+        function add(question, texts) {
+            const ids = [];
+            for (const text of texts) {
+                const choice = question.choices.find(function(c) { return normalizeText(c.text) === normalizeText(text); });
+                if (!choice) return false;
+                ids.push(choice.id);
+            }
+            answers[question.id] = ids;
+            return true;
+        }
+
+        if (collected.attendance) {
+            const question = byId[schema.attendance_question];
+            if (!question || !add(question, [collected.attendance])) return null;
+        }
+
+        for (const s of collected.selections) {
+            const question = byText[normalizeText(s.question)];
+            if (!question || !add(question, s.choices.concat(s.companions || []))) return null;
+        }
+
+        return { version: schema.protocol, answers, note: collected.note };
+    }
+
+    async function buildPayload() {
+        const collected = collectSelections();
+        const schema = await loadQuestionnaire();
+        return toIdPayload(collected, schema) || toTextPayload(collected);
+    }
+
+    // Подгружаем схему заранее, чтобы отправка не ждала лишний запрос
+    loadQuestionnaire();
+
+    // Функция для показа уведомления
+    function showCustomNotification(message, isSuccess = true) {
+        const notification = document.createElement('div');
+        notification.id = 'custom-notification';
+        notification.style.cssText = `
+            position: fixed;
+            top: 50%;
+            left: 50%;
+            transform: translate(-50%, -50%);
+            background: rgba(255, 255, 255, 0.95);
+            border: 2px solid #D4AF37;
+            border-radius: 15px;
+            padding: 30px 50px;
+            z-index: 100000;
+            box-shadow: 0 4px 20px rgba(0, 0, 0, 0.3);
+            text-align: center;
+            min-width: 300px;
+            max-width: 90%;
+            font-family: Gabriola, Helvetica, serif;
+            color: #D4AF37;
+            font-size: 28px;
+            font-weight: 400;
+            letter-spacing: 0.5px;
+            animation: fadeIn 0.3s ease-in;
+        `;
+        
+        notification.textContent = message;
+        
+        // Добавляем стили для анимации
+        if (!document.getElementById('notification-styles')) {
+            const style = document.createElement('style');
+            style.id = 'notification-styles';
+            style.textContent = `
+                @keyframes fadeIn {
+                    from { opacity: 0; transform: translate(-50%, -60%); }
+                    to { opacity: 1; transform: translate(-50%, -50%); }
+                }
+                @keyframes fadeOut {
+                    from { opacity: 1; transform: translate(-50%, -50%); }
+                    to { opacity: 0; transform: translate(-50%, -60%); }
+                }
+            `;
+            document.head.appendChild(style);
+        }
+        
+        // Удаляем предыдущее уведомление
+        const existing = document.getElementById('custom-notification');
+        if (existing) {
+            existing.remove();
+        }
+        
+        document.body.appendChild(notification);
+        
+        // Автоматически скрываем через 3 секунды
+        setTimeout(() => {
+            notification.style.animation = 'fadeOut 0.3s ease-out';
+            setTimeout(() => {
+                if (notification.parentNode) {
+                    notification.parentNode.removeChild(notification);
+                }
+            }, 300);
+        }, 3000);
+        
+        // Закрытие по клику
+        notification.addEventListener('click', () => {
+            notification.style.animation = 'fadeOut 0.3s ease-out';
+            setTimeout(() => {
+                if (notification.parentNode) {
+                    notification.parentNode.removeChild(notification);
+                }
+            }, 300);
+        });
+    }
+
+    // Ключ отправки (Idempotency-Key): тот же payload — ретрай или двойной клик — уходит с тем же ключом,
+    // и сервер отдаёт сохранённый ответ без записи
+    let lastSubmission = { body: null, key: null };
+    let submitting = false;
+
+    function submissionKey(body) {
+        if (lastSubmission.body !== body) {
+            const key = (window.crypto && crypto.randomUUID)
+                ? crypto.randomUUID()
+                : Date.now().toString(36) + Math.random().toString(36).slice(2);
+            lastSubmission = { body: body, key: key };
+        }
+        return lastSubmission.key;
+    }
+
+    // Отправка данных на сервер
+    async function submitRSVP() {
+        // Получаем token из URL
+        let token = "";
+        const pathMatch = window.location.pathname.match(/\/Invitation\/([^\/]+)/);
+        if (pathMatch) {
+            token = pathMatch[1];
+        }
+
+        if (!token) {
+            console.error("Token not found");
+            showCustomNotification("Помилка: токен не знайдено. Перевірте посилання.", false);
+            return;
+        }
+
+        if (submitting) {
+            return;
+        }
+        submitting = true;
+
+        try {
+            const payload = await buildPayload();
+            const body = JSON.stringify(payload);
+            const res = await fetch(`/api/invitation/${token}/submit/`, {
+                method: "POST",
+                headers: {
+                    "Content-Type": "application/json",
+                    "X-CSRFToken": getCSRFToken(),
+                    "Idempotency-Key": submissionKey(body),
+                },
+                body: body,
+                credentials: "same-origin",
+            });
+
+            if (res.status === 429) {
+                showCustomNotification("Забагато спроб. Спробуйте трохи пізніше.", false);
+                return;
+            }
+
+            if (!res.ok) {
+                const errorText = await res.text();
+                console.error("Server error:", errorText);
+                showCustomNotification("Помилка збереження. Спробуйте ще раз.", false);
+                return;
+            }
+
+            const data = await res.json();
+            if (data.ok) {
+                showCustomNotification("Дякуємо! Відповідь збережено.", true);
+            } else {
+                showCustomNotification("Помилка збереження. Спробуйте ще раз.", false);
+            }
+        } catch (error) {
+            console.error("Fetch error:", error);
+            showCustomNotification("Помилка з'єднання. Спробуйте ще раз.", false);
+        } finally {
+            submitting = false;
+        }
+    }
+
+    // Обработчик клика на кнопку подтверждения
+    document.addEventListener("click", function(e) {
+        // Мобильная версия: .group-32 или .text-43
+        // ПК версия: .group-32 или .text-37
+        const confirmBtn = e.target.closest('.group-32, .group-27');
+        const confirmText = e.target.closest('.text-43, .text-37, [data-layer="підтвердити"]');
+        if (confirmBtn || confirmText) {
+            e.preventDefault();
+            e.stopPropagation();
+            submitRSVP();
+        }
+    });
+
+    // Исправляем позиционирование textarea чтобы текст писался только внутри области
+    function fixTextareaPositioning() {
+        const textareas = document.querySelectorAll('textarea[name="comments"]');
+        const isMobile = document.querySelector('.home-page-mobile');
+        
+        textareas.forEach(function(textarea) {
+            const group38 = textarea.closest('.group-38');
+            if (group38) {
+                // Убеждаемся что group-38 имеет position: relative
+                group38.style.position = 'relative';
+                
+                // Убеждаемся что textarea занимает всю область group-38
+                textarea.style.position = 'absolute';
+                textarea.style.top = '0';
+                textarea.style.height = '100%';
+                textarea.style.boxSizing = 'border-box';
+                textarea.style.overflow = 'hidden';
+                
+                // Для PC версии добавляем отступы: 10px слева, 30px справа
+                if (!isMobile) {
+                    textarea.style.left = '100px';
+                    textarea.style.width = 'calc(100% - 130px)';
+                    textarea.style.paddingRight = '10px';
+                } else {
+                    // Для мобильной версии без отступов
+                    textarea.style.left = '0';
+                    textarea.style.width = '100%';
+                }
+            }
+        });
+    }
+
+    // Вызываем после загрузки DOM
+    setTimeout(fixTextareaPositioning, 100);
+    
+    // Также вызываем при изменении размера окна
+    window.addEventListener('resize', fixTextareaPositioning);
+});
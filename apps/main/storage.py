@@ -0,0 +1,65 @@
+"""
+Хранилище статики для продакшена.
+
+ManifestStaticFilesStorage при collectstatic пишет копии файлов с хэшем
+содержимого в имени (main.3f2a9c1b.css) и staticfiles.json с соответствием
+имён; {% static %} отдаёт хэшированные URL, поэтому их можно кэшировать
+навсегда. Дополнительно для текстовых форматов рядом кладутся .gz и .br
+(brotli — если установлен), которые отдаёт PrecompressedStaticMiddleware.
+"""
+from __future__ import annotations
+
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен: без него будут только .gz
+    brotli = None
+
+
+# шрифты WOFF2 и растровые форматы уже сжаты
+COMPRESSIBLE_SUFFIXES = (".css", ".js", ".svg", ".json", ".txt", ".xml", ".html", ".ico", ".ttf", ".otf", ".map")
+# мелкие файлы не стоят лишнего запроса к диску
+MIN_COMPRESS_BYTES = 256
+# сжатая копия сохраняется, только если она меньше этой доли оригинала
+MAX_COMPRESSED_RATIO = 0.95
+
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def compress_bytes(data: bytes) -> dict[str, bytes]:
+    """{суффикс: сжатые данные} для выгодных вариантов."""
+    variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = brotli.compress(data, quality=11)
+    limit = len(data) * MAX_COMPRESSED_RATIO
+    return {suffix: blob for suffix, blob in variants.items() if len(blob) < limit}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        compressed = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            yield name, hashed_name, processed
+            if dry_run or isinstance(processed, Exception):
+                continue
+            # и исходное имя (на случай ссылок мимо {% static %}), и хэшированное
+            for path in (name, hashed_name):
+                if path and path not in compressed:
+                    compressed.add(path)
+                    self._write_compressed(path)
+
+    def _write_compressed(self, name):
+        if not name.lower().endswith(COMPRESSIBLE_SUFFIXES):
+            return
+        path = self.path(name)
+        if os.path.getsize(path) < MIN_COMPRESS_BYTES:
+            return
+        with open(path, "rb") as fh:
+            data = fh.read()
+        for suffix, blob in compress_bytes(data).items():
+            with open(path + suffix, "wb") as fh:
+                fh.write(blob)
@@ -0,0 +1,58 @@
+import re
+
+from django import template
+from django.templatetags.static import static
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from apps.main.images import picture_for_url
+
+
+register = template.Library()
+
+_SRC = re.compile(r'\ssrc="([^"]+)"')
+
+
+class PictureNode(template.Node):
+    def __init__(self, nodelist, sizes):
+        self.nodelist = nodelist
+        self.sizes = sizes
+
+    def render(self, context):
+        html = self.nodelist.render(context)
+        match = _SRC.search(html)
+        picture = picture_for_url(match.group(1)) if match else None
+        if picture is None:
+            return html
+
+        # SVG: просто подменяем src на минифицированную копию
+        if picture.svg:
+            return html[:match.start(1)] + escape(static(picture.svg)) + html[match.end(1):]
+
+        sizes = self.sizes.resolve(context) if self.sizes else "100vw"
+        sources = []
+        for mime, variants in picture.sources:
+            srcset = ", ".join(f"{escape(static(path))} {width}w" for path, width in variants)
+            sources.append(f'<source type="{mime}" srcset="{srcset}" sizes="{escape(sizes)}">')
+        return mark_safe(f"<picture>{''.join(sources)}{html.strip()}</picture>")
+
+
+@register.tag
+def picture(parser, token):
+    """
+    {% picture %}<img src="{% static '...' %}" ...>{% endpicture %}
+    {% picture sizes="50vw" %}...{% endpicture %}
+
+    Оборачивает <img> в <picture> с WebP/AVIF вариантами из манифеста
+    build_images. Если картинки нет в манифесте, <img> выводится как есть.
+    """
+    bits = token.split_contents()[1:]
+    sizes = None
+    for bit in bits:
+        name, _, value = bit.partition("=")
+        if name != "sizes" or not value:
+            raise template.TemplateSyntaxError("{% picture %} принимает только sizes=...")
+        sizes = parser.compile_filter(value)
+    nodelist = parser.parse(("endpicture",))
+    parser.delete_first_token()
+    return PictureNode(nodelist, sizes)
@@ -1,3 +1,335 @@
-from django.test import TestCase
+import json
+import re
+import tempfile
+import time
+from pathlib import Path
 
-# Create your tests here.
+from django.template import Context, Template
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from apps.invitations.models import Guest, Invitation
+from apps.invitations.tracking import tracker
+
+from . import critical, devices, fonts, metrics, storage
+from .images import minify_svg
+from .inflection import genitive, word_rule
+from .middleware import accepted_encodings
+from .storage import compress_bytes
+from .ua_corpus import UA_CORPUS
+
+
+IPHONE_UA = "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 Mobile/15E148"
+ANDROID_TABLET_UA = "Mozilla/5.0 (Linux; Android 13; SM-X200) AppleWebKit/537.36 Chrome/124.0.0.0 Safari/537.36"
+
+
+class IndexTests(TestCase):
+    async def test_device_templates(self):
+        pc = await self.async_client.get(reverse("index"))
+        mobile = await self.async_client.get(reverse("index"), headers={"user-agent": IPHONE_UA})
+        self.assertEqual(pc.status_code, 200)
+        self.assertContains(mobile, "home-page-mobile")
+        self.assertIn("User-Agent", pc["Vary"])
+        self.assertIn("Sec-CH-UA-Mobile", pc["Vary"])
+
+    async def test_client_hints(self):
+        response = await self.async_client.get(
+            reverse("index"), headers={"user-agent": ANDROID_TABLET_UA, "sec-ch-ua-mobile": "?1"}
+        )
+        self.assertContains(response, "home-page-mobile")
+
+
+class DeviceClassificationTests(TestCase):
+    def test_corpus(self):
+        for user_agent, ch_mobile, device, in_app, bot in UA_CORPUS:
+            with self.subTest(user_agent=user_agent, ch_mobile=ch_mobile):
+                info = devices.classify(user_agent, ch_mobile)
+                self.assertEqual((info.device, info.in_app, info.bot), (device, in_app, bot))
+
+    def test_repeated_user_agent_is_cached(self):
+        devices.classify.cache_clear()
+        devices.classify(IPHONE_UA)
+        devices.classify(IPHONE_UA)
+        info = devices.classify.cache_info()
+        self.assertEqual((info.hits, info.misses), (1, 1))
+        self.assertEqual(info.maxsize, devices.CACHE_SIZE)
+
+
+class InflectionTests(TestCase):
+    def test_examples(self):
+        cases = [
+            ("Ярослав", None, "Ярослава"),
+            ("Сергій", None, "Сергія"),
+            ("Світлана", None, "Світлани"),
+            ("мама Світлана", None, "мами Світлани"),
+            ("тато Сергій", "male", "тата Сергія"),
+            ("Марія", "female", "Марії"),
+            ("Катя", "female", "Каті"),
+            ("Саша", None, "Саші"),
+            ("Олена та Андрій", None, "Олени та Андрія"),
+            ("Родина Іванових", None, "Родини Іванових"),
+            ("МАМА", None, "МАМИ"),
+        ]
+        for text, gender, expected in cases:
+            with self.subTest(text=text, gender=gender):
+                self.assertEqual(genitive(text, gender), expected)
+
+    def test_gender_dependent_surnames(self):
+        self.assertEqual(genitive("Тарас Шевченко", "male"), "Тараса Шевченка")
+        self.assertEqual(genitive("Ірина Шевченко", "female"), "Ірини Шевченко")
+        self.assertEqual(genitive("Олена Петрова", "female"), "Олени Петрової")
+        self.assertEqual(genitive("Андрій Ковальський", "male"), "Андрія Ковальського")
+
+    def test_female_consonant_surnames_do_not_decline(self):
+        self.assertEqual(genitive("Олена Мельник", "female"), "Олени Мельник")
+        self.assertEqual(genitive("Оксана Ковальчук", "female"), "Оксани Ковальчук")
+        self.assertEqual(genitive("Ольга Коваль", "female"), "Ольги Коваль")
+        self.assertEqual(genitive("Світлана Шевчук", None), "Світлани Шевчука")
+        self.assertEqual(genitive("Іван Мельник", "male"), "Івана Мельника")
+        self.assertEqual(genitive("Ігор Коваль", "male"), "Ігоря Коваля")
+        self.assertEqual(genitive("мама Олена Мельник", "female"), "мами Олени Мельник")
+
+    def test_gender_applies_only_to_surname(self):
+        # одиночные имена и имена разных людей через союз — не фамилии
+        self.assertEqual(genitive("Ярослав", "female"), "Ярослава")
+        self.assertEqual(genitive("Олександр та Катерина", "female"), "Олександра та Катерини")
+        self.assertEqual(genitive("Олег Коваль", None), "Олега Коваля")
+        self.assertEqual(genitive("Мері Коваль", "female"), "Мері Коваль")
+
+    def test_plural_family_names_stay_as_is(self):
+        for gender in (None, "male", "female"):
+            with self.subTest(gender=gender):
+                self.assertEqual(genitive("родина Петренків", gender), "родини Петренків")
+                self.assertEqual(genitive("сім'я Ковалів", gender), "сім'ї Ковалів")
+
+    def test_longest_suffix_wins(self):
+        self.assertEqual(word_rule("ковальська"), (1, "ої"))
+        self.assertEqual(word_rule("світлана"), (1, "и"))
+
+    def test_whitespace_is_normalized(self):
+        self.assertEqual(genitive("  мама   Світлана "), "мами Світлани")
+        self.assertEqual(genitive(""), "")
+
+
+class PictureTagTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        manifest = Path(tmp.name) / "manifest.json"
+        manifest.write_text(json.dumps({"version": 1, "images": {
+            "main/img/photo.png": {
+                "hash": "abc", "width": 1200, "height": 800,
+                "sources": {"image/webp": [["main/img-opt/img-photo.abc.480.webp", 480], ["main/img-opt/img-photo.abc.1200.webp", 1200]]},
+            },
+            "main/img/line.svg": {"hash": "def", "svg": "main/img-opt/img-line.def.svg"},
+        }}), encoding="utf-8")
+        override = self.settings(IMAGE_MANIFEST=manifest)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def render(self, body):
+        return Template("{% load static images %}" + body).render(Context())
+
+    def test_raster_becomes_picture(self):
+        html = self.render('{% picture sizes="50vw" %}<img class="x" src="{% static \'main/img/photo.png\' %}" alt="">{% endpicture %}')
+        self.assertTrue(html.startswith("<picture>"))
+        self.assertIn(
+            '<source type="image/webp" srcset="/static/main/img-opt/img-photo.abc.480.webp 480w, '
+            '/static/main/img-opt/img-photo.abc.1200.webp 1200w" sizes="50vw">',
+            html,
+        )
+        self.assertIn('<img class="x" src="/static/main/img/photo.png" alt=""></picture>', html)
+
+    def test_svg_is_swapped_for_minified_copy(self):
+        html = self.render('{% picture %}<img src="{% static \'main/img/line.svg\' %}">{% endpicture %}')
+        self.assertEqual(html, '<img src="/static/main/img-opt/img-line.def.svg">')
+
+    def test_unknown_image_is_untouched(self):
+        html = self.render('{% picture %}<img src="{% static \'main/img/other.png\' %}">{% endpicture %}')
+        self.assertEqual(html, '<img src="/static/main/img/other.png">')
+
+    def test_minify_svg(self):
+        svg = '<svg>\n  <!-- Figma -->\n  <metadata>x</metadata>\n  <path d="M140.13456 0.574706L-0.0001 2"/>\n</svg>'
+        self.assertEqual(minify_svg(svg), '<svg><path d="M140.13 0.57L0 2"/></svg>')
+
+
+class FontSubsetTests(TestCase):
+    def test_unicode_ranges_are_collapsed(self):
+        self.assertEqual(fonts.unicode_ranges([0x43, 0x41, 0x42, 0x45, 0x42]), "U+41-43, U+45")
+        self.assertEqual(fonts.unicode_ranges([]), "")
+
+    def test_charset_covers_templates_and_questionnaire(self):
+        charset = fonts.collect_charset(["Ґанок\n"])
+        for char in "Запрошення ґҐ’№":
+            self.assertIn(char, charset)
+        self.assertNotIn("\n", charset)
+
+    def test_generated_css_matches_subsets(self):
+        css = fonts.FONTS_CSS.read_text(encoding="utf-8")
+        manifest = json.loads(fonts.MANIFEST.read_text(encoding="utf-8"))["fonts"]
+        self.assertEqual(set(manifest), set(fonts.FONTS))
+        for entry in manifest.values():
+            self.assertTrue((fonts.SUBSET_DIR / entry["file"]).exists())
+            self.assertIn(f'url("../fonts/subset/{entry["file"]}") format("woff2")', css)
+
+
+class PrecompressedStaticTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        root = Path(tmp.name)
+        css = b"body { color: red; }\n" * 100
+        (root / "main").mkdir()
+        for name in ("main/site.css", "main/site.0123456789ab.css"):
+            (root / name).write_bytes(css)
+            for suffix, blob in compress_bytes(css).items():
+                (root / (name + suffix)).write_bytes(blob)
+        (root / "staticfiles.json").write_text(
+            json.dumps({"version": "1.1", "paths": {"main/site.css": "main/site.0123456789ab.css"}}),
+            encoding="utf-8",
+        )
+        override = self.settings(STATIC_ROOT=root, STATIC_URL="/static/")
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_brotli_preferred_and_hashed_file_is_immutable(self):
+        response = self.client.get("/static/main/site.0123456789ab.css", HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Encoding"], "br" if storage.brotli else "gzip")
+        self.assertEqual(response["Content-Type"], "text/css")
+        self.assertEqual(response["Cache-Control"], "public, max-age=31536000, immutable")
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+    def test_gzip_fallback_and_short_cache_for_unhashed_name(self):
+        response = self.client.get("/static/main/site.css", HTTP_ACCEPT_ENCODING="gzip, br;q=0")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Cache-Control"], "public, max-age=3600")
+
+    def test_identity_and_missing_files(self):
+        response = self.client.get("/static/main/site.css")
+        self.assertNotIn("Content-Encoding", response)
+        self.assertEqual(b"".join(response.streaming_content), b"body { color: red; }\n" * 100)
+        self.assertEqual(self.client.get("/static/main/missing.css").status_code, 404)
+        self.assertEqual(self.client.get("/static/../staticfiles.json").status_code, 404)
+
+    def test_accepted_encodings(self):
+        self.assertEqual(accepted_encodings("gzip;q=0.5, BR, identity;q=0"), {"gzip", "br"})
+        self.assertEqual(accepted_encodings(""), set())
+
+
+@override_settings(METRICS_TOKEN="secret", INVITATION_OPEN_FLUSH_INTERVAL=0)
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+        self.addCleanup(tracker.flush)
+
+    def scrape(self, **extra) -> str:
+        response = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer secret", **extra)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        return response.content.decode()
+
+    def value(self, text: str, series: str) -> float:
+        match = re.search(rf"^{re.escape(series)} (\S+)$", text, re.M)
+        self.assertIsNotNone(match, series)
+        return float(match.group(1))
+
+    def test_index_latency_render_and_size(self):
+        page = self.client.get(reverse("index"))
+        text = self.scrape()
+        self.assertEqual(self.value(text, 'wedding_requests_total{view="index",status="200"}'), 1)
+        self.assertEqual(self.value(text, 'wedding_request_duration_seconds_count{view="index"}'), 1)
+        self.assertEqual(self.value(text, 'wedding_request_duration_seconds_bucket{view="index",le="+Inf"}'), 1)
+        self.assertGreater(self.value(text, 'wedding_template_render_seconds_sum{view="index"}'), 0)
+        self.assertEqual(self.value(text, 'wedding_response_size_bytes_sum{view="index"}'), len(page.content))
+        # сам эндпоинт метрик и прочие представления не отслеживаются
+        self.assertNotIn('view="metrics"', self.scrape())
+
+    def test_submit_queries_are_counted(self):
+        invitation = Invitation.objects.create(guest=Guest.objects.create(full_name="Ярослав"))
+        url = reverse("submit_rsvp", args=[invitation.token])
+        with self.assertLogs("apps.invitations.rsvp", "INFO") as logs:
+            self.client.post(url, json.dumps({"answers": {}}), content_type="application/json")
+        ingest_queries = json.loads(logs.records[0].getMessage())["queries"]
+        text = self.scrape()
+        # SELECT приглашения во view + запросы ingest_rsvp из sync-потока
+        self.assertEqual(self.value(text, 'wedding_request_db_queries_sum{view="submit_rsvp"}'), ingest_queries + 1)
+        self.assertGreater(self.value(text, 'wedding_request_db_seconds_sum{view="submit_rsvp"}'), 0)
+
+    async def test_asgi_queries_are_counted(self):
+        guest = await Guest.objects.acreate(full_name="Ярослав")
+        invitation = await Invitation.objects.acreate(guest=guest)
+        page = await self.async_client.get(reverse("invitation_page", args=[invitation.token]))
+        with self.assertLogs("apps.invitations.rsvp", "INFO"):
+            submit = await self.async_client.post(
+                reverse("submit_rsvp", args=[invitation.token]), json.dumps({"answers": {}}), content_type="application/json",
+            )
+        self.assertEqual((page.status_code, submit.status_code), (200, 200))
+        text = metrics.render()
+        # SELECT приглашения идёт из потока sync_to_async, а не из потока цикла событий
+        self.assertGreaterEqual(self.value(text, 'wedding_request_db_queries_sum{view="invitation_page"}'), 1)
+        self.assertGreater(self.value(text, 'wedding_request_db_queries_sum{view="submit_rsvp"}'), 1)
+
+    def test_endpoint_is_protected(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 404)
+        self.assertEqual(self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer wrong").status_code, 404)
+        self.client.force_login(User.objects.create_user("staff", password="pass", is_staff=True))
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 200)
+
+    def test_recording_overhead(self):
+        sample = metrics.RequestSample()
+        n = 10000
+        started = time.perf_counter()
+        for _ in range(n):
+            metrics.LATENCY.observe("index", 0.01)
+            metrics.DB_QUERIES.observe("index", sample.queries)
+        per_request = (time.perf_counter() - started) / n
+        # с большим запасом на медленные CI-машины
+        self.assertLess(per_request, 50e-6)
+        self.assertEqual(metrics.LATENCY.snapshot()["index"][0][3], n)
+
+
+class CriticalCssTests(TestCase):
+    def test_generated_templates_are_up_to_date(self):
+        for page in critical.PAGES:
+            with self.subTest(page=page):
+                self.assertEqual(
+                    critical.output_path(page).read_text(encoding="utf-8"),
+                    critical.render_template(critical.extract(page)),
+                    "CSS или шаблон изменились: запустите manage.py build_critical_css",
+                )
+
+    def test_fold_selection(self):
+        css = (
+            ":root{--f:\"Deco\"}.s{position:relative}.s .top{top:10px;font-family:var(--f)}"
+            ".s .low{top:2000px;background:url(../img/a.png)}.s .low .child{color:red}"
+            "@media (max-width:10px){.s .top{color:blue}.s .low{color:blue}}"
+            "@font-face{font-family:\"Deco\";src:url(x.woff2)}@font-face{font-family:\"Other\"}"
+        )
+        rules = critical.parse_css(css)
+        visible = critical.visible_classes(
+            '<div class="s">{% if x %}<p class="top">{{ name }}</p>{% endif %}<div class="low"><i class="child"></i></div></div>',
+            rules, 1000,
+        )
+        self.assertEqual(visible, {"s", "top"})
+        selected = critical._select(rules, visible)
+        self.assertEqual(
+            critical.serialize(critical._referenced_at_rules(rules, selected) + selected),
+            '@font-face{font-family:"Deco";src:url(x.woff2)}:root{--f:"Deco"}.s{position:relative}'
+            ".s .top{top:10px;font-family:var(--f)}@media (max-width:10px){.s .top{color:blue}}",
+        )
+
+    def test_url_rewritten_to_static(self):
+        self.assertEqual(
+            critical.rewrite_urls('background:url("../img/a b.png")', "main/styles/mobile/x.css"),
+            "background:url(\"{% static 'main/styles/img/a b.png' %}\")",
+        )
+
+    async def test_page_inlines_critical_css_and_defers_the_rest(self):
+        response = await self.async_client.get(reverse("index"))
+        self.assertContains(response, '<link rel="preload" href="/static/main/styles/main.css" as="style"')
+        self.assertContains(response, '<script src="/static/main/js/invitation.js" defer></script>')
+        self.assertNotContains(response, '<link rel="stylesheet" type="text/css" href="/static/main/styles/main.css" />\n<link')
+        self.assertContains(response, "<style>@font-face{")
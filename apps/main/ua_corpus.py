@@ -0,0 +1,73 @@
+"""
+Размеченный корпус User-Agent для apps.main.devices.
+
+Используется и как набор тестов (apps/main/tests.py), и как нагрузка для
+бенчмарка классификации (команда bench_devices).
+Запись: (User-Agent, Sec-CH-UA-Mobile, класс устройства, встроенный браузер, бот).
+"""
+
+UA_CORPUS = (
+    # телефоны, системные браузеры
+    ("Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 "
+     "(KHTML, like Gecko) Version/17.0 Mobile/15E148 Safari/604.1", "", "mobile", "", False),
+    ("Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 "
+     "(KHTML, like Gecko) Chrome/124.0.0.0 Mobile Safari/537.36", "?1", "mobile", "", False),
+    ("Mozilla/5.0 (Linux; Android 13; SM-A536B) AppleWebKit/537.36 "
+     "(KHTML, like Gecko) SamsungBrowser/23.0 Chrome/115.0.0.0 Mobile Safari/537.36", "", "mobile", "", False),
+    ("Mozilla/5.0 (Android 14; Mobile; rv:125.0) Gecko/125.0 Firefox/125.0", "", "mobile", "", False),
+    ("Mozilla/5.0 (iPod touch; CPU iPhone OS 15_7 like Mac OS X) AppleWebKit/605.1.15 "
+     "(KHTML, like Gecko) Version/15.6 Mobile/15E148 Safari/604.1", "", "mobile", "", False),
+
+    # встроенные браузеры мессенджеров и соцсетей
+    ("Mozilla/5.0 (iPhone; CPU iPhone OS 17_4 like Mac OS X) AppleWebKit/605.1.15 "
+     "(KHTML, like Gecko) Mobile/15E148 Instagram 327.0.0.32.120 (iPhone15,2; iOS 17_4; uk_UA)", "", "mobile", "instagram", False),
+    ("Mozilla/5.0 (Linux; Android 13; SM-S901B Build/TP1A.220624.014; wv) AppleWebKit/537.36 "
+     "(KHTML, like Gecko) Version/4.0 Chrome/123.0.6312.99 Mobile Safari/537.36 Instagram 326.0.0.42.90 Android",
+     "", "mobile", "instagram", False),
+    ("Mozilla/5.0 (iPhone; CPU iPhone OS 16_6 like Mac OS X) AppleWebKit/605.1.15 "
+     "(KHTML, like Gecko) Mobile/15E148 [FBAN/FBIOS;FBAV/450.0.0.38.108;FBBV/1;FBDV/iPhone14,5;FBMD/iPhone;FBSN/iOS]",
+     "", "mobile", "facebook", False),
+    ("Mozilla/5.0 (Linux; Android 12; Redmi Note 11 Build/SKQ1; wv) AppleWebKit/537.36 "
+     "(KHTML, like Gecko) Version/4.0 Chrome/122.0.6261.119 [FB_IAB/FB4A;FBAV/455.0.0.0;]", "", "mobile", "facebook", False),
+    ("Mozilla/5.0 (Linux; Android 13; M2101K6G Build/TKQ1; wv) AppleWebKit/537.36 "
+     "(KHTML, like Gecko) Version/4.0 Chrome/120.0.6099.230 Telegram-Android/10.8.1 (Xiaomi M2101K6G; Android 13; SDK 33; AVERAGE)",
+     "", "mobile", "telegram", False),
+    ("Mozilla/5.0 (Linux; Android 11; SM-A125F Build/RP1A; wv) AppleWebKit/537.36 "
+     "(KHTML, like Gecko) Version/4.0 Chrome/118.0.5993.80 Viber/21.6.0.0", "", "mobile", "viber", False),
+    ("Mozilla/5.0 (Linux; Android 13; SM-A536B) AppleWebKit/537.36 "
+     "(KHTML, like Gecko) Chrome/124.0.0.0 Mobile Safari/537.36 TikTok 34.1.3", "?1", "mobile", "tiktok", False),
+
+    # планшеты -> pc
+    ("Mozilla/5.0 (iPad; CPU OS 17_0 like Mac OS X) AppleWebKit/605.1.15 "
+     "(KHTML, like Gecko) Version/17.0 Mobile/15E148 Safari/604.1", "", "pc", "", False),
+    ("Mozilla/5.0 (Linux; Android 13; SM-X200) AppleWebKit/537.36 "
+     "(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36", "?0", "pc", "", False),
+    ("Mozilla/5.0 (Linux; Android 12; SM-T505) AppleWebKit/537.36 "
+     "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36", "", "pc", "", False),
+    ("Mozilla/5.0 (Linux; Android 11; Lenovo TAB M10) AppleWebKit/537.36 "
+     "(KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36", "", "pc", "", False),
+    ("Mozilla/5.0 (iPad; CPU OS 16_6 like Mac OS X) AppleWebKit/605.1.15 "
+     "(KHTML, like Gecko) Mobile/15E148 Instagram 300.0.0.17.111 (iPad13,16; iPadOS 16_6)", "", "pc", "instagram", False),
+
+    # компьютеры
+    ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+     "(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36", "?0", "pc", "", False),
+    ("Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 "
+     "(KHTML, like Gecko) Version/17.4 Safari/605.1.15", "", "pc", "", False),
+    ("Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:125.0) Gecko/20100101 Firefox/125.0", "", "pc", "", False),
+    ("", "", "pc", "", False),
+
+    # Client Hints важнее UA
+    ("Mozilla/5.0 (Linux; Android 10; K) AppleWebKit/537.36 "
+     "(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36", "?1", "mobile", "", False),
+
+    # боты превью ссылок и краулеры
+    ("TelegramBot (like TwitterBot)", "", "pc", "", True),
+    ("facebookexternalhit/1.1 (+http://www.facebook.com/externalhit_uatext.php)", "", "pc", "", True),
+    ("WhatsApp/2.23.20.0 A", "", "pc", "", True),
+    ("Viber-Url-Downloader", "", "pc", "", True),
+    ("Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)", "", "pc", "", True),
+    ("Slackbot-LinkExpanding 1.0 (+https://api.slack.com/robots)", "", "pc", "", True),
+    ("Mozilla/5.0 (compatible; Discordbot/2.0; +https://discordapp.com)", "", "pc", "", True),
+    ("curl/8.5.0", "", "pc", "", True),
+)
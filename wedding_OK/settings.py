@@ -32,6 +32,8 @@ if DEBUG:
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'apps.main.middleware.PrecompressedStaticMiddleware',
+    'apps.main.metrics.RequestMetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -67,11 +69,142 @@ WSGI_APPLICATION = 'wedding_OK.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DJANGO_DB_ENGINE=postgres — PostgreSQL (постоянные соединения + health checks,
+# пул при psycopg 3); по умолчанию — SQLite в режиме WAL.
+DB_ENGINE = os.environ.get("DJANGO_DB_ENGINE", "sqlite")
+
+if DB_ENGINE == "postgres":
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get("POSTGRES_DB", "wedding"),
+            'USER': os.environ.get("POSTGRES_USER", "wedding"),
+            'PASSWORD': os.environ.get("POSTGRES_PASSWORD", ""),
+            'HOST': os.environ.get("POSTGRES_HOST", "localhost"),
+            'PORT': os.environ.get("POSTGRES_PORT", "5432"),
+            'CONN_MAX_AGE': int(os.environ.get("DB_CONN_MAX_AGE", "60")),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'connect_timeout': int(os.environ.get("DB_CONNECT_TIMEOUT", "5")),
+            },
+        }
+    }
+
+    # Встроенный пул Django работает только с psycopg 3; с psycopg2 остаются
+    # постоянные соединения (CONN_MAX_AGE). Пул и CONN_MAX_AGE несовместимы.
+    if os.environ.get("DB_POOL", "1") == "1":
+        try:
+            import psycopg  # noqa: F401
+        except ImportError:
+            pass
+        else:
+            DATABASES['default']['CONN_MAX_AGE'] = 0
+            DATABASES['default']['OPTIONS']['pool'] = {
+                'min_size': int(os.environ.get("DB_POOL_MIN_SIZE", "2")),
+                'max_size': int(os.environ.get("DB_POOL_MAX_SIZE", "10")),
+                'timeout': int(os.environ.get("DB_POOL_TIMEOUT", "10")),
+            }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': {
+                # сколько секунд ждать освобождения блокировки вместо "database is locked"
+                'timeout': int(os.environ.get("SQLITE_BUSY_TIMEOUT", "20")),
+                # писатели берут блокировку сразу в BEGIN, а не при первом UPDATE,
+                # поэтому не упираются в deadlock при апгрейде блокировки
+                'transaction_mode': 'IMMEDIATE',
+                # выполняется на каждом новом соединении
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    'PRAGMA foreign_keys=ON;'
+                    'PRAGMA temp_store=MEMORY;'
+                    'PRAGMA cache_size=-20000;'
+                    'PRAGMA mmap_size=134217728;'
+                ),
+            },
+        }
     }
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Отрендеренные страницы приглашений (LRU-вытеснение по MAX_ENTRIES)
+    'pages': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'invitation-pages',
+        'TIMEOUT': 60 * 60,
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get("INVITATION_PAGE_CACHE_SIZE", "2000")),
+            'CULL_FREQUENCY': 4,
+        },
+    },
+}
+
+INVITATION_PAGE_CACHE = 'pages'
+
+# Режим оболочки: HTML приглашения одинаков для всех гостей (ETag, public-кэш),
+# данные гостя отдаются JSON-ом из api/invitations/<token>/guest/
+INVITATION_SHELL_MODE = os.environ.get("INVITATION_SHELL_MODE", "0") == "1"
+INVITATION_SHELL_MAX_AGE = int(os.environ.get("INVITATION_SHELL_MAX_AGE", "300"))
+
+# Модалка RSVP — отдельный общий фрагмент (invitation-modal/), грузится по намерению
+INVITATION_MODAL_MAX_AGE = int(os.environ.get("INVITATION_MODAL_MAX_AGE", "3600"))
+
+# Штамп инвалидации анкеты: алиас кэша, общего для всех процессов, если он есть
+# (с LocMem правка анкеты в админке доходит до других воркеров только по TTL)
+QUESTIONNAIRE_VERSION_CACHE = os.environ.get("QUESTIONNAIRE_VERSION_CACHE", "default")
+# Сколько секунд процесс держит индекс анкеты, прежде чем перечитать его из БД
+QUESTIONNAIRE_INDEX_TTL = int(os.environ.get("QUESTIONNAIRE_INDEX_TTL", "60"))
+
+# Открытия приглашений копятся в памяти и пишутся пачкой фоновым потоком
+# (0 — без потока: буфер пишется только через tracker.flush() и при остановке процесса)
+INVITATION_OPEN_FLUSH_INTERVAL = float(os.environ.get("INVITATION_OPEN_FLUSH_INTERVAL", "5"))
+INVITATION_OPEN_BUFFER_SIZE = int(os.environ.get("INVITATION_OPEN_BUFFER_SIZE", "500"))
+
+# Ограничение частоты RSVP (token bucket, «N/s|min|hour|day», пусто — без лимита).
+# Вёдра в памяти процесса; RSVP_THROTTLE_CACHE — алиас общего кэша для нескольких процессов
+RSVP_THROTTLE_RATES = {
+    "token": os.environ.get("RSVP_THROTTLE_TOKEN_RATE", "10/min"),
+    "ip": os.environ.get("RSVP_THROTTLE_IP_RATE", "60/min"),
+}
+RSVP_THROTTLE_CACHE = os.environ.get("RSVP_THROTTLE_CACHE", "")
+# Адреса/подсети обратного прокси (через запятую), например "127.0.0.1,10.0.0.0/8".
+# За прокси REMOTE_ADDR у всех гостей один, и лимит "ip" без этой настройки
+# становится общим лимитом сайта: укажите прокси или отключите лимит
+# (RSVP_THROTTLE_IP_RATE=""). Для запросов от этих адресов IP гостя берётся
+# из X-Forwarded-For; от остальных заголовок игнорируется.
+RSVP_TRUSTED_PROXIES = [p for p in os.environ.get("RSVP_TRUSTED_PROXIES", "").split(",") if p.strip()]
+# Сколько секунд повтор того же RSVP отдаётся из сохранённого ответа без записи
+RSVP_IDEMPOTENCY_WINDOW = int(os.environ.get("RSVP_IDEMPOTENCY_WINDOW", str(24 * 60 * 60)))
+# Доля отправок RSVP, для которых в лог пишется подробная трассировка пропусков
+# (0..1; на уровне DEBUG трассировка пишется всегда)
+RSVP_LOG_SAMPLE_RATE = float(os.environ.get("RSVP_LOG_SAMPLE_RATE", "0"))
+
+# Bearer-токен для /metrics/ (Prometheus); без него метрики видит только staff
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        # одно JSON-событие на отправку RSVP (apps/invitations/rsvp_log.py)
+        "apps.invitations.rsvp": {
+            "handlers": ["console"],
+            "level": os.environ.get("RSVP_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
+    },
 }
 
 
@@ -112,6 +245,26 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# DJANGO_STATIC_MANIFEST=1 — collectstatic пишет файлы с хэшем в имени,
+# staticfiles.json и рядом .gz/.br; {% static %} отдаёт хэшированные URL
+# (после этого без collectstatic шаблоны не рендерятся, поэтому по умолчанию выключено).
+# PrecompressedStaticMiddleware отдаёт файлы из STATIC_ROOT: хэшированные —
+# с immutable на год, остальные — на STATIC_MAX_AGE секунд.
+STATIC_MANIFEST = os.environ.get("DJANGO_STATIC_MANIFEST", "0") == "1"
+STATIC_MAX_AGE = int(os.environ.get("STATIC_MAX_AGE", "3600"))
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'apps.main.storage.CompressedManifestStaticFilesStorage' if STATIC_MANIFEST
+            else 'django.contrib.staticfiles.storage.StaticFilesStorage'
+        ),
+    },
+}
+
 # Media files
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
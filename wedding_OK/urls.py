@@ -10,6 +10,7 @@ router = routers.DefaultRouter()
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', main_views.index, name='index'),
+    path('metrics/', main_views.metrics_view, name='metrics'),
     path('api/main/', include('apps.main.api.urls')),
     path('api/gallery/', include('apps.gallery.api.urls')),
     path('api/invitations/', include('apps.invitations.api.urls')),